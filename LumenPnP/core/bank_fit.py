@@ -0,0 +1,92 @@
+"""
+Rigid rail fitting for feeder banks.
+Pure Python: works on (x, y) tuples in mm.
+"""
+import math
+
+
+class SimilarityTransform:
+    """
+    2D similarity: rotation + uniform scale + translation.
+        x' = a*x - b*y + tx
+        y' = b*x + a*y + ty
+    """
+
+    def __init__(self, a=1.0, b=0.0, tx=0.0, ty=0.0):
+        self.a = a
+        self.b = b
+        self.tx = tx
+        self.ty = ty
+
+    def apply(self, point):
+        x, y = point
+        return (self.a * x - self.b * y + self.tx,
+                self.b * x + self.a * y + self.ty)
+
+    def scale(self):
+        return math.sqrt(self.a * self.a + self.b * self.b)
+
+    def rotation_deg(self):
+        return math.degrees(math.atan2(self.b, self.a))
+
+    def residuals(self, src, dst):
+        """Distance between each transformed src point and its dst point."""
+        out = []
+        for p, q in zip(src, dst):
+            px, py = self.apply(p)
+            out.append(math.sqrt((px - q[0]) ** 2 + (py - q[1]) ** 2))
+        return out
+
+    def rms(self, src, dst):
+        res = self.residuals(src, dst)
+        if not res:
+            return 0.0
+        return math.sqrt(sum([r * r for r in res]) / len(res))
+
+
+def fit_similarity(src, dst):
+    """
+    Least-squares similarity transform mapping src points onto dst points.
+    Needs at least 2 distinct points. Returns a SimilarityTransform.
+    """
+    n = len(src)
+    if n < 2 or n != len(dst):
+        raise ValueError("Need at least 2 point pairs, got %d/%d" % (len(src), len(dst)))
+
+    sx = sum([p[0] for p in src]) / float(n)
+    sy = sum([p[1] for p in src]) / float(n)
+    dx = sum([q[0] for q in dst]) / float(n)
+    dy = sum([q[1] for q in dst]) / float(n)
+
+    num_a = 0.0
+    num_b = 0.0
+    denom = 0.0
+    for p, q in zip(src, dst):
+        ux, uy = p[0] - sx, p[1] - sy
+        vx, vy = q[0] - dx, q[1] - dy
+        num_a += ux * vx + uy * vy
+        num_b += ux * vy - uy * vx
+        denom += ux * ux + uy * uy
+
+    if denom <= 0:
+        raise ValueError("Source points are coincident")
+
+    a = num_a / denom
+    b = num_b / denom
+    tx = dx - (a * sx - b * sy)
+    ty = dy - (b * sx + a * sy)
+    return SimilarityTransform(a, b, tx, ty)
+
+
+def pick_reference_indices(count, n_refs):
+    """Evenly spread indices over range(count), always including both ends."""
+    if count <= n_refs:
+        return list(range(count))
+    if n_refs < 2:
+        return [0]
+    picked = []
+    for k in range(n_refs):
+        idx = int(round(k * (count - 1) / float(n_refs - 1)))
+        if idx not in picked:
+            picked.append(idx)
+    return picked
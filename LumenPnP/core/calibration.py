@@ -1,136 +1,242 @@
 import time
-import re
+import math
 import traceback
-from org.openpnp.model import Location, Part, Configuration
+from org.openpnp.model import Location, Part, Configuration, LengthUnit
 from javax.swing import JOptionPane
+from LumenPnP.core.calibration_history import CalibrationHistory
+from LumenPnP.core.pipeline import VisionPipeline
+from LumenPnP.core.calibration_checkpoint import CalibrationCheckpoint
+from LumenPnP.core.cancellation import OperationCancelled
+from LumenPnP.core import cancellation
+from LumenPnP.core.retry import RetryLadder, RetryMemory
+from LumenPnP.core.feeder_index import FeederIndex
+from LumenPnP.core.scheduler import CalibrationScheduler
 
 class PocketCalibrator:
     """
     Calibrates the 'Part Offset' of a feeder by visually detecting the pocket.
     Uses the VisionStore and custom VisionEngine.
     """
-    def __init__(self, machine):
+    # Fraction of the frame kept clear at each edge when reusing a stop
+    FOV_MARGIN = 0.1
+
+    # Pocket prediction from history (search ROI instead of the full frame)
+    PREDICT_HISTORY = 5 # Last offsets averaged
+    PREDICT_MIN_SIGMA_MM = 0.1 # Spread floor (single or identical samples)
+    PREDICT_SIGMA_K = 3.0 # ROI half-size = K * sigma + pocket size + margin
+    PREDICT_MAX_DEVIATION_MM = 1.0 # Current offset this far from history => edited by hand, no prediction
+    ROI_MARGIN_PX = 10
+
+    # Burst capture (opt-in): frames averaged until the pocket centre is stable.
+    # Every frame is grabbed before the analysis, so each one costs a capture.
+    BURST_FRAMES = 1 # Frames grabbed per pocket by default (1 = single frame)
+    BURST_MIN_FRAMES = 3 # Before the standard error is trusted
+    BURST_TARGET_SE_MM = 0.01 # Stop processing once the mean centre is this certain
+    BURST_OUTLIER_MM = 0.3 # Centres this far from the median are another contour, ignored
+
+    def __init__(self, machine, settle=None, camera_settings=None, transaction=None, timings=None, cancel=None,
+                 history=None, retry=None, burst_frames=None, storage_dir=None):
+        """storage_dir: where profiles, history and retry memory live (default ~/.lumen_pnp)."""
         self.machine = machine
+        # CancellationToken (or threading.Event) checked inside settle waits
+        self.cancel = cancel
+        # CalibrationTransaction recording offset changes, or None to write directly
+        self.transaction = transaction
         from LumenPnP.core.vision_store import VisionStore
         from LumenPnP.core.vision_core import VisionEngine
-        self.store = VisionStore()
+        from LumenPnP.core.settle import SettleDetector
+        from LumenPnP.core.camera_settings import CameraSettingsManager
+        from LumenPnP.core.calibration_timing import CalibrationTimings
+        self.store = VisionStore(storage_dir)
         self.engine = VisionEngine()
+        # Shared with the caller when given, so settle stats cover a whole run
+        self.settle = settle if settle is not None else SettleDetector()
+        # Shared manager => the caller restores the camera once at the end of its run.
+        # Own manager => restore after every feeder (single feeder calibration).
+        self.owns_camera_settings = camera_settings is None
+        self.camera_settings = camera_settings if camera_settings is not None else CameraSettingsManager()
+        # Per-phase wall time (shared with the caller's run when given)
+        self.timings = timings if timings is not None else CalibrationTimings(storage_dir)
+        # Offsets history used to predict where the pocket is
+        self.history = history if history is not None else CalibrationHistory(storage_dir)
+        self.roi_stats = {"roi": 0, "widened": 0, "full": 0}
+        # Escalating retries for a failed pocket (RetryLadder(steps=[]) disables them)
+        self.retry = retry if retry is not None else RetryLadder(memory=RetryMemory(storage_dir), cancel=cancel)
+        self.burst_frames = burst_frames if burst_frames is not None else self.BURST_FRAMES
+        self.burst_stats = {"feeders": 0, "frames": 0, "converged": 0, "se_sum_mm": 0.0, "se_count": 0}
         
-    def calibrate_feeder(self, feeder, callback=None):
+    def calibrate_feeder(self, feeder, callback=None, camera_at=None):
         """
         Calibrate the pocket position for a single feeder.
         Updates feeder.partOffset.
+
+        camera_at: Location the camera is already parked at (e.g. the slot
+            fiducial). When the pocket falls inside the field of view from
+            there, the same stop is reused and no second move is made.
+        """
+        try:
+            capture = self.capture_pocket(feeder, callback, camera_at)
+            if capture is None:
+                return False
+            if self.measure_pocket(capture, callback):
+                return True
+            return self.retry_pocket(capture, callback)
+        except OperationCancelled:
+            if callback: callback("Stopped.")
+            return False
+
+    def capture_pocket(self, feeder, callback=None, camera_at=None):
+        """
+        Motion half of calibrate_feeder: move (if needed), settle, apply the
+        profile's camera brightness and grab the frame.
+        Returns a capture dict for measure_pocket(), or None on failure.
+        Raises OperationCancelled on stop, so a stopped feeder is never
+        mistaken for a finished one.
         """
         cam = None
-        orig_brightness = -1
+        settings = self.camera_settings
+        timings = self.timings
         
         try:
             if callback: callback("Calibrating pocket for " + feeder.getName())
             
-            # Capture Original State (Scope: Single Feeder)
+            # Capture Original State (Scope: Single Feeder, or the caller's run)
             head = self.machine.getDefaultHead()
             cam = head.getDefaultCamera()
-            orig_state = self._get_cam_state(cam)
+            settings.capture_original(cam)
 
-            # if callback: callback("DEBUG: Captured Brightness: " + str(orig_brightness))
-            
-            # 1. Get Part info
-            part = feeder.getPart()
-            if not part:
-                if callback: callback("Skipping: No part assigned.")
-                return False
-                
-            # 2. Lookup Vision Profile
-            # Try Part ID first
-            profile_name = self.store.get_mapping(part.getId())
-            if not profile_name:
-                # Try Part Name (fallback)
-                profile_name = self.store.get_mapping(part.getName())
-                
-            if not profile_name:
-                if callback: callback("No Vision Mapping found for Part: " + str(part.getName()))
-                return False
-                
-            profile = self.store.get_profile(profile_name)
+            # 1. Get Part info & Vision Profile
+            profile = self._resolve_profile(feeder, callback)
             if not profile:
-                if callback: callback("Profile '" + str(profile_name) + "' not found!")
-                return False
+                return None
 
             if callback: callback("Using Profile: " + str(profile.name))
 
-            # 3. Determine Search Location (Feeder + Current Offset)
+            # 2. Determine Search Location (Feeder + Current Offset)
             feeder_loc = feeder.getLocation()
             current_offset = feeder.getOffset()
             
             search_loc = feeder_loc
             if current_offset:
                 search_loc = search_loc.add(current_offset)
+
+            # Predicted from history => only a window around it is searched
+            sigma_mm = None
+            prediction = self._predict_offset(feeder, current_offset)
+            if prediction is not None:
+                predicted_offset, sigma_mm = prediction
+                search_loc = feeder_loc.add(predicted_offset)
+                if callback: callback("Pocket predicted from history (sigma %.3f mm)." % sigma_mm)
                 
             # Move Camera
             if not cam:
                 if callback: callback("Error: No camera found.")
-                return False
+                return None
 
-            if callback: callback("Moving to search location...")
-            head.moveToSafeZ()
-            cam.moveTo(search_loc)
-            time.sleep(0.5) # Settle
-            
-            # 4. Capture & Process
-            if callback: callback("Analysing image...")
+            # Last settled frame, reused as the capture when nothing changed since
+            img = None
+
+            if camera_at is not None and self._in_fov(cam, camera_at, search_loc):
+                # Pocket visible from where we already are: no move, no settle
+                if callback: callback("Pocket in view, reusing current stop.")
+                capture_loc = camera_at
+            else:
+                if callback: callback("Moving to search location...")
+                cancellation.check(self.cancel)
+                with timings.phase(feeder, "safe_z"):
+                    head.moveToSafeZ()
+                with timings.phase(feeder, "xy_move"):
+                    cam.moveTo(search_loc)
+                with timings.phase(feeder, "settle"):
+                    img = self.settle.wait(cam, "pocket move", cancel=self.cancel)
+                capture_loc = search_loc
             
+            # 3. Capture
             # Apply Hardware Settings from Profile (if any)
             # This is critical for White vs Black tape
             cam_brightness = int(getattr(profile, 'camera_brightness', -1))
-            if cam_brightness >= 0:
-                if callback: callback("Applying Profile Brightness: " + str(cam_brightness))
-                # When applying specific value, we force Auto to False
-                self._apply_cam_setting(cam, {'value': cam_brightness, 'auto': False})
-                time.sleep(0.2) # Wait for exposure to settle
+            with timings.phase(feeder, "brightness"):
+                if cam_brightness >= 0:
+                    # When applying specific value, we force Auto to False
+                    wrote = settings.apply(cam, {'value': cam_brightness, 'auto': False})
+                    if wrote and callback: callback("Applied Profile Brightness: " + str(cam_brightness))
+                else:
+                    # Profile uses the default: undo a previous feeder's brightness
+                    wrote = settings.apply(cam, settings.original)
+            if wrote:
+                with timings.phase(feeder, "settle"):
+                    img = self.settle.wait(cam, "brightness", cancel=self.cancel) # Wait for exposure to settle
 
-                
-            img = cam.capture()
-            # process_image returns: found, center, res_img, stats, res_img_bin
-            found, center, _, _, _ = self.engine.process_image(img, profile)
+            if img is None:
+                with timings.phase(feeder, "capture"):
+                    img = cam.capture()
+
+            capture = {
+                "feeder": feeder,
+                "profile": profile,
+                "camera": cam,
+                "image": img,
+                "capture_loc": capture_loc,
+                "search_loc": search_loc,
+                "feeder_loc": feeder_loc,
+                "current_offset": current_offset,
+                "sigma_mm": sigma_mm
+            }
+            if self.burst_frames > 1:
+                capture["frames"] = self._grab_burst(capture) # Measured by measure_pocket()
+            return capture
+
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            if callback: 
+                callback("Pocket Calibration Error: " + str(e))
+            traceback.print_exc()
+            return None
+        finally:
+             # Restore State (only when this calibrator owns the scope)
+             if cam and self.owns_camera_settings:
+                 settings.restore(cam)
+
+    def measure_pocket(self, capture, callback=None):
+        """
+        Vision half of calibrate_feeder: detect the pocket in a captured frame
+        and update the feeder offset. Does not touch the machine, so it can
+        run on a worker thread while the gantry moves on. A burst capture
+        is measured here too (all its frames, see _measure_burst()).
+        """
+        try:
+            feeder = capture["feeder"]
+            cam = capture["camera"]
+            img = capture["image"]
+            capture_loc = capture["capture_loc"]
+            search_loc = capture["search_loc"]
+            feeder_loc = capture["feeder_loc"]
+            current_offset = capture["current_offset"]
+
+            burst = None
+            if capture.get("frames"):
+                if callback: callback("Analysing %d frames..." % len(capture["frames"]))
+                burst = self._measure_burst(capture, callback)
+                centre = burst["centre_px"]
+            else:
+                if callback: callback("Analysing image...")
+                centre = self._locate(capture, img, callback)
             
-            if not found or not center:
+            if centre is None:
                 if callback: callback("Vision failed: Part not found.")
                 return False
                 
-            # 5. Calculate Offset (Pixels -> Millimeters)
-            # Center is in Pixels (0,0 at TopLeft)
-            # We need deviation from Image Center
-            img_w = img.getWidth()
-            img_h = img.getHeight()
-            center_x = img_w / 2.0
-            center_y = img_h / 2.0
-            
-            dx_px = center.x - center_x
-            dy_px = center.y - center_y
-            
-            # Get Units Per Pixel (Location object with X, Y)
-            units_per_pixel = cam.getUnitsPerPixel()
-            upp_x = units_per_pixel.getX()
-            upp_y = units_per_pixel.getY()
-            
-            # Calculate world delta
-            # Assuming standard OpenPnP setup
-            # Delta World X = Pixel Delta X * UPP X
-            # Delta World Y = -Pixel Delta Y * UPP Y (Image Y is inverted vs World Y)
-            
-            dx_mm = dx_px * upp_x
-            dy_mm = -dy_px * upp_y
-            
-            # New Part Location (Absolute)
-            found_world_x = search_loc.getX() + dx_mm
-            found_world_y = search_loc.getY() + dy_mm
+            # 4. Calculate Offset (Pixels -> Millimeters)
+            found_world_x, found_world_y = self._pixel_to_world(cam, img, capture_loc, centre[0], centre[1])
+            dx_mm = found_world_x - search_loc.getX()
+            dy_mm = found_world_y - search_loc.getY()
             
             # Offset = Part - FeederBase
             # We want the offset relative to the Feeder base location.
             new_offset_x = found_world_x - feeder_loc.getX()
             new_offset_y = found_world_y - feeder_loc.getY()
             
-            from org.openpnp.model import Location
             # Preserve Z/Rotation from existing offset
             old_z = current_offset.getZ() if current_offset else 0.0
             old_rot = current_offset.getRotation() if current_offset else 0.0
@@ -138,81 +244,390 @@ class PocketCalibrator:
             final_offset = Location(feeder_loc.getUnits(), new_offset_x, new_offset_y, old_z, old_rot)
             
             if callback: 
-                callback("Found! Delta: X=%.3f, Y=%.3f" % (dx_mm, dy_mm))
+                callback("Found! Delta: X=%.3f, Y=%.3f" % (dx_mm, dy_mm) + self._burst_text(burst))
                 # callback("New Offset: X=%.3f, Y=%.3f" % (new_offset_x, new_offset_y))
             
-            # 6. Update Feeder
-            feeder.setOffset(final_offset)
-            feeder.setEnabled(True)
+            # 5. Update Feeder
+            if self.transaction is not None:
+                self.transaction.set_feeder_offset(feeder, final_offset)
+                self.transaction.set_feeder_enabled(feeder, True)
+            else:
+                feeder.setOffset(final_offset)
+                feeder.setEnabled(True)
             
             return True
 
         except Exception as e:
             if callback: 
                 callback("Pocket Calibration Error: " + str(e))
-            import traceback
             traceback.print_exc()
             return False
-        finally:
-             # Restore State
-             if cam and orig_state:
-                 self._apply_cam_setting(cam, orig_state)
 
+    def _locate(self, capture, img, callback=None, count=True):
+        """
+        Sub-pixel pocket centre (px, py) in one frame, or None. Predicted ROI first, then the full frame.
+        count: add the outcome to roi_stats (once per pocket, not per burst frame).
+        """
+        feeder = capture["feeder"]
+        profile = capture["profile"]
+        cam = capture["camera"]
+        target_px = self._world_to_pixel(cam, img, capture["capture_loc"], capture["search_loc"])
+        roi = self._search_roi(cam, profile, target_px, capture.get("sigma_mm"))
+        # Headless: no annotated images are rendered
+        with self.timings.phase(feeder, "pocket_vision"):
+            result = self.engine.detect(img, profile, target=target_px, roi=roi)
 
-    def _apply_cam_setting(self, cam, state):
-        # state is dict {value, auto}
-        try:
-            val = int(state.get('value', 0))
-            is_auto = state.get('auto', False)
+        if roi is None:
+            if count: self.roi_stats["full"] += 1
+        elif result.found:
+            if count: self.roi_stats["roi"] += 1
+        else:
+            # Prediction missed: same frame, full search
+            if callback: callback("Not found in predicted ROI, widening to full frame.")
+            if count: self.roi_stats["widened"] += 1
+            result.release()
+            with self.timings.phase(feeder, "pocket_vision"):
+                result = self.engine.detect(img, profile, target=target_px)
+
+        result.release() # Only the stats are used
+        if not result.found:
+            return None
+        return result.stats.get("centroid_x", result.center.x), result.stats.get("centroid_y", result.center.y)
+
+    def _grab_burst(self, capture):
+        """
+        Motion half of the burst: the settled frame plus burst_frames - 1
+        more, grabbed back to back while the camera is parked. No vision
+        here, so the gantry can leave as soon as the frames are in.
+        """
+        feeder = capture["feeder"]
+        cam = capture["camera"]
+        frames = [capture["image"]]
+        while len(frames) < self.burst_frames:
+            cancellation.check(self.cancel)
+            with self.timings.phase(feeder, "capture"):
+                frames.append(cam.capture())
+        return frames
+
+    def _measure_burst(self, capture, callback=None):
+        """
+        Vision half of the burst (pipeline worker when pipelined): locate
+        the pocket in the grabbed frames one by one. Centres further than
+        BURST_OUTLIER_MM from the median of the centres found so far are
+        ignored (another contour), the rest are averaged; processing stops
+        once the standard error of the mean is below BURST_TARGET_SE_MM
+        (after BURST_MIN_FRAMES inliers).
+        Returns {centre_px, frames, used, se_mm, std_mm, converged};
+        centre_px is None if no frame found the pocket.
+        """
+        cam = capture["camera"]
+        upp = cam.getUnitsPerPixel().convertToUnits(LengthUnit.Millimeters)
+        mm_per_px = (abs(upp.getX()) + abs(upp.getY())) / 2.0
+
+        burst = {"centre_px": None, "frames": 0, "used": 0, "se_mm": None, "std_mm": None, "converged": False}
+        centres = []
+        averager = None
+        for img in capture["frames"]:
+            burst["frames"] += 1
+            centre = self._locate(capture, img, callback, count=burst["frames"] == 1)
+            if centre is None:
+                continue
+            centres.append(centre)
+            averager = self._inlier_average(centres, self.BURST_OUTLIER_MM / mm_per_px)
+            se_px = averager.std_error()
+            if se_px is not None and averager.n >= self.BURST_MIN_FRAMES and se_px * mm_per_px <= self.BURST_TARGET_SE_MM:
+                burst["converged"] = True
+                break
+        if averager is None:
+            return burst # Nothing found: retry ladder
+
+        burst["centre_px"] = (averager.mean_x, averager.mean_y)
+        burst["used"] = averager.n
+        if averager.n >= 2:
+            burst["se_mm"] = averager.std_error() * mm_per_px
+            burst["std_mm"] = averager.std_dev() * mm_per_px
+
+        stats = self.burst_stats
+        stats["feeders"] += 1
+        stats["frames"] += burst["frames"]
+        if burst["converged"]:
+            stats["converged"] += 1
+        if burst["se_mm"] is not None:
+            stats["se_sum_mm"] += burst["se_mm"]
+            stats["se_count"] += 1
+        return burst
+
+    def _inlier_average(self, centres, max_px):
+        """CentreAverager over the centres within max_px of their per-axis median."""
+        from LumenPnP.core.vision_core import CentreAverager
+        mx = _median([c[0] for c in centres])
+        my = _median([c[1] for c in centres])
+        averager = CentreAverager()
+        for x, y in centres:
+            if math.sqrt((x - mx) ** 2 + (y - my) ** 2) <= max_px:
+                averager.add(x, y)
+        return averager
+
+    def _burst_text(self, burst):
+        if not burst:
+            return ""
+        if burst["se_mm"] is None:
+            return " (%d frame(s), no spread estimate)" % burst["frames"]
+        return " (%d/%d frames, SE %.4f mm%s)" % (burst["used"], burst["frames"], burst["se_mm"],
+                                                 "" if burst["converged"] else ", cap reached")
+
+    def log_burst_stats(self, log_fn):
+        stats = self.burst_stats
+        if not stats["feeders"]:
+            return
+        line = "Burst capture: %d feeders, %.1f frames analysed/feeder, %d reached the %.3f mm target" % (
+            stats["feeders"], float(stats["frames"]) / stats["feeders"], stats["converged"], self.BURST_TARGET_SE_MM)
+        if stats["se_count"]:
+            line += ", mean SE %.4f mm" % (stats["se_sum_mm"] / stats["se_count"])
+        log_fn(line + ".")
+
+    def _resolve_profile(self, feeder, callback=None):
+        """Find the VisionProfile mapped to the feeder's part, or None."""
+        part = feeder.getPart()
+        if not part:
+            if callback: callback("Skipping: No part assigned.")
+            return None
             
-            def set_prop(prop):
-                if hasattr(prop, "setAuto"):
-                    try: prop.setAuto(is_auto)
-                    except: pass
-                
-                # Only set value if not auto (or if API requires it, but usually Auto overrides)
-                # But if we are restoring Manual mode, we MUST set value.
-                if not is_auto and hasattr(prop, "setValue"):
-                    prop.setValue(val)
-                    
-            if hasattr(cam, "getBrightness"):
-                set_prop(cam.getBrightness())
-            elif hasattr(cam, "getDevice"):
-                dev = cam.getDevice()
-                if hasattr(dev, "getBrightness"):
-                     set_prop(dev.getBrightness())
-        except:
-             pass
+        # Try Part ID first
+        profile_name = self.store.get_mapping(part.getId())
+        if not profile_name:
+            # Try Part Name (fallback)
+            profile_name = self.store.get_mapping(part.getName())
+            
+        if not profile_name:
+            if callback: callback("No Vision Mapping found for Part: " + str(part.getName()))
+            return None
+            
+        profile = self.store.get_profile(profile_name)
+        if not profile:
+            if callback: callback("Profile '" + str(profile_name) + "' not found!")
+            return None
+        return profile
+
+    def brightness_state(self, feeder):
+        """Camera state the feeder's pocket is captured at: its profile brightness, else the original."""
+        profile = self._resolve_profile(feeder)
+        cam_brightness = int(getattr(profile, 'camera_brightness', -1)) if profile else -1
+        if cam_brightness >= 0:
+            return {'value': cam_brightness, 'auto': False}
+        return self.camera_settings.original
+
+    def retry_pocket(self, capture, callback=None):
+        """
+        Retry ladder for a pocket measure_pocket() could not find:
+        recapture, widen the mask, brightness presets, spiral of camera
+        positions. Moves the machine, so motion thread only.
+        Returns True if a step found the pocket (offset updated).
+        Raises OperationCancelled on stop.
+        """
+        if capture is None or not self.retry.enabled():
+            return False
+        feeder = capture["feeder"]
+        profile = capture["profile"]
+        cam = capture["camera"]
+        settings = self.camera_settings
+
+        def measure(img, capture_loc, use_profile=None):
+            attempt = dict(capture)
+            attempt.pop("frames", None) # Single frame per attempt
+            attempt["image"] = img
+            attempt["capture_loc"] = capture_loc
+            if use_profile is not None:
+                attempt["profile"] = use_profile
+            return self.measure_pocket(attempt, callback)
+
+        def recapture():
+            return measure(self.settle.wait(cam, "retry", cancel=self.cancel), capture["capture_loc"])
+
+        def widen(scale):
+            from LumenPnP.core.vision_store import VisionProfile
+            wide = VisionProfile.from_dict(profile.to_dict())
+            if scale is None:
+                wide.mask_type = "NONE"
+            else:
+                wide.mask_width = int(wide.mask_width * scale)
+                wide.mask_height = int(wide.mask_height * scale)
+            return measure(capture["image"], capture["capture_loc"], wide)
+
+        def brightness(value):
+            img = None
+            if settings.apply(cam, {'value': value, 'auto': False}):
+                img = self.settle.wait(cam, "brightness", cancel=self.cancel)
+            return measure(img if img is not None else cam.capture(), capture["capture_loc"])
+
+        def spiral(dx, dy):
+            offset = Location(LengthUnit.Millimeters, dx, dy, 0, 0).convertToUnits(capture["search_loc"].getUnits())
+            loc = capture["search_loc"].add(offset)
+            self.machine.getDefaultHead().moveToSafeZ()
+            cam.moveTo(loc)
+            return measure(self.settle.wait(cam, "retry", cancel=self.cancel), loc)
+
+        attempts = {
+            "recapture": [(1, recapture), (2, recapture)],
+            "brightness": [(v, lambda v=v: brightness(v)) for v in self.retry.BRIGHTNESS_PRESETS],
+            "spiral": [((dx, dy), lambda dx=dx, dy=dy: spiral(dx, dy)) for dx, dy in self.retry.spiral_offsets()]
+        }
+        if getattr(profile, 'mask_type', "NONE") != "NONE":
+            attempts["widen"] = [(1.5, lambda: widen(1.5)), (2.0, lambda: widen(2.0)), ("off", lambda: widen(None))]
 
-    def _get_cam_state(self, cam):
         try:
-             prop = None
-             if hasattr(cam, "getBrightness"):
-                prop = cam.getBrightness()
-             elif hasattr(cam, "getDevice"):
-                dev = cam.getDevice()
-                if hasattr(dev, "getBrightness"):
-                    prop = dev.getBrightness()
-            
-             if prop:
-                 val = 0
-                 is_auto = False
-                 if hasattr(prop, "getValue"): val = int(prop.getValue())
-                 if hasattr(prop, "isAuto"): is_auto = prop.isAuto()
-                 return {'value': val, 'auto': is_auto}
-                 
-        except:
+            # Standalone: capture_pocket() already restored and forgot the original
+            # state, read it again so the presets below are undone at the end
+            settings.capture_original(cam)
+            # Deferred retry: camera and brightness have moved on since the capture
+            here = cam.getLocation().convertToUnits(LengthUnit.Millimeters)
+            if here.getLinearDistanceTo(capture["capture_loc"].convertToUnits(LengthUnit.Millimeters)) > 0.01:
+                self.machine.getDefaultHead().moveToSafeZ()
+                cam.moveTo(capture["capture_loc"])
+            cam_brightness = int(getattr(profile, 'camera_brightness', -1))
+            settings.apply(cam, {'value': cam_brightness, 'auto': False} if cam_brightness >= 0 else settings.original)
+
+            found, step, param = self.retry.run("pocket:" + str(profile.name), attempts, callback)
+            if found and callback:
+                callback("Recovered by retry step '%s' (%s)." % (step, str(param)))
+            return bool(found)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            if callback: callback("Retry Error: " + str(e))
+            traceback.print_exc()
+            return False
+        finally:
+            if self.owns_camera_settings:
+                settings.restore(cam)
+                self.retry.memory.save()
+
+    def _predict_offset(self, feeder, current_offset):
+        """
+        (offset Location, sigma_mm) from the mean of the last offsets in
+        history, or None when there is no history or the current offset
+        was changed away from it.
+        """
+        stats = self.history.offset_stats(feeder.getId(), self.PREDICT_HISTORY)
+        if stats is None:
+            return None
+        mx, my = stats["mean"]
+        z, rot = 0.0, 0.0
+        if current_offset:
+            cur = current_offset.convertToUnits(LengthUnit.Millimeters)
+            if math.sqrt((cur.getX() - mx) ** 2 + (cur.getY() - my) ** 2) > self.PREDICT_MAX_DEVIATION_MM:
+                return None
+            z, rot = cur.getZ(), cur.getRotation()
+        offset = Location(LengthUnit.Millimeters, mx, my, z, rot).convertToUnits(feeder.getLocation().getUnits())
+        return offset, max(stats["std"], self.PREDICT_MIN_SIGMA_MM)
+
+    def _search_roi(self, cam, profile, target_px, sigma_mm):
+        """Pixel (x, y, w, h) window around target_px, or None (full frame)."""
+        if sigma_mm is None:
+            return None
+        upp = cam.getUnitsPerPixel().convertToUnits(LengthUnit.Millimeters)
+        if upp.getX() <= 0 or upp.getY() <= 0:
             return None
-        return None
+        if getattr(profile, 'method', "RECT") == "CIRCLE":
+            part_w = part_h = float(profile.max_diameter)
+        else:
+            part_w, part_h = float(profile.max_width), float(profile.max_height)
+        half_w = self.PREDICT_SIGMA_K * sigma_mm / upp.getX() + part_w / 2.0 + self.ROI_MARGIN_PX
+        half_h = self.PREDICT_SIGMA_K * sigma_mm / upp.getY() + part_h / 2.0 + self.ROI_MARGIN_PX
+        return (target_px[0] - half_w, target_px[1] - half_h, 2 * half_w, 2 * half_h)
+
+    def _frame_size(self, cam, img=None):
+        if img is not None:
+            return img.getWidth(), img.getHeight()
+        if hasattr(cam, "getWidth") and hasattr(cam, "getHeight"):
+            return cam.getWidth(), cam.getHeight()
+        return 0, 0
+
+    def _in_fov(self, cam, camera_loc, target_loc):
+        """True if target_loc is inside the usable part of the frame seen from camera_loc."""
+        w, h = self._frame_size(cam)
+        if w <= 0 or h <= 0:
+            return False
+        px, py = self._world_to_pixel(cam, None, camera_loc, target_loc, w, h)
+        margin_x = w * self.FOV_MARGIN
+        margin_y = h * self.FOV_MARGIN
+        return margin_x <= px <= w - margin_x and margin_y <= py <= h - margin_y
+
+    def _world_to_pixel(self, cam, img, camera_loc, target_loc, w=None, h=None):
+        """Pixel (x, y) at which target_loc appears when the camera is at camera_loc."""
+        if w is None or h is None:
+            w, h = self._frame_size(cam, img)
+        target_loc = target_loc.convertToUnits(camera_loc.getUnits())
+        upp = cam.getUnitsPerPixel().convertToUnits(camera_loc.getUnits())
+        # Image Y is inverted vs World Y
+        px = w / 2.0 + (target_loc.getX() - camera_loc.getX()) / upp.getX()
+        py = h / 2.0 - (target_loc.getY() - camera_loc.getY()) / upp.getY()
+        return px, py
+
+    def _pixel_to_world(self, cam, img, camera_loc, px, py):
+        """World (x, y) of a pixel, in camera_loc units."""
+        w, h = self._frame_size(cam, img)
+        upp = cam.getUnitsPerPixel().convertToUnits(camera_loc.getUnits())
+        # Delta World X = Pixel Delta X * UPP X
+        # Delta World Y = -Pixel Delta Y * UPP Y (Image Y is inverted vs World Y)
+        x = camera_loc.getX() + (px - w / 2.0) * upp.getX()
+        y = camera_loc.getY() - (py - h / 2.0) * upp.getY()
+        return x, y
+
+
+def _median(values):
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[mid]
+    return (ordered[mid - 1] + ordered[mid]) / 2.0
+
+
+class CalibrationRun:
+    """Objects shared by every feeder of one run_calibration() call."""
+    def __init__(self, fiducial_part, pocket_calibrator, history, log_callback, stop_event, transaction):
+        self.fiducial_part = fiducial_part
+        self.pocket_calibrator = pocket_calibrator
+        self.timings = pocket_calibrator.timings
+        self.history = history
+        self.log = log_callback
+        self.stop_event = stop_event
+        self.transaction = transaction
+        self.pipeline = None # VisionPipeline when pocket vision runs on a worker
+        self.checkpoint = None # CalibrationCheckpoint tracking finished feeders
+        self.fiducial_locator = None # OpenPnP locator, FiducialDetector or ComparingFiducialLocator
+        self.scheduler = None # CalibrationScheduler in budget mode
+        self.time_budget_s = None
+        self.group_by_brightness = False # Fiducials at the group's brightness, not the original
 
 
 class SlotCalibrator:
     FIDUCIAL_PART_NAME = "Fiducial-1mm"
 
-    def __init__(self, machine):
+    # Quick mode
+    QUICK_SAMPLE_SIZE = 5 # Feeders with history measured as drift probes
+    QUICK_DRIFT_TOLERANCE_MM = 0.2 # Above this, the run expands to all feeders
+
+    # Bank mode (Photon banks are rigid rails)
+    BANK_SIZE = 25 # Slots per bank: 1-25 right bank, 26-50 left bank
+    BANK_SLOT_PITCH_MM = 15.0 # Nominal pitch along the rail (the fitted scale absorbs any error)
+    BANK_REFERENCE_COUNT = 4 # Fiducials measured per bank
+    BANK_MIN_FIT_REFERENCES = 3 # A similarity has 4 DOF: 2 points always fit exactly, RMS says nothing
+    BANK_TOLERANCE_MM = 0.1 # Fit RMS or last residual above this => slot is visited
+
+    CHECKPOINT_INTERVAL_S = 60 # Periodic config save during a run (crash safety)
+
+    def __init__(self, machine, feeder_index=None, storage_dir=None):
+        """storage_dir: history, checkpoint, timings, retry memory and profiles (default ~/.lumen_pnp)."""
         self.machine = machine
+        self.feeder_index = feeder_index or FeederIndex() # Shared with the GUI slot map
+        self.storage_dir = storage_dir
+        self.last_timings = None # CalibrationTimings of the last run
 
-    def run_calibration(self, feeders, log_callback, progress_callback, stop_event):
+    def run_calibration(self, feeders, log_callback, progress_callback, stop_event, mode="full", pipelined=True,
+                        group_by_brightness=False, checkpoint_interval=None, rollback_on_stop=False,
+                        checkpoint=None, retry_steps=None, fiducial_mode="openpnp", burst_frames=None,
+                        time_budget_s=None, board_parts=None, fiducial_part=None, export_timings=True):
         """
         Run slot calibration on the provided list of feeders.
         
@@ -220,23 +635,93 @@ class SlotCalibrator:
             feeders: List of Feeder objects to calibrate
             log_callback: Function to call for logging (msg)
             progress_callback: Function to call for progress (current, total)
-            stop_event: threading.Event to check for cancellation
+            stop_event: CancellationToken (or threading.Event) to check for
+                cancellation. Also checked inside settle waits.
+            mode: "full" measures every feeder. "quick" measures a sample
+                (plus feeders never calibrated) and only expands to the
+                full set if the sample drifted more than
+                QUICK_DRIFT_TOLERANCE_MM. "bank" measures a few fiducials
+                per bank, fits the rail and predicts the other slots.
+                "budget" ranks feeders (CalibrationScheduler: staleness,
+                drift history, used by the loaded job) and calibrates them
+                in priority order while their predicted time fits
+                time_budget_s.
+            pipelined: run pocket vision on a worker thread while the
+                gantry moves to the next feeder.
+            group_by_brightness: visit feeders grouped by their vision
+                profile's camera brightness (route planned inside each
+                group). Fiducials are then located at the group's
+                brightness, so the camera is only written when the group
+                changes. Off: each fiducial is located at the original
+                camera state (two writes per feeder with a profile
+                brightness).
+            checkpoint_interval: seconds between checkpoint saves of the
+                changes made so far (default CHECKPOINT_INTERVAL_S, 0 = off).
+            rollback_on_stop: if the run is stopped, undo its changes
+                instead of saving them.
+            checkpoint: CalibrationCheckpoint to continue (see
+                resume_calibration). A new one is started otherwise,
+                unless an interrupted run's checkpoint has pending feeders
+                this run does not cover: that one is left untouched and
+                this run is not resumable.
+            retry_steps: retry ladder for failed fiducials/pockets (default
+                RetryLadder.STEPS, [] = no retries). Pipelined pocket
+                retries are deferred to the end of the run.
+            fiducial_mode: "openpnp" uses the machine's FiducialLocator.
+                "builtin" uses FiducialDetector (VisionEngine CIRCLE, one
+                capture, sub-pixel centre). "compare" runs both on every
+                slot, calibrates with the OpenPnP result and reports speed
+                and position difference.
+            burst_frames: frames grabbed per pocket (default
+                PocketCalibrator.BURST_FRAMES = 1). More frames are all
+                captured while the camera is parked, then analysed by the
+                vision worker, which stops early once the centre is stable.
+            time_budget_s: seconds available in "budget" mode (None = no
+                limit, priority order only).
+            board_parts: part ids placed by the loaded job ("budget" mode
+                calibrates their feeders first), see scheduler.job_part_ids.
+            fiducial_part: fiducial Part resolved by the caller (see
+                get_fiducial_part). Background callers must pass it: the
+                lookup can create the part and show a dialog. Setup
+                problems are then only logged.
+            export_timings: write the timing JSON/CSV export at the end.
+
+        Returns the run's CalibrationTimings (also kept in last_timings),
+        or None if the run could not start.
         """
         log_callback("--- Starting Slot Calibration ---")
         
-        # Instantiate PocketCalibrator
-        pocket_calibrator = PocketCalibrator(self.machine)
+        # Instantiate PocketCalibrator (settle stats and camera state are scoped to the whole run)
+        from LumenPnP.core.settle import SettleDetector
+        from LumenPnP.core.camera_settings import CameraSettingsManager
+        from LumenPnP.core.calibration_transaction import CalibrationTransaction
+        from LumenPnP.core.calibration_timing import CalibrationTimings
+        if checkpoint_interval is None:
+            checkpoint_interval = self.CHECKPOINT_INTERVAL_S
+        settle = SettleDetector()
+        camera_settings = CameraSettingsManager()
+        transaction = CalibrationTransaction(checkpoint_interval, log_callback)
+        timings = CalibrationTimings(self.storage_dir)
+        history = CalibrationHistory(self.storage_dir)
+        retry = RetryLadder(steps=retry_steps, memory=RetryMemory(self.storage_dir), cancel=stop_event)
+        pocket_calibrator = PocketCalibrator(self.machine, settle=settle, camera_settings=camera_settings,
+                                             transaction=transaction, timings=timings, cancel=stop_event,
+                                             history=history, retry=retry, burst_frames=burst_frames,
+                                             storage_dir=self.storage_dir)
         
         
         # 1. Validate Vision Setup
+        interactive = fiducial_part is None
         try:
-            fiducial_part = self._get_fiducial_part(log_callback)
+            if fiducial_part is None:
+                fiducial_part = self.get_fiducial_part(log_callback)
             if not fiducial_part.getPackage():
                 msg = "The Part '" + fiducial_part.getName() + "' has no Package assigned.\n"
                 msg += "Vision cannot work without a footprint.\n"
                 msg += "Please configure Vision/Footprint settings in the Parts tab."
                 log_callback("STOPPING: " + msg)
-                JOptionPane.showMessageDialog(None, msg, "Configuration Needed", JOptionPane.WARNING_MESSAGE)
+                if interactive:
+                    JOptionPane.showMessageDialog(None, msg, "Configuration Needed", JOptionPane.WARNING_MESSAGE)
                 return
         except Exception as e:
             log_callback("CRITICAL: Vision Part setup failed: " + str(e))
@@ -244,131 +729,779 @@ class SlotCalibrator:
         
         
         # Capture Global State (Scope: Full Calibration Run)
-        global_orig_state = None
         try:
             head = self.machine.getDefaultHead()
             cam = head.getDefaultCamera()
-            global_orig_state = pocket_calibrator._get_cam_state(cam)
+            camera_settings.capture_original(cam)
         except:
             pass
 
             
-        # 2. Sort Feeders
+        # 2. Order Feeders (slot order baseline, route is planned below)
         try:
             feeders.sort(key=self._get_slot_number)
             log_callback("Sorted feeders by slot number.")
         except Exception as e:
             log_callback("Warning: Sorting failed, using default order. " + str(e))
 
-        total = len(feeders)
-        log_callback("Calibrating " + str(total) + " feeders...")
+        # 3. Select Feeders to measure (quick mode: sample first, expand on drift)
+        run = CalibrationRun(fiducial_part, pocket_calibrator, history, log_callback, stop_event, transaction)
+        run.group_by_brightness = group_by_brightness
+
+        run.fiducial_locator = self._make_fiducial_locator(fiducial_mode, pocket_calibrator, log_callback)
+        if pipelined:
+            run.pipeline = VisionPipeline(lambda job: self._finish_pocket(job, run), stop_event, log_callback=log_callback)
+        work = list(feeders)
+        deferred = []
+        scheduler = None
+        if mode == "bank":
+            work = []
+        elif mode == "quick":
+            work, deferred = self._select_quick_sample(feeders, history, log_callback)
+        elif mode == "budget":
+            scheduler = CalibrationScheduler(history, board_parts)
+            work, skipped = scheduler.plan(feeders, time_budget_s)
+            if time_budget_s is not None:
+                scheduler.log_plan(work, skipped, time_budget_s, log_callback)
+            run.scheduler = scheduler
+            run.time_budget_s = time_budget_s
+
+        # Resumable progress, written each time the configuration is saved.
+        # Budget mode checkpoints only the planned feeders: Resume must not grow the run.
+        owns_checkpoint = True
+        if checkpoint is None:
+            planned_ids = [str(f.getId()) for f in (work if mode == "budget" else feeders)]
+            checkpoint = CalibrationCheckpoint(self.storage_dir)
+            if checkpoint.load() and not set(checkpoint.pending_ids()) <= set(planned_ids):
+                # A smaller run (one feeder, a bank...) must not wipe an interrupted run's resume state
+                owns_checkpoint = False
+                log_callback("An unfinished run can still be resumed (%d feeders left). "
+                             "This run does not replace its checkpoint." % len(checkpoint.pending_ids()))
+            checkpoint.start(planned_ids, mode)
+        run.checkpoint = checkpoint
+        if owns_checkpoint:
+            transaction.on_save = checkpoint.save
+
+        if scheduler is None:
+            work = self._order_work(work, pocket_calibrator, group_by_brightness, log_callback)
+        # Budget mode keeps the priority order: a cut-off run has done the most important feeders
+
+        if work:
+            log_callback("Calibrating " + str(len(work)) + " feeders...")
         
         updated_count = 0
+        max_drift = 0.0
         
-        for i, feeder in enumerate(feeders):
+        i = 0
+        while i < len(work):
             # Check for cancellation
             if stop_event.is_set():
-                log_callback("Calibration STOPPED by user.")
+                self._log_stopped(stop_event, log_callback)
                 break
                 
+            total = len(work)
             progress_callback(i, total)
             
+            feeder = work[i]
             f_name = str(feeder.getName()) if feeder.getName() else "Unnamed"
+            if scheduler is not None and not scheduler.fits(feeder, timings.wall_time(), time_budget_s):
+                log_callback("Budget: %.0f s used, next feeder needs ~%.0f s. Stopping with %d feeder(s) left." % (
+                    timings.wall_time(), scheduler.predict_s(feeder), total - i))
+                del work[i:]
+                break
             log_callback(">>> [" + str(i+1) + "/" + str(total) + "] Calibrating: " + f_name)
             
-            try:
-                # Get Target Location
-                current_loc = feeder.getLocation()
-                if hasattr(feeder, 'getSlot'):
-                    slot = feeder.getSlot()
-                    if slot:
-                        current_loc = slot.getLocation()
-                        # log_callback("  Using Slot Location.")
-                
-                # Check for 0,0,0
-                if current_loc.x == 0 and current_loc.y == 0:
-                    log_callback("  SKIP: Location is 0,0,0")
-                    continue
-                    
-                # Vision Check
-                # log_callback("  Locating fiducial...")
-                found_loc = None
-                
-                try:
-                    fiducial_locator = self.machine.getFiducialLocator()
-                    if not fiducial_locator:
-                         log_callback("  ERROR: No FiducialLocator on machine.")
-                         continue
-                         
-                    found_loc = fiducial_locator.getFiducialLocation(current_loc, fiducial_part)
-                except Exception as ev:
-                    log_callback("  Vision Error: " + str(ev))
-                    found_loc = None
-                    
-                if found_loc:
-                    log_callback("  Fiducial FOUND at: X=" + str(round(found_loc.x, 3)) + ", Y=" + str(round(found_loc.y, 3)))
-                    
-                    # Update Location
-                    base_loc = feeder.getLocation()
-                    new_base_loc = Location(base_loc.units, found_loc.x, found_loc.y, base_loc.z, base_loc.rotation)
-                    
-                    if hasattr(feeder, 'getSlot') and feeder.getSlot():
-                        slot = feeder.getSlot()
-                        slot.setLocation(new_base_loc)
-                        log_callback("  UPDATED Slot Location.")
-                    else:
-                        feeder.setLocation(new_base_loc)
-                        log_callback("  UPDATED Feeder Location.")
-                        
-                        log_callback("  UPDATED Feeder Location.")
-                        
-                    updated_count += 1
-                    
-                    # 3. Pocket Calibration (Auto)
-                    # Only if Slot was found and updated? Yes, otherwise we might be searching in the void.
-                    log_callback("  > Attempting Pocket Calibration...")
-                    # We pass a silent callback for non-critical failures, or just reuse log?
-                    # Reuse log but maybe prefix?
-                    pocket_success = pocket_calibrator.calibrate_feeder(feeder, callback=lambda m: log_callback("    [Pocket] " + m))
-                    if pocket_success:
-                        updated_count += 1 # Count pockets too? Or track separately?
-                        log_callback("  > Pocket Calibrated.")
-                    else:
-                        log_callback("  > Pocket Calibration Skipped/Failed (See details above).")
-                        
+            result = self._calibrate_one(feeder, run)
+            if result["slot"]:
+                updated_count += 1
+            if result["pocket"] is True:
+                updated_count += 1 # Count pockets too? Or track separately?
+            if result["drift"] is not None:
+                max_drift = max(max_drift, result["drift"])
+            i += 1
+
+            # Quick mode: end of the sample, decide whether to expand
+            if i == len(work) and deferred:
+                if max_drift > self.QUICK_DRIFT_TOLERANCE_MM:
+                    log_callback("Quick check: drift %.3f mm > %.3f mm tolerance. Expanding to all %d remaining feeders." % (
+                        max_drift, self.QUICK_DRIFT_TOLERANCE_MM, len(deferred)))
+                    work.extend(self._order_work(deferred, pocket_calibrator, group_by_brightness, log_callback))
                 else:
-                    log_callback("  FAILED to locate fiducial.")
-                    
-            except Exception as e:
-                log_callback("  AXIS/SYSTEM ERROR: " + str(e))
-                traceback.print_exc()
+                    log_callback("Quick check: max drift %.3f mm within tolerance. Skipped %d stable feeders." % (
+                        max_drift, len(deferred)))
+                deferred = []
+
+        total = len(work)
+
+        if mode == "bank":
+            bank_updated, total = self._run_banks(feeders, run, progress_callback)
+            updated_count += bank_updated
+
+        # Wait for the vision worker to commit the last pockets (in order)
+        if run.pipeline is not None:
+            deferred_retries = []
+            for job, pocket_success in run.pipeline.close():
+                if pocket_success is True:
+                    updated_count += 1
+                elif job.get("retry"):
+                    deferred_retries.append(job)
+            if deferred_retries and not stop_event.is_set():
+                log_callback("Retrying " + str(len(deferred_retries)) + " pocket(s)...")
+                updated_count += self._retry_pockets(deferred_retries, run)
 
         # Finish
         progress_callback(total, total)
         log_callback("--- Calibration Complete ---")
         log_callback("Updated " + str(updated_count) + " / " + str(total) + " feeders.")
+        settle.log_stats(log_callback)
+        pocket_calibrator.log_burst_stats(log_callback)
+        cache = pocket_calibrator.engine.cache_stats()
+        if cache["hits"] or cache["misses"]:
+            log_callback("Vision mask/kernel cache: %d hits, %d misses." % (cache["hits"], cache["misses"]))
+        mats = pocket_calibrator.engine.mat_stats()
+        if mats["outstanding"] or mats["open_results"]:
+            log_callback("Vision: %d pooled Mats and %d results not released (leak)." % (
+                mats["outstanding"], mats["open_results"]))
+        pocket_calibrator.engine.close() # Pipeline drained: free the pooled Mats now
+        from LumenPnP.core.fiducial_detector import FiducialDetector, ComparingFiducialLocator
+        if isinstance(run.fiducial_locator, (FiducialDetector, ComparingFiducialLocator)):
+            run.fiducial_locator.close() # Built-in detector has its own engine
+        retry.log_stats(log_callback)
+        retry.memory.save()
+        if hasattr(run.fiducial_locator, "log_report"):
+            run.fiducial_locator.log_report(log_callback)
+            run.fiducial_locator.save()
+        roi = pocket_calibrator.roi_stats
+        if roi["roi"] or roi["widened"]:
+            log_callback("Pocket search: %d in predicted ROI, %d widened to full frame, %d full frame (no history)." % (
+                roi["roi"], roi["widened"], roi["full"]))
+        if not (stop_event.is_set() and rollback_on_stop):
+            history.save() # A rolled-back run leaves no history either
         
-        # Save changes
+        # Save changes (single save for the whole run), or undo a stopped run
         try:
-            if updated_count > 0:
-                log_callback("Saving configuration...")
-                Configuration.get().save()
-                log_callback("Configuration saved.")
+            if stop_event.is_set() and rollback_on_stop:
+                transaction.rollback()
+                if owns_checkpoint:
+                    checkpoint.clear()
+            else:
+                if transaction.changes:
+                    log_callback("Saving configuration...")
+                    with timings.phase(None, "config_save"):
+                        transaction.commit()
+                if not owns_checkpoint:
+                    pass # The earlier run's checkpoint stays as it was
+                elif stop_event.is_set():
+                    checkpoint.save()
+                    log_callback("Progress saved. Use 'Resume Calibration' to continue.")
+                else:
+                    checkpoint.clear()
         except Exception as e:
             log_callback("Error saving config: " + str(e))
             
         # Restore Global State
         try:
-            if global_orig_state:
+            if camera_settings.original:
                 head = self.machine.getDefaultHead()
                 cam = head.getDefaultCamera()
-                pocket_calibrator._apply_cam_setting(cam, global_orig_state)
-                log_callback("Restored camera state.")
+                camera_settings.restore(cam)
+                log_callback("Restored camera state (%d brightness writes, %d skipped)." % (
+                    camera_settings.writes, camera_settings.skipped))
         except:
             pass
 
+        # Where did the time go
+        timings.finish()
+        timings.log_summary(log_callback)
+        if export_timings and timings.export_json() and timings.export_csv():
+            log_callback("Timing exported to " + timings.storage_dir)
+        self.last_timings = timings
+        return timings
+
+
+    def resume_calibration(self, feeders, log_callback, progress_callback, stop_event, **kwargs):
+        """
+        Continue the last unfinished run_calibration() from its checkpoint.
+
+        Args:
+            feeders: pool to look the checkpointed feeder ids up in (usually
+                all machine feeders). Only unfinished ones are calibrated.
+            Other args as run_calibration(). The checkpointed mode is reused.
+        """
+        checkpoint = CalibrationCheckpoint(self.storage_dir)
+        if not checkpoint.load():
+            log_callback("No unfinished calibration to resume.")
+            return
+
+        by_id = dict([(str(f.getId()), f) for f in feeders])
+        pending = [by_id[fid] for fid in checkpoint.pending_ids() if fid in by_id]
+        missing = len(checkpoint.pending_ids()) - len(pending)
+
+        log_callback("Resuming '%s' calibration: %d done, %d remaining." % (
+            checkpoint.mode, len(checkpoint.done), len(pending)))
+        if missing:
+            log_callback("Warning: " + str(missing) + " checkpointed feeder(s) no longer exist, skipped.")
+
+        if not pending:
+            checkpoint.clear()
+            log_callback("Nothing left to calibrate.")
+            return
+
+        kwargs["mode"] = checkpoint.mode or "full"
+        return self.run_calibration(pending, log_callback, progress_callback, stop_event,
+                                    checkpoint=checkpoint, **kwargs)
+
+    def _calibrate_one(self, feeder, run):
+        """
+        Locate the slot fiducial, update the slot/feeder location, then
+        calibrate the pocket. Records the result in the run history.
+        Returns dict: slot (bool), pocket (bool, or None while queued on the
+        pipeline), drift (mm or None), location ((x, y) mm or None).
+        A feeder stopped part-way is neither recorded nor marked done, so
+        Resume calibrates it again.
+        """
+        log_callback = run.log
+        result = {"slot": False, "pocket": False, "drift": None, "location": None}
+        queued = False
+        cancelled = False
+        t_start = time.time()
+        try:
+            # Get Target Location
+            current_loc = self._get_target_location(feeder)
+            
+            # Check for 0,0,0
+            if current_loc.x == 0 and current_loc.y == 0:
+                log_callback("  SKIP: Location is 0,0,0")
+                return result
+                
+            # Vision Check
+            found_loc = None
+            
+            try:
+                fiducial_locator = run.fiducial_locator
+                if not fiducial_locator:
+                     log_callback("  ERROR: No FiducialLocator on machine.")
+                     return result
+
+                # Fiducial pipelines are tuned at the original exposure: undo the previous
+                # feeder's pocket brightness (the write cache skips it if already there).
+                # Grouped runs stay at the group's brightness, only a group change writes.
+                settings = run.pocket_calibrator.camera_settings
+                if run.group_by_brightness:
+                    state = run.pocket_calibrator.brightness_state(feeder)
+                else:
+                    state = settings.original
+                with run.timings.phase(feeder, "brightness"):
+                    settings.apply(self.machine.getDefaultHead().getDefaultCamera(), state)
+                     
+                found_loc = self._locate_fiducial(fiducial_locator, feeder, current_loc, run)
+            except OperationCancelled:
+                raise
+            except Exception as ev:
+                log_callback("  Vision Error: " + str(ev))
+                found_loc = None
+                
+            if not found_loc:
+                cancellation.check(run.stop_event) # Locator gave up because of the stop
+                log_callback("  FAILED to locate fiducial.")
+                return result
+
+            log_callback("  Fiducial FOUND at: X=" + str(round(found_loc.x, 3)) + ", Y=" + str(round(found_loc.y, 3)))
+            
+            # Drift vs stored location
+            drift = current_loc.convertToUnits(LengthUnit.Millimeters).getLinearDistanceTo(
+                found_loc.convertToUnits(LengthUnit.Millimeters))
+            result["drift"] = drift
+            log_callback("  Drift: %.3f mm" % drift)
+            
+            # Update Location
+            found_mm = found_loc.convertToUnits(LengthUnit.Millimeters)
+            new_base_loc = self._set_target_location(feeder, found_mm.getX(), found_mm.getY(), log_callback, run.transaction)
+            result["slot"] = True
+            result["location"] = (found_mm.getX(), found_mm.getY())
+            
+            # Pocket Calibration (Auto)
+            # Only if Slot was found and updated, otherwise we might be searching in the void.
+            cancellation.check(run.stop_event)
+            log_callback("  > Attempting Pocket Calibration...")
+            # Camera is still parked on the fiducial: let the pocket reuse this stop if it can
+            camera_at = self.machine.getDefaultHead().getDefaultCamera().getLocation()
+            capture = run.pocket_calibrator.capture_pocket(feeder, callback=lambda m: log_callback("    [Pocket] " + m), camera_at=camera_at)
+
+            slot_mm = new_base_loc.convertToUnits(LengthUnit.Millimeters)
+            job = {"feeder": feeder, "capture": capture, "slot_xy": (slot_mm.getX(), slot_mm.getY()), "drift": drift,
+                   "started": t_start}
+
+            if capture is not None and run.pipeline is not None:
+                # Vision + commit happen on the worker while we move on
+                job["duration_s"] = time.time() - t_start # Machine time: the vision overlaps the next move
+                queued = run.pipeline.submit(job)
+                result["pocket"] = None
+                log_callback("  > Pocket frame queued for vision.")
+            else:
+                result["pocket"] = self._finish_pocket(job, run, prefix="    [Pocket] ", retry=True)
+                
+        except OperationCancelled:
+            cancelled = True
+            log_callback("  Stopped.")
+        except Exception as e:
+            log_callback("  AXIS/SYSTEM ERROR: " + str(e))
+            traceback.print_exc()
+        finally:
+            # Finished here unless the vision worker still has to commit the pocket
+            # (a found slot is marked done by _finish_pocket)
+            if not queued and result["pocket"] is None:
+                result["pocket"] = False
+            if not queued and not result["slot"] and not cancelled:
+                run.checkpoint.mark_done(feeder.getId(), result)
+
+            # Periodic save so a crash mid-run does not lose everything
+            try:
+                t_save = time.time()
+                if run.transaction.maybe_checkpoint():
+                    run.timings.add(feeder, "config_save", time.time() - t_save)
+            except Exception as e:
+                log_callback("  Error saving checkpoint: " + str(e))
+        return result
+
+    def _finish_pocket(self, job, run, prefix=None, retry=False):
+        """
+        Measure a captured pocket frame, commit the offset and record the
+        feeder's history entry. Runs on the pipeline worker when pipelined.
+
+        retry: run the retry ladder on failure (moves the machine, so motion
+            thread only). Without it, a failed frame is flagged job["retry"]
+            and left unrecorded for _retry_pockets().
+        A retry stopped by the user raises OperationCancelled before
+        anything is recorded.
+        """
+        feeder = job["feeder"]
+        if prefix is None:
+            prefix = "    [Pocket " + str(feeder.getName()) + "] "
+        callback = lambda m: run.log(prefix + m)
+        pocket_calibrator = run.pocket_calibrator
+
+        pocket_success = False
+        if job["capture"] is not None:
+            if not job.get("retry"):
+                pocket_success = pocket_calibrator.measure_pocket(job["capture"], callback)
+            if not pocket_success and pocket_calibrator.retry.enabled():
+                if not retry:
+                    callback("Not found, retry deferred to the end of the run.")
+                    job["retry"] = True
+                    return False
+                pocket_success = pocket_calibrator.retry_pocket(job["capture"], callback)
+        if pocket_success:
+            callback("Pocket Calibrated.")
+        else:
+            callback("Pocket Calibration Skipped/Failed (See details above).")
+
+        # History
+        offset_xy = None
+        if pocket_success and feeder.getOffset():
+            offset_mm = feeder.getOffset().convertToUnits(LengthUnit.Millimeters)
+            offset_xy = (offset_mm.getX(), offset_mm.getY())
+        duration = job.get("duration_s") or (time.time() - job["started"])
+        run.history.record(feeder.getId(), job["slot_xy"], offset_xy, job["drift"], duration=duration)
+        run.checkpoint.mark_done(feeder.getId(), {"slot": True, "pocket": pocket_success, "drift": job["drift"]})
+        return pocket_success
+
+    def _make_fiducial_locator(self, fiducial_mode, pocket_calibrator, log_callback):
+        from LumenPnP.core.fiducial_detector import FiducialDetector, ComparingFiducialLocator
+        if fiducial_mode == "builtin":
+            log_callback("Fiducials: built-in detector.")
+            return FiducialDetector(pocket_calibrator)
+        openpnp_locator = self.machine.getFiducialLocator()
+        if fiducial_mode == "compare" and openpnp_locator:
+            log_callback("Fiducials: OpenPnP locator, compared against the built-in detector.")
+            return ComparingFiducialLocator(openpnp_locator, FiducialDetector(pocket_calibrator), self.storage_dir)
+        return openpnp_locator
+
+    def _retry_pockets(self, jobs, run):
+        """
+        Run the retry ladder on pockets the vision worker missed. Returns the number recovered.
+        Budget mode: a retry whose worst case no longer fits the budget is skipped
+        (the feeder stays pending for a later run).
+        """
+        by_feeder = dict([(id(job["feeder"]), job) for job in jobs])
+        recovered = 0
+        worst_s = run.pocket_calibrator.retry.worst_case_s()
+        for feeder in self._plan_route([job["feeder"] for job in jobs], run.log):
+            if run.stop_event.is_set():
+                self._log_stopped(run.stop_event, run.log)
+                break
+            if run.scheduler is not None and run.time_budget_s is not None:
+                left_s = run.scheduler.remaining_s(run.timings.wall_time(), run.time_budget_s)
+                if worst_s > left_s:
+                    run.log("Budget: %.0f s left, a pocket retry can take ~%.0f s. Skipping %s." % (
+                        max(0.0, left_s), worst_s, str(feeder.getName())))
+                    continue
+            run.log(">>> Retrying pocket: " + str(feeder.getName()))
+            try:
+                if self._finish_pocket(by_feeder[id(feeder)], run, prefix="    [Pocket] ", retry=True):
+                    recovered += 1
+            except OperationCancelled:
+                self._log_stopped(run.stop_event, run.log) # Left pending for Resume
+                break
+        return recovered
+
+    def _locate_fiducial(self, fiducial_locator, feeder, current_loc, run):
+        """
+        getFiducialLocation() at current_loc, then the retry ladder
+        (recapture, brightness presets, spiral) if it found nothing.
+        """
+        ladder = run.pocket_calibrator.retry
+
+        def locate(loc):
+            try:
+                # Includes the locator's own move/settle/capture passes (not separable from here)
+                with run.timings.phase(feeder, "fiducial_vision"):
+                    return fiducial_locator.getFiducialLocation(loc, run.fiducial_part)
+            except OperationCancelled:
+                raise
+            except Exception as ev:
+                run.log("  Vision Error: " + str(ev))
+                return None
+
+        found_loc = locate(current_loc)
+        if found_loc or not ladder.enabled():
+            return found_loc
+
+        from LumenPnP.core.fiducial_detector import FiducialDetector
+        cam = self.machine.getDefaultHead().getDefaultCamera()
+        settings = run.pocket_calibrator.camera_settings
+        # The built-in detector applies its profile brightness itself: tell it to use the preset
+        detectors = [d for d in (fiducial_locator, getattr(fiducial_locator, "detector", None))
+                     if isinstance(d, FiducialDetector)]
+
+        def brightness(value):
+            settings.apply(cam, {'value': value, 'auto': False})
+            for detector in detectors:
+                detector.brightness_override = value
+            try:
+                return locate(current_loc)
+            finally:
+                for detector in detectors:
+                    detector.brightness_override = None
+
+        def spiral(dx, dy):
+            offset = Location(LengthUnit.Millimeters, dx, dy, 0, 0).convertToUnits(current_loc.getUnits())
+            return locate(current_loc.add(offset))
+
+        attempts = {
+            "recapture": [(1, lambda: locate(current_loc))],
+            "brightness": [(v, lambda v=v: brightness(v)) for v in ladder.BRIGHTNESS_PRESETS],
+            "spiral": [((dx, dy), lambda dx=dx, dy=dy: spiral(dx, dy)) for dx, dy in ladder.spiral_offsets()]
+        }
+        found_loc, step, param = ladder.run("fiducial:" + str(run.fiducial_part.getName()), attempts,
+                                            lambda m: run.log("  " + m))
+        if found_loc:
+            run.log("  Fiducial recovered by retry step '%s' (%s)." % (step, str(param)))
+        return found_loc
+
+    def _run_banks(self, feeders, run, progress_callback):
+        """
+        Bank mode. For each bank, measure BANK_REFERENCE_COUNT fiducials, fit a
+        least-squares similarity from the nominal rail (slot * pitch) to the
+        machine, and predict the other slots. A slot is still visited when
+        fewer than BANK_MIN_FIT_REFERENCES were found, the fit is poor, it
+        has no history, or its last fit residual was high.
+        Measured slots get their fit residual in the history; predicted
+        slots are flagged so quick/budget modes visit them next time.
+        Feeders without an explicit slot number in their name ("Slot N" or
+        "(N)") are not fitted: they are measured one by one after the banks.
+        Returns (updated_count, total).
+        """
+        from LumenPnP.core.bank_fit import fit_similarity, pick_reference_indices
+        log_callback = run.log
+        stop_event = run.stop_event
+        history = run.history
+
+        # Group by bank, keep slot order inside each bank
+        banks = {}
+        singles = [] # No explicit slot number: measured individually
+        for feeder in feeders:
+            slot_no = self.feeder_index.strict_slot_of(feeder)
+            loc = self._get_target_location(feeder)
+            if loc is None or (loc.x == 0 and loc.y == 0):
+                log_callback("  SKIP (bank mode): no location for " + str(feeder.getName()))
+                continue
+            if slot_no is None or slot_no < 1:
+                singles.append(feeder)
+                continue
+            banks.setdefault((slot_no - 1) // self.BANK_SIZE, []).append((slot_no, feeder))
+
+        total = sum([len(members) for members in banks.values()]) + len(singles)
+        done = 0
+        updated_count = 0
+        report = [] # (slot_no, name, kind, residual_mm)
+
+        for bank_id in sorted(banks.keys()):
+            if stop_event.is_set():
+                self._log_stopped(stop_event, log_callback)
+                break
+
+            members = banks[bank_id]
+            log_callback("--- Bank %d: %d feeders ---" % (bank_id + 1, len(members)))
+
+            # 1. Measure reference fiducials
+            ref_idx = pick_reference_indices(len(members), self.BANK_REFERENCE_COUNT)
+            refs = self._plan_route([members[k][1] for k in ref_idx], log_callback)
+            slot_of = dict([(id(f), n) for n, f in members])
+
+            nominal = []
+            measured = []
+            ref_names = []
+            visited = set()
+            for feeder in refs:
+                if stop_event.is_set():
+                    break
+                progress_callback(done, total)
+                done += 1
+                visited.add(id(feeder))
+                log_callback(">>> [Bank %d ref] Calibrating: %s" % (bank_id + 1, str(feeder.getName())))
+                result = self._calibrate_one(feeder, run)
+                if result["slot"]: updated_count += 1
+                if result["pocket"] is True: updated_count += 1
+                if result["location"]:
+                    nominal.append((slot_of[id(feeder)] * self.BANK_SLOT_PITCH_MM, 0.0))
+                    measured.append(result["location"])
+                    ref_names.append((slot_of[id(feeder)], str(feeder.getName()), feeder.getId()))
+
+            if stop_event.is_set():
+                self._log_stopped(stop_event, log_callback)
+                break
+
+            # 2. Fit the rail
+            transform = None
+            fit_rms = None
+            if len(measured) >= self.BANK_MIN_FIT_REFERENCES:
+                transform = fit_similarity(nominal, measured)
+                residuals = transform.residuals(nominal, measured)
+                fit_rms = transform.rms(nominal, measured)
+                for (slot_no, name, feeder_id), res in zip(ref_names, residuals):
+                    report.append((slot_no, name, "reference", res))
+                    history.annotate(feeder_id, fit_residual=res)
+                log_callback("  Fit: rotation %.3f deg, pitch %.3f mm, RMS %.3f mm" % (
+                    transform.rotation_deg(), transform.scale() * self.BANK_SLOT_PITCH_MM, fit_rms))
+            else:
+                log_callback("  Fit not trusted (%d references found, %d needed). Visiting every slot of this bank." % (
+                    len(measured), self.BANK_MIN_FIT_REFERENCES))
+
+            # 3. Predict or visit the remaining slots
+            to_visit = []
+            for slot_no, feeder in members:
+                if id(feeder) in visited:
+                    continue
+                reason = None
+                if transform is None or fit_rms > self.BANK_TOLERANCE_MM:
+                    reason = "poor fit"
+                else:
+                    last = history.last(feeder.getId())
+                    if last is None:
+                        reason = "no history"
+                    elif last.get("fit_residual") is not None and last["fit_residual"] > self.BANK_TOLERANCE_MM:
+                        reason = "last residual %.3f mm" % last["fit_residual"]
+
+                if reason:
+                    to_visit.append((slot_no, feeder, reason))
+                    continue
+
+                # Predicted only
+                pred = transform.apply((slot_no * self.BANK_SLOT_PITCH_MM, 0.0))
+                stored = self._get_target_location(feeder).convertToUnits(LengthUnit.Millimeters)
+                correction = math.sqrt((pred[0] - stored.getX()) ** 2 + (pred[1] - stored.getY()) ** 2)
+                self._set_target_location(feeder, pred[0], pred[1], lambda m: None, run.transaction)
+                # The correction is this slot's (predicted) drift
+                history.record(feeder.getId(), pred, None, correction, predicted=True)
+                run.checkpoint.mark_done(feeder.getId(), {"slot": True, "pocket": False, "drift": None})
+                report.append((slot_no, str(feeder.getName()), "predicted", correction))
+                updated_count += 1
+                progress_callback(done, total)
+                done += 1
+
+            if to_visit:
+                visit_feeders = self._plan_route([f for _, f, _ in to_visit], log_callback)
+                reasons = dict([(id(f), (n, r)) for n, f, r in to_visit])
+                for feeder in visit_feeders:
+                    if stop_event.is_set():
+                        break
+                    progress_callback(done, total)
+                    done += 1
+                    slot_no, reason = reasons[id(feeder)]
+                    log_callback(">>> [Bank %d visit: %s] Calibrating: %s" % (bank_id + 1, reason, str(feeder.getName())))
+                    result = self._calibrate_one(feeder, run)
+                    if result["slot"]: updated_count += 1
+                    if result["pocket"] is True: updated_count += 1
+                    if result["location"] and transform is not None:
+                        pred = transform.apply((slot_no * self.BANK_SLOT_PITCH_MM, 0.0))
+                        loc = result["location"]
+                        res = math.sqrt((pred[0] - loc[0]) ** 2 + (pred[1] - loc[1]) ** 2)
+                        report.append((slot_no, str(feeder.getName()), "visited", res))
+                        history.annotate(feeder.getId(), fit_residual=res)
+
+        if singles and not stop_event.is_set():
+            log_callback("--- No slot number: %d feeders measured individually ---" % len(singles))
+            for feeder in self._plan_route(singles, log_callback):
+                if stop_event.is_set():
+                    self._log_stopped(stop_event, log_callback)
+                    break
+                progress_callback(done, total)
+                done += 1
+                log_callback(">>> [No slot] Calibrating: " + str(feeder.getName()))
+                result = self._calibrate_one(feeder, run)
+                if result["slot"]: updated_count += 1
+                if result["pocket"] is True: updated_count += 1
+
+        # Outlier report
+        if report:
+            log_callback("--- Bank Residuals (mm) ---")
+            log_callback("  Slot  Kind        Residual  Feeder")
+            for slot_no, name, kind, res in sorted(report):
+                flag = "  <-- OUTLIER" if kind != "predicted" and res > self.BANK_TOLERANCE_MM else ""
+                log_callback("  %4d  %-10s  %8.3f  %s%s" % (slot_no, kind, res, name, flag))
+            log_callback("  ('predicted' residual is the correction applied without a visit)")
+
+        return updated_count, total
+
+    def _log_stopped(self, stop_event, log_callback):
+        requested = getattr(stop_event, "requested_at", None)
+        if requested:
+            log_callback("Calibration STOPPED by user (%.0f ms after the request)." % (1000.0 * (time.time() - requested)))
+        else:
+            log_callback("Calibration STOPPED by user.")
+
+    def _select_quick_sample(self, feeders, history, log_callback):
+        """
+        Split feeders into (sample, deferred) for quick mode.
+        Feeders without a measurement (no history, or only predicted by
+        bank mode) are always measured. Among the rest, QUICK_SAMPLE_SIZE
+        are picked evenly spread over the slot order.
+        """
+        never = [f for f in feeders if not history.is_measured(f.getId())]
+        known = [f for f in feeders if history.is_measured(f.getId())]
+
+        n = min(self.QUICK_SAMPLE_SIZE, len(known))
+        picked = set()
+        if n > 0:
+            step = float(len(known)) / n
+            for k in range(n):
+                picked.add(int(k * step + step / 2.0))
+
+        sample = never + [f for idx, f in enumerate(known) if idx in picked]
+        deferred = [f for idx, f in enumerate(known) if idx not in picked]
+        log_callback("Quick mode: measuring %d feeders (%d not measured yet), %d deferred." % (
+            len(sample), len(never), len(deferred)))
+        return sample, deferred
+
+    def _get_target_location(self, feeder):
+        """Slot location if the feeder has a slot, else the feeder location."""
+        location = feeder.getLocation()
+        if hasattr(feeder, 'getSlot'):
+            slot = feeder.getSlot()
+            if slot:
+                location = slot.getLocation()
+        return location
+
+    def _set_target_location(self, feeder, x_mm, y_mm, log_callback, transaction=None):
+        """
+        Write X/Y (mm) to the slot if the feeder has one, else to the feeder.
+        Keeps Z/rotation. Goes through `transaction` when given.
+        """
+        base_loc = feeder.getLocation()
+        xy = Location(LengthUnit.Millimeters, x_mm, y_mm, 0, 0).convertToUnits(base_loc.getUnits())
+        new_base_loc = Location(base_loc.units, xy.getX(), xy.getY(), base_loc.z, base_loc.rotation)
+        
+        if hasattr(feeder, 'getSlot') and feeder.getSlot():
+            if transaction is not None:
+                transaction.set_slot_location(feeder.getSlot(), new_base_loc)
+            else:
+                feeder.getSlot().setLocation(new_base_loc)
+            log_callback("  UPDATED Slot Location.")
+        else:
+            if transaction is not None:
+                transaction.set_feeder_location(feeder, new_base_loc)
+            else:
+                feeder.setLocation(new_base_loc)
+            log_callback("  UPDATED Feeder Location.")
+        return new_base_loc
+
+    def _order_work(self, feeders, pocket_calibrator, group_by_brightness, log_callback):
+        """Visit order: travel-optimised route, optionally inside brightness groups."""
+        try:
+            if not group_by_brightness:
+                return self._plan_route(feeders, log_callback)
+
+            groups = {}
+            for feeder in feeders:
+                profile = pocket_calibrator._resolve_profile(feeder)
+                brightness = int(getattr(profile, 'camera_brightness', -1)) if profile else -1
+                groups.setdefault(brightness, []).append(feeder)
+
+            log_callback("Grouped by camera brightness: " + ", ".join(
+                ["%s x%d" % ("default" if b < 0 else str(b), len(groups[b])) for b in sorted(groups.keys())]))
+
+            # Default brightness first (no write needed), then each group in turn,
+            # each route starting where the previous group ended
+            ordered = []
+            start = None
+            for b in sorted(groups.keys()):
+                group = self._plan_route(groups[b], log_callback, start=start)
+                ordered.extend(group)
+                if group:
+                    last = self._get_target_location(group[-1]).convertToUnits(LengthUnit.Millimeters)
+                    start = (last.getX(), last.getY())
+            return ordered
+        except Exception as e:
+            log_callback("Warning: Route planning failed, using slot order. " + str(e))
+            return feeders
+
+    def _plan_route(self, feeders, log_callback, start=None):
+        """
+        Reorder feeders to minimise gantry travel, starting from `start`
+        ((x, y) mm) or the current camera position. Expects `feeders`
+        already in slot order (baseline).
+        Feeders without a usable location keep their slot order at the end.
+        """
+        from LumenPnP.core.route_planner import RoutePlanner
+
+        routable = []
+        points = []
+        unroutable = []
+        for feeder in feeders:
+            loc = self._get_target_location(feeder)
+            if loc is None or (loc.x == 0 and loc.y == 0):
+                unroutable.append(feeder)
+                continue
+            mm = loc.convertToUnits(LengthUnit.Millimeters)
+            routable.append(feeder)
+            points.append((mm.getX(), mm.getY()))
+
+        if len(routable) < 2:
+            return feeders
+
+        if start is None:
+            try:
+                cam_loc = self.machine.getDefaultHead().getDefaultCamera().getLocation()
+                cam_mm = cam_loc.convertToUnits(LengthUnit.Millimeters)
+                start = (cam_mm.getX(), cam_mm.getY())
+            except:
+                pass
+
+        planner = RoutePlanner()
+        order = planner.plan(points, start)
+
+        baseline_mm = planner.path_length(points, range(len(points)), start)
+        planned_mm = planner.path_length(points, order, start)
+        saved = 0.0
+        if baseline_mm > 0:
+            saved = 100.0 * (baseline_mm - planned_mm) / baseline_mm
+        log_callback("Route: %.0f mm predicted travel (slot order: %.0f mm, %.0f%% less)." % (planned_mm, baseline_mm, saved))
+
+        return [routable[i] for i in order] + unroutable
 
-    def _get_fiducial_part(self, log_fn):
+    def get_fiducial_part(self, log_fn):
+        """The fiducial Part, created (with a setup dialog) if missing."""
         config = Configuration.get()
         part = config.getPart(self.FIDUCIAL_PART_NAME)
         if part:
@@ -391,13 +1524,4 @@ class SlotCalibrator:
         return new_part
 
     def _get_slot_number(self, feeder):
-        name = str(feeder.getName())
-        match = re.search(r'Slot:\s*(\d+)', name, re.IGNORECASE)
-        if match:
-            return int(match.group(1))
-        if name.isdigit():
-            return int(name)
-        m2 = re.search(r'\((\d+)\)', name)
-        if m2:
-            return int(m2.group(1))
-        return 999999
+        return self.feeder_index.sort_key(feeder)
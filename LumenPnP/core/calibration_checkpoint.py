@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+from LumenPnP.core import storage
+
+class CalibrationCheckpoint:
+    """
+    Progress of an unfinished calibration run, so it can be resumed.
+    Stored in 'lumen_calibration_checkpoint.json' in the .lumen_pnp storage dir.
+
+    The file is only written right after the machine configuration has been
+    saved, so "done" on disk always matches what the configuration holds.
+    It is deleted when a run completes.
+    """
+
+    FILE_NAME = "lumen_calibration_checkpoint.json"
+
+    def __init__(self, storage_dir=None, file_name=None):
+        """file_name: separate checkpoint file (e.g. background runs), default FILE_NAME."""
+        self.storage_dir = storage.storage_dir(storage_dir)
+
+        self.checkpoint_file = os.path.join(self.storage_dir, file_name or self.FILE_NAME)
+        self._lock = threading.Lock() # Pocket results are marked from the vision worker
+        self.started = None
+        self.mode = None
+        self.feeder_ids = [] # Planned feeders, in slot order
+        self.done = {}       # feeder_id -> result dict
+
+    def start(self, feeder_ids, mode):
+        """Begin tracking a new run (replaces any previous checkpoint in memory)."""
+        with self._lock:
+            self.started = time.time()
+            self.mode = mode
+            self.feeder_ids = [str(fid) for fid in feeder_ids]
+            self.done = {}
+
+    def mark_done(self, feeder_id, result):
+        with self._lock:
+            self.done[str(feeder_id)] = {
+                "slot": bool(result.get("slot")),
+                "pocket": result.get("pocket") is True,
+                "drift": result.get("drift")
+            }
+
+    def is_done(self, feeder_id):
+        return str(feeder_id) in self.done
+
+    def pending_ids(self):
+        """Planned feeder ids not finished yet, in their original order."""
+        return [fid for fid in self.feeder_ids if fid not in self.done]
+
+    def exists(self):
+        return os.path.exists(self.checkpoint_file)
+
+    def load(self):
+        """Load the checkpoint file. Returns False if there is none."""
+        data = storage.load_json(self.checkpoint_file, "calibration checkpoint")
+        if data is None:
+            return False
+        with self._lock:
+            self.started = data.get("started")
+            self.mode = data.get("mode", "full")
+            self.feeder_ids = data.get("feeders", [])
+            self.done = data.get("done", {})
+        return True
+
+    def save(self):
+        with self._lock:
+            data = {
+                "started": self.started,
+                "mode": self.mode,
+                "feeders": self.feeder_ids,
+                "done": self.done
+            }
+        storage.save_json(self.checkpoint_file, data, "calibration checkpoint")
+
+    def clear(self):
+        """Run completed: nothing to resume."""
+        if self.exists():
+            try:
+                os.remove(self.checkpoint_file)
+            except Exception as e:
+                print("Error removing calibration checkpoint: " + str(e))
@@ -0,0 +1,125 @@
+import math
+import os
+import threading
+import time
+from LumenPnP.core import storage
+
+class CalibrationHistory:
+    """
+    Per-feeder calibration history (slot location, pocket offset, drift,
+    bank fit residual, duration).
+    Stored in 'lumen_calibration_history.json' in the .lumen_pnp storage dir.
+    Values are in mm. Keyed by Feeder ID.
+
+    Entries flagged "predicted" were written by bank mode from the rail fit
+    without a visit: they do not count as measurements (is_measured()).
+    """
+    MAX_ENTRIES = 20 # Per feeder, oldest dropped first
+
+    def __init__(self, storage_dir=None):
+        self.storage_dir = storage.storage_dir(storage_dir)
+
+        self.history_file = os.path.join(self.storage_dir, "lumen_calibration_history.json")
+        self.feeders = {} # feeder_id -> list of entry dicts (oldest first)
+        self._lock = threading.Lock() # Pipelined pockets are recorded from the vision worker
+        self._recorded = {} # feeder_id -> entry recorded through this object
+        self._pending = {} # feeder_id -> fields for an entry not recorded yet (annotate())
+        self.load()
+
+    def record(self, feeder_id, slot_xy=None, offset_xy=None, residual=None, timestamp=None, duration=None,
+               predicted=False):
+        """
+        Append a measurement.
+        slot_xy / offset_xy: (x, y) in mm, or None if not measured this time.
+        residual: drift vs. the previous stored location (mm), or None.
+        duration: machine time spent on the feeder (s), or None.
+        predicted: slot written from the bank fit, not measured.
+        """
+        entry = {
+            "time": timestamp if timestamp is not None else time.time(),
+            "slot": list(slot_xy) if slot_xy else None,
+            "offset": list(offset_xy) if offset_xy else None,
+            "residual": residual,
+            "fit_residual": None,
+            "predicted": bool(predicted),
+            "duration": duration
+        }
+        fid = str(feeder_id)
+        with self._lock:
+            entry.update(self._pending.pop(fid, {}))
+            self._recorded[fid] = entry
+            entries = self.feeders.setdefault(fid, [])
+            entries.append(entry)
+            if len(entries) > self.MAX_ENTRIES:
+                del entries[:len(entries) - self.MAX_ENTRIES]
+
+    def annotate(self, feeder_id, **fields):
+        """
+        Set fields (e.g. fit_residual) on the entry recorded for the feeder
+        through this object, or on the next one if it is not recorded yet
+        (pipelined pockets are recorded later, on the vision worker).
+        """
+        fid = str(feeder_id)
+        with self._lock:
+            entry = self._recorded.get(fid)
+            if entry is not None:
+                entry.update(fields)
+            else:
+                self._pending.setdefault(fid, {}).update(fields)
+
+    def get_entries(self, feeder_id):
+        return self.feeders.get(str(feeder_id), [])
+
+    def last(self, feeder_id):
+        entries = self.get_entries(feeder_id)
+        if entries:
+            return entries[-1]
+        return None
+
+    def offset_stats(self, feeder_id, count=5):
+        """
+        Mean and spread of the last `count` measured pocket offsets.
+        Returns {mean: (x, y), std: mm (radial), n} or None if never measured.
+        """
+        offsets = [e["offset"] for e in self.get_entries(feeder_id) if e.get("offset")][-count:]
+        if not offsets:
+            return None
+        n = len(offsets)
+        mx = sum([o[0] for o in offsets]) / float(n)
+        my = sum([o[1] for o in offsets]) / float(n)
+        var = sum([(o[0] - mx) ** 2 + (o[1] - my) ** 2 for o in offsets]) / float(n)
+        return {"mean": (mx, my), "std": math.sqrt(var), "n": n}
+
+    def drift_stats(self, feeder_id, count=5):
+        """
+        Mean and RMS of the last `count` measured drifts (residuals).
+        Returns {mean: mm, rms: mm, n} or None if no drift was measured.
+        """
+        residuals = [e["residual"] for e in self.get_entries(feeder_id) if e.get("residual") is not None][-count:]
+        if not residuals:
+            return None
+        n = len(residuals)
+        return {
+            "mean": sum(residuals) / float(n),
+            "rms": math.sqrt(sum([r * r for r in residuals]) / float(n)),
+            "n": n
+        }
+
+    def has_history(self, feeder_id):
+        return len(self.get_entries(feeder_id)) > 0
+
+    def is_measured(self, feeder_id):
+        """True if the latest entry is a real measurement (not a bank prediction)."""
+        last = self.last(feeder_id)
+        return last is not None and not last.get("predicted")
+
+    def load(self):
+        data = storage.load_json(self.history_file, "calibration history") or {}
+        self.feeders = data.get("feeders", {})
+
+    def save(self):
+        with self._lock:
+            data = {
+                "feeders": self.feeders
+            }
+            storage.save_json(self.history_file, data, "calibration history")
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+from LumenPnP.core import storage
+
+class CalibrationTimings:
+    """
+    Wall time per calibration phase, per feeder and aggregated over a run.
+    Exported to 'lumen_calibration_timing.json' / '.csv' in the .lumen_pnp
+    storage dir (last run only).
+
+    Pocket vision runs on the pipeline worker when pipelined, so it overlaps
+    the motion phases: the phase percentages can add up to more than 100%.
+    """
+    PHASES = ["safe_z", "xy_move", "settle", "brightness", "capture",
+              "fiducial_vision", "pocket_vision", "config_save"]
+    RUN_KEY = "(run)" # Phases not tied to a feeder (final config save)
+
+    def __init__(self, storage_dir=None):
+        self.storage_dir = storage.storage_dir(storage_dir)
+
+        self.json_file = os.path.join(self.storage_dir, "lumen_calibration_timing.json")
+        self.csv_file = os.path.join(self.storage_dir, "lumen_calibration_timing.csv")
+        self._lock = threading.Lock() # Pocket vision is timed on the vision worker
+        self.started = time.time()
+        self.finished = None
+        self.feeders = {} # feeder_id -> {"name": str, "phases": {phase: seconds}}
+        self.order = []   # feeder ids, first-timed order
+        self.phases = {}  # phase -> {count, total, max}
+
+    # --- Recording ---
+    def phase(self, feeder, name):
+        """Context manager timing one phase: `with timings.phase(feeder, "xy_move"): ...`"""
+        return _PhaseTimer(self, feeder, name)
+
+    def add(self, feeder, name, seconds):
+        """Record `seconds` of phase `name` for `feeder` (None = run level)."""
+        if feeder is None:
+            key, label = self.RUN_KEY, self.RUN_KEY
+        else:
+            key, label = str(feeder.getId()), str(feeder.getName())
+        with self._lock:
+            entry = self.feeders.get(key)
+            if entry is None:
+                entry = {"name": label, "phases": {}}
+                self.feeders[key] = entry
+                self.order.append(key)
+            entry["phases"][name] = entry["phases"].get(name, 0.0) + seconds
+
+            st = self.phases.get(name)
+            if st is None:
+                st = {"count": 0, "total": 0.0, "max": 0.0}
+                self.phases[name] = st
+            st["count"] += 1
+            st["total"] += seconds
+            if seconds > st["max"]:
+                st["max"] = seconds
+
+    def finish(self):
+        self.finished = time.time()
+
+    # --- Results ---
+    def wall_time(self):
+        end = self.finished if self.finished is not None else time.time()
+        return end - self.started
+
+    def feeder_total(self, feeder_id):
+        entry = self.feeders.get(str(feeder_id))
+        if entry is None:
+            return 0.0
+        return sum(entry["phases"].values())
+
+    def phase_names(self):
+        """Known phases in pipeline order, then any extra ones."""
+        extra = sorted([p for p in self.phases.keys() if p not in self.PHASES])
+        return self.PHASES + extra
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "started": self.started,
+                "wall_s": self.wall_time(),
+                "phases": dict([(p, dict(st)) for p, st in self.phases.items()]),
+                "feeders": [{"id": key,
+                             "name": self.feeders[key]["name"],
+                             "phases": dict(self.feeders[key]["phases"])} for key in self.order]
+            }
+
+    # --- Export ---
+    def export_json(self, path=None):
+        path = path or self.json_file
+        if storage.save_json(path, self.to_dict(), "calibration timing"):
+            return path
+        return None
+
+    def export_csv(self, path=None):
+        """One row per feeder, one column per phase (seconds)."""
+        path = path or self.csv_file
+        phases = self.phase_names()
+        try:
+            with open(path, 'w') as f:
+                f.write(",".join(["feeder_id", "name"] + phases + ["total"]) + "\n")
+                for key in self.order:
+                    entry = self.feeders[key]
+                    cells = [key, entry["name"].replace(",", " ")]
+                    cells += ["%.4f" % entry["phases"].get(p, 0.0) for p in phases]
+                    cells.append("%.4f" % sum(entry["phases"].values()))
+                    f.write(",".join(cells) + "\n")
+            return path
+        except Exception as e:
+            print("Error saving calibration timing CSV: " + str(e))
+            return None
+
+    def log_summary(self, log_fn):
+        """Aggregate table: one line per phase, then the slowest feeders."""
+        wall = self.wall_time()
+        log_fn("--- Timing (run wall time %.1f s) ---" % wall)
+        log_fn("  Phase              Count   Total s   Mean ms    Max ms   % wall")
+        for name in self.phase_names():
+            st = self.phases.get(name)
+            if not st or st["count"] == 0:
+                continue
+            pct = 100.0 * st["total"] / wall if wall > 0 else 0.0
+            log_fn("  %-17s  %5d  %8.1f  %8.0f  %8.0f  %6.1f" % (
+                name, st["count"], st["total"], 1000.0 * st["total"] / st["count"], 1000.0 * st["max"], pct))
+
+        slowest = sorted([k for k in self.order if k != self.RUN_KEY],
+                         key=lambda k: -self.feeder_total(k))[:5]
+        if slowest:
+            log_fn("  Slowest feeders: " + ", ".join(
+                ["%s %.1f s" % (self.feeders[k]["name"], self.feeder_total(k)) for k in slowest]))
+
+
+class _PhaseTimer:
+    def __init__(self, timings, feeder, name):
+        self.timings = timings
+        self.feeder = feeder
+        self.name = name
+        self.t_start = None
+
+    def __enter__(self):
+        self.t_start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Failed phases still cost time: record them too
+        self.timings.add(self.feeder, self.name, time.time() - self.t_start)
+        return False
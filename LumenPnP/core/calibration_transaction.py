@@ -0,0 +1,97 @@
+import threading
+import time
+from org.openpnp.model import Configuration
+
+class CalibrationTransaction:
+    """
+    Records the slot/feeder changes of a calibration run (before and after
+    values) so they can be saved once at commit(), checkpointed to disk
+    periodically, or rolled back in memory without reloading the machine
+    configuration.
+    """
+
+    def __init__(self, checkpoint_interval=None, log_callback=None):
+        """
+        Args:
+            checkpoint_interval: seconds between checkpoint saves, None/0 to disable
+            log_callback: optional fn(msg)
+        """
+        self.checkpoint_interval = checkpoint_interval
+        self.log_callback = log_callback
+        self.changes = [] # Change dicts, in first-modified order
+        self._index = {}  # (kind, id(obj)) -> change dict
+        self._lock = threading.Lock() # Pocket offsets may be committed from the vision worker
+        self.dirty = False
+        self.saves = 0
+        self.last_save = time.time()
+        self.on_save = None # Optional fn() called after every successful save
+
+    # --- Recording ---
+    def set_slot_location(self, slot, location):
+        self._record("slot location", slot, slot.getLocation, slot.setLocation, location)
+
+    def set_feeder_location(self, feeder, location):
+        self._record("feeder location", feeder, feeder.getLocation, feeder.setLocation, location)
+
+    def set_feeder_offset(self, feeder, offset):
+        self._record("feeder offset", feeder, feeder.getOffset, feeder.setOffset, offset)
+
+    def set_feeder_enabled(self, feeder, enabled):
+        self._record("feeder enabled", feeder, feeder.isEnabled, feeder.setEnabled, enabled)
+
+    def _record(self, kind, obj, getter, setter, value):
+        with self._lock:
+            key = (kind, id(obj))
+            change = self._index.get(key)
+            if change is None:
+                change = {"kind": kind, "object": obj, "setter": setter, "before": getter(), "after": None}
+                self._index[key] = change
+                self.changes.append(change)
+            setter(value)
+            change["after"] = value
+            self.dirty = True
+
+    # --- Persistence ---
+    def maybe_checkpoint(self):
+        """Save if the checkpoint interval has elapsed and there are unsaved changes."""
+        if not self.checkpoint_interval or not self.dirty:
+            return False
+        if time.time() - self.last_save < self.checkpoint_interval:
+            return False
+        self._save("Checkpoint")
+        return True
+
+    def commit(self):
+        """Save all pending changes in one go. Returns the number of changed objects."""
+        if self.dirty:
+            self._save("Commit")
+        return len(self.changes)
+
+    def rollback(self):
+        """Put every recorded object back to its before value (newest first)."""
+        with self._lock:
+            for change in reversed(self.changes):
+                change["setter"](change["before"])
+            count = len(self.changes)
+            self.changes = []
+            self._index = {}
+            self.dirty = False
+        # A checkpoint may already have written the new values: overwrite them
+        if self.saves > 0:
+            self._save("Rollback")
+        self._log("Rolled back " + str(count) + " change(s).")
+        return count
+
+    def _save(self, reason):
+        with self._lock:
+            Configuration.get().save()
+            self.dirty = False
+            self.saves += 1
+            self.last_save = time.time()
+        self._log(reason + ": configuration saved (" + str(len(self.changes)) + " change(s)).")
+        if self.on_save:
+            self.on_save()
+
+    def _log(self, msg):
+        if self.log_callback:
+            self.log_callback(msg)
@@ -0,0 +1,96 @@
+class CameraSettingsManager:
+    """
+    Caches the camera brightness state and skips property writes that are
+    already in effect (each UVC write costs time and an exposure settle).
+
+    State is a dict {value, auto}. The original state is captured once and
+    restored once, at the end of whatever scope owns the manager.
+    """
+
+    def __init__(self):
+        self.original = None # State before we touched the camera
+        self.current = None  # Last state known to be in effect
+        self.writes = 0
+        self.skipped = 0
+
+    def capture_original(self, cam):
+        """Read the device state once. Later calls are no-ops until restore()."""
+        if self.original is None:
+            self.original = self.read(cam)
+            if self.original is not None:
+                self.current = dict(self.original)
+        return self.original
+
+    def apply(self, cam, state):
+        """
+        Apply state unless it is already in effect.
+        Returns True if a write happened (caller should wait for exposure to settle).
+        """
+        if state is None:
+            return False
+        if self._same(self.current, state):
+            self.skipped += 1
+            return False
+        self._write(cam, state)
+        self.current = dict(state)
+        self.writes += 1
+        return True
+
+    def restore(self, cam):
+        """Return to the original state (if still different) and forget it."""
+        wrote = False
+        if self.original is not None:
+            wrote = self.apply(cam, self.original)
+        self.original = None
+        return wrote
+
+    def read(self, cam):
+        try:
+             prop = self._brightness_prop(cam)
+             if prop:
+                 val = 0
+                 is_auto = False
+                 if hasattr(prop, "getValue"): val = int(prop.getValue())
+                 if hasattr(prop, "isAuto"): is_auto = prop.isAuto()
+                 return {'value': val, 'auto': is_auto}
+        except:
+            return None
+        return None
+
+    def _same(self, a, b):
+        if a is None or b is None:
+            return False
+        if bool(a.get('auto', False)) != bool(b.get('auto', False)):
+            return False
+        # In auto mode the value is ignored by the device
+        return a.get('auto', False) or int(a.get('value', 0)) == int(b.get('value', 0))
+
+    def _write(self, cam, state):
+        # state is dict {value, auto}
+        try:
+            val = int(state.get('value', 0))
+            is_auto = state.get('auto', False)
+
+            prop = self._brightness_prop(cam)
+            if prop is None:
+                return
+
+            if hasattr(prop, "setAuto"):
+                try: prop.setAuto(is_auto)
+                except: pass
+
+            # Only set value if not auto (Auto overrides).
+            # But if we are restoring Manual mode, we MUST set value.
+            if not is_auto and hasattr(prop, "setValue"):
+                prop.setValue(val)
+        except:
+             pass
+
+    def _brightness_prop(self, cam):
+        if hasattr(cam, "getBrightness"):
+            return cam.getBrightness()
+        elif hasattr(cam, "getDevice"):
+            dev = cam.getDevice()
+            if hasattr(dev, "getBrightness"):
+                return dev.getBrightness()
+        return None
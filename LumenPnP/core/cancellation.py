@@ -0,0 +1,67 @@
+import threading
+import time
+
+class OperationCancelled(Exception):
+    """Raised inside a long phase (settle, retry, stitch...) once stop was requested."""
+    pass
+
+
+class CancellationToken:
+    """
+    Stop request shared between the GUI and a background job.
+    Drop-in for the threading.Event previously used as `stop_event`
+    (is_set/set/clear/wait), plus interruptible sleep() and check().
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.requested_at = None # time.time() of the stop request
+
+    def set(self):
+        if not self._event.is_set():
+            self.requested_at = time.time()
+        self._event.set()
+
+    def clear(self):
+        self.requested_at = None
+        self._event.clear()
+
+    def is_set(self):
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        """Block until cancelled or timeout. Returns True if cancelled."""
+        self._event.wait(timeout)
+        return self._event.is_set()
+
+    def sleep(self, seconds):
+        """Sleep, waking up early on cancel. Returns True if cancelled."""
+        return sleep(self, seconds)
+
+    def check(self):
+        check(self)
+
+
+# Helpers accepting a CancellationToken, a plain threading.Event, or None
+
+def sleep(stop_event, seconds):
+    """time.sleep() that returns early (True) when stop_event is set."""
+    if seconds <= 0:
+        return is_cancelled(stop_event)
+    if stop_event is None:
+        time.sleep(seconds)
+        return False
+    if isinstance(stop_event, CancellationToken):
+        stop_event = stop_event._event
+    stop_event.wait(seconds)
+    return stop_event.is_set()
+
+
+def is_cancelled(stop_event):
+    return stop_event is not None and stop_event.is_set()
+
+
+def check(stop_event):
+    """Raise OperationCancelled if stop_event is set."""
+    if is_cancelled(stop_event):
+        raise OperationCancelled("Stopped by user")
@@ -0,0 +1,168 @@
+import math
+import re
+
+# Slot number in a feeder name, tried in this order
+SLOT_PATTERN = re.compile(r'Slot\s*:?\s*(\d+)\b', re.IGNORECASE) # "Slot 12", "Slot: 12", not "Slotted 0603"
+PAREN_PATTERN = re.compile(r'\((\d+)\)') # "0402 10k (12)"
+DIGITS_PATTERN = re.compile(r'(\d+)') # First number, only if it fits a slot
+
+NO_SLOT = 999999 # Sorts after every real slot
+
+
+def parse_slot(name, max_slot=50, strict=False):
+    """
+    Slot number from a feeder name, or None.
+    strict: only an explicit "Slot N" or "(N)" with 1 <= N <= max_slot
+    counts. Geometry (bank mode) must not trust a stray number such as
+    "R 22k".
+    """
+    name = str(name or "").strip()
+    if strict:
+        m = SLOT_PATTERN.search(name) or PAREN_PATTERN.search(name)
+        if m and 1 <= int(m.group(1)) <= max_slot:
+            return int(m.group(1))
+        return None
+    m = SLOT_PATTERN.search(name)
+    if m:
+        return int(m.group(1))
+    if name.isdigit():
+        return int(name)
+    m = PAREN_PATTERN.search(name)
+    if m:
+        return int(m.group(1))
+    m = DIGITS_PATTERN.search(name)
+    if m and 1 <= int(m.group(1)) <= max_slot:
+        return int(m.group(1)) # Part sizes (0402, 0603...) are above max_slot
+    return None
+
+
+class FeederIndex:
+    """
+    Slot <-> feeder lookup and nearest feeder to a machine position,
+    shared by the GUI slot map, map clicks and SlotCalibrator.
+
+    Names are parsed once: results are cached by (feeder id, name), so a
+    renamed feeder is re-parsed and an unchanged one never is. rebuild()
+    refreshes the slot and position tables from the current feeder list.
+    """
+    MAX_SLOT = 50 # Two banks of 25
+    CELL_MM = 20.0 # Spatial grid cell
+
+    def __init__(self, max_slot=None):
+        self.max_slot = max_slot or self.MAX_SLOT
+        self._parsed = {} # (id, name) -> slot or None
+        self._strict = {} # (id, name) -> explicit slot or None
+        self.by_slot = {} # slot -> feeder
+        self.slot_by_id = {} # feeder id -> slot
+        self._cells = {} # (cx, cy) -> [(x_mm, y_mm, feeder)]
+        self.stats = {"parsed": 0, "cached": 0}
+
+    def slot_of(self, feeder):
+        """Slot number of the feeder (from its name), or None."""
+        fid = str(feeder.getId())
+        name = str(feeder.getName())
+        key = (fid, name)
+        if key in self._parsed:
+            self.stats["cached"] += 1
+            return self._parsed[key]
+        slot = parse_slot(name, self.max_slot)
+        self._parsed[key] = slot
+        self.stats["parsed"] += 1
+        return slot
+
+    def strict_slot_of(self, feeder):
+        """Slot number only from an explicit "Slot N" / "(N)" in the name, or None."""
+        key = (str(feeder.getId()), str(feeder.getName()))
+        if key not in self._strict:
+            self._strict[key] = parse_slot(key[1], self.max_slot, strict=True)
+        return self._strict[key]
+
+    def sort_key(self, feeder):
+        """For list.sort(): slot order, feeders without a slot last."""
+        slot = self.slot_of(feeder)
+        return slot if slot is not None else NO_SLOT
+
+    def rebuild(self, feeders, enabled_only=True):
+        """Refresh the slot and position tables. First feeder wins a duplicate slot."""
+        self.by_slot = {}
+        self.slot_by_id = {}
+        self._cells = {}
+        for feeder in feeders:
+            if enabled_only and not feeder.isEnabled():
+                continue
+            slot = self.slot_of(feeder)
+            if slot is not None and 1 <= slot <= self.max_slot:
+                self.slot_by_id[str(feeder.getId())] = slot
+                if slot not in self.by_slot:
+                    self.by_slot[slot] = feeder
+            xy = self._xy_mm(feeder)
+            if xy is not None:
+                self._cells.setdefault(self._cell(xy[0], xy[1]), []).append((xy[0], xy[1], feeder))
+        return self
+
+    def feeder_for_slot(self, slot):
+        return self.by_slot.get(slot)
+
+    def slot_for_id(self, feeder_id):
+        return self.slot_by_id.get(str(feeder_id))
+
+    def nearest(self, x_mm, y_mm, max_distance_mm=None):
+        """
+        (feeder, distance_mm) of the feeder whose slot (or feeder) location
+        is closest to the point, or (None, None). Searches grid rings
+        outwards and stops once no closer cell can exist.
+        """
+        if not self._cells:
+            return None, None
+        cx, cy = self._cell(x_mm, y_mm)
+        limit = self._max_ring(cx, cy)
+        if max_distance_mm is not None:
+            limit = min(limit, int(math.ceil(max_distance_mm / self.CELL_MM)))
+        best, best_d = None, None
+        ring = 0
+        while ring <= limit:
+            for cell in self._ring(cx, cy, ring):
+                for fx, fy, feeder in self._cells.get(cell, []):
+                    d = math.hypot(fx - x_mm, fy - y_mm)
+                    if best_d is None or d < best_d:
+                        best, best_d = feeder, d
+            # Anything in the next ring is at least ring * CELL_MM away
+            if best_d is not None and best_d <= ring * self.CELL_MM:
+                break
+            ring += 1
+        if best is None or (max_distance_mm is not None and best_d > max_distance_mm):
+            return None, None
+        return best, best_d
+
+    def _xy_mm(self, feeder):
+        from org.openpnp.model import LengthUnit # Lazy: parse_slot stays importable without OpenPnP
+        try:
+            location = feeder.getLocation()
+            if hasattr(feeder, 'getSlot') and feeder.getSlot():
+                location = feeder.getSlot().getLocation()
+            if location is None:
+                return None
+            mm = location.convertToUnits(LengthUnit.Millimeters)
+            if mm.getX() == 0 and mm.getY() == 0:
+                return None # Not placed yet
+            return mm.getX(), mm.getY()
+        except:
+            return None
+
+    def _cell(self, x_mm, y_mm):
+        return int(math.floor(x_mm / self.CELL_MM)), int(math.floor(y_mm / self.CELL_MM))
+
+    def _max_ring(self, cx, cy):
+        return max([max(abs(c[0] - cx), abs(c[1] - cy)) for c in self._cells])
+
+    def _ring(self, cx, cy, ring):
+        if ring == 0:
+            return [(cx, cy)]
+        cells = []
+        for dx in range(-ring, ring + 1):
+            cells.append((cx + dx, cy - ring))
+            cells.append((cx + dx, cy + ring))
+        for dy in range(-ring + 1, ring):
+            cells.append((cx - ring, cy + dy))
+            cells.append((cx + ring, cy + dy))
+        return cells
@@ -0,0 +1,164 @@
+import math
+import os
+import time
+from org.openpnp.model import Location, LengthUnit
+from LumenPnP.core import storage
+
+class FiducialDetector:
+    """
+    Slot fiducial detection with the VisionEngine (CIRCLE profile) instead
+    of the OpenPnP FiducialLocator: one move, one settled frame, sub-pixel
+    centre from the contour moments. No re-centering passes.
+
+    Has the same getFiducialLocation(location, part) call as the OpenPnP
+    locator, so SlotCalibrator can use either.
+    """
+    PROFILE_NAME = "Fiducial 1mm"
+    DIAMETER_MM = 1.0
+    MASK_DIAMETER_MM = 4.0 # Keeps neighbouring features out
+
+    def __init__(self, pocket_calibrator):
+        """Shares the machine, settle detector, camera settings, store and cancel token of the PocketCalibrator."""
+        from LumenPnP.core.vision_core import VisionEngine
+        self.pocket_calibrator = pocket_calibrator
+        self.machine = pocket_calibrator.machine
+        self.engine = VisionEngine() # Own engine: the pocket worker may be using the other one
+        self.last_stats = None
+        self.brightness_override = None # Camera brightness forced by the retry ladder (None = profile)
+
+    def getFiducialLocation(self, location, part):
+        pc = self.pocket_calibrator
+        head = self.machine.getDefaultHead()
+        cam = head.getDefaultCamera()
+        profile = self.get_profile(part, cam)
+
+        head.moveToSafeZ()
+        cam.moveTo(location)
+        img = pc.settle.wait(cam, "fiducial move", cancel=pc.cancel)
+
+        cam_brightness = int(getattr(profile, 'camera_brightness', -1))
+        if self.brightness_override is not None:
+            cam_brightness = int(self.brightness_override)
+        state = {'value': cam_brightness, 'auto': False} if cam_brightness >= 0 else pc.camera_settings.original
+        if pc.camera_settings.apply(cam, state):
+            img = pc.settle.wait(cam, "brightness", cancel=pc.cancel)
+
+        result = self.engine.detect(img, profile) # Headless
+        result.release()
+        self.last_stats = result.stats
+        if not result.found:
+            return None
+
+        px = result.stats.get("centroid_x", result.center.x)
+        py = result.stats.get("centroid_y", result.center.y)
+        x, y = pc._pixel_to_world(cam, img, location, px, py)
+        return Location(location.getUnits(), x, y, location.getZ(), location.getRotation())
+
+    def close(self):
+        """Release the engine's pooled and cached Mats (end of the run)."""
+        self.engine.close()
+
+    def get_profile(self, part, cam):
+        """Profile mapped to the fiducial part, else PROFILE_NAME (created for this camera if missing)."""
+        store = self.pocket_calibrator.store
+        name = None
+        if part is not None:
+            name = store.get_mapping(part.getId()) or store.get_mapping(part.getName())
+        profile = store.get_profile(name or self.PROFILE_NAME)
+        if profile is None:
+            profile = self._default_profile(cam)
+            store.save_profile(profile)
+        return profile
+
+    def _default_profile(self, cam):
+        from LumenPnP.core.vision_store import VisionProfile
+        upp = cam.getUnitsPerPixel().convertToUnits(LengthUnit.Millimeters).getX()
+        d_px = self.DIAMETER_MM / upp
+        p = VisionProfile(self.PROFILE_NAME)
+        p.method = "CIRCLE"
+        p.threshold_min = 150 # Bright copper/silver on a dark rail
+        p.blur_size = 3
+        p.mask_type = "CIRCLE"
+        p.mask_width = int(self.MASK_DIAMETER_MM / upp)
+        p.mask_height = p.mask_width
+        p.min_diameter = int(d_px * 0.6)
+        p.max_diameter = int(math.ceil(d_px * 1.6))
+        p.min_area = int(math.pi * (p.min_diameter / 2.0) ** 2 * 0.5)
+        p.max_area = int(math.pi * (p.max_diameter / 2.0) ** 2 * 1.5) + 1
+        return p
+
+
+class ComparingFiducialLocator:
+    """
+    Runs the OpenPnP locator and the FiducialDetector on the same slot and
+    records time and position of both. Returns the OpenPnP result, so a
+    comparison run calibrates exactly like a normal one.
+    """
+
+    def __init__(self, openpnp_locator, detector, storage_dir=None):
+        self.openpnp_locator = openpnp_locator
+        self.detector = detector
+        self.rows = [] # {location, openpnp_s, builtin_s, openpnp, builtin}
+
+        self.report_file = os.path.join(storage.storage_dir(storage_dir), "lumen_fiducial_comparison.json")
+
+    def close(self):
+        self.detector.close()
+
+    def getFiducialLocation(self, location, part):
+        t_start = time.time()
+        reference = self.openpnp_locator.getFiducialLocation(location, part)
+        t_openpnp = time.time() - t_start
+
+        t_start = time.time()
+        try:
+            builtin = self.detector.getFiducialLocation(location, part)
+        except Exception:
+            builtin = None
+        t_builtin = time.time() - t_start
+
+        self.rows.append({
+            "location": self._xy(location),
+            "openpnp_s": t_openpnp,
+            "builtin_s": t_builtin,
+            "openpnp": self._xy(reference),
+            "builtin": self._xy(builtin)
+        })
+        return reference
+
+    def summary(self):
+        """Aggregate speed and agreement. Distances in mm, times in s."""
+        both = [r for r in self.rows if r["openpnp"] and r["builtin"]]
+        deltas = [math.sqrt((r["openpnp"][0] - r["builtin"][0]) ** 2 + (r["openpnp"][1] - r["builtin"][1]) ** 2)
+                  for r in both]
+        n = len(self.rows)
+        return {
+            "slots": n,
+            "openpnp_found": len([r for r in self.rows if r["openpnp"]]),
+            "builtin_found": len([r for r in self.rows if r["builtin"]]),
+            "openpnp_mean_s": sum([r["openpnp_s"] for r in self.rows]) / n if n else 0.0,
+            "builtin_mean_s": sum([r["builtin_s"] for r in self.rows]) / n if n else 0.0,
+            "delta_mean_mm": sum(deltas) / len(deltas) if deltas else None,
+            "delta_max_mm": max(deltas) if deltas else None,
+            "delta_rms_mm": math.sqrt(sum([d * d for d in deltas]) / len(deltas)) if deltas else None
+        }
+
+    def log_report(self, log_fn):
+        s = self.summary()
+        if not s["slots"]:
+            return
+        log_fn("--- Fiducial Comparison (OpenPnP vs built-in, %d slots) ---" % s["slots"])
+        log_fn("  Found:      OpenPnP %d, built-in %d" % (s["openpnp_found"], s["builtin_found"]))
+        log_fn("  Mean time:  OpenPnP %.0f ms, built-in %.0f ms" % (1000.0 * s["openpnp_mean_s"], 1000.0 * s["builtin_mean_s"]))
+        if s["delta_mean_mm"] is not None:
+            log_fn("  Position difference: mean %.3f mm, RMS %.3f mm, max %.3f mm" % (
+                s["delta_mean_mm"], s["delta_rms_mm"], s["delta_max_mm"]))
+
+    def save(self):
+        storage.save_json(self.report_file, {"summary": self.summary(), "slots": self.rows}, "fiducial comparison")
+
+    def _xy(self, loc):
+        if loc is None:
+            return None
+        mm = loc.convertToUnits(LengthUnit.Millimeters)
+        return [mm.getX(), mm.getY()]
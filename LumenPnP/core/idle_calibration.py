@@ -0,0 +1,263 @@
+import os
+import threading
+import time
+import traceback
+from org.openpnp.model import LengthUnit
+from LumenPnP.core import storage
+from LumenPnP.core.cancellation import CancellationToken
+from LumenPnP.core.calibration_history import CalibrationHistory
+from LumenPnP.core.calibration_checkpoint import CalibrationCheckpoint
+from LumenPnP.core.scheduler import CalibrationScheduler
+
+class IdleCalibrationService:
+    """
+    Background service: once the machine has been idle for idle_s, calibrate
+    feeders one at a time in CalibrationScheduler priority order (through
+    SlotCalibrator, so slot and pocket), and yield as soon as anything else
+    uses the machine.
+
+    Activity = machine disabled or busy (OpenPnP jobs and jogs run as
+    machine tasks), the camera moved by someone else, or activity_fn()
+    returning True. While a feeder is being calibrated, a watcher checks
+    every WATCH_S and cancels it (its changes are rolled back); the idle
+    timer then starts over.
+
+    Progress survives restarts: feeders calibrated (by anyone) within
+    REST_S are skipped via the calibration history, and attempts/failures
+    are kept in 'lumen_idle_calibration.json' in the .lumen_pnp storage dir.
+    A failed feeder waits FAILURE_BACKOFF_S (doubling) before its next
+    attempt and rests for REST_S after MAX_FAILURES.
+    """
+    IDLE_S = 300.0 # Idle time before the service starts calibrating
+    POLL_S = 1.0 # Activity polling while waiting
+    WATCH_S = 0.1 # Activity polling while calibrating (yield latency)
+    REST_S = 12 * 3600.0 # A feeder calibrated this recently is left alone
+    MAX_FAILURES = 3 # Failed attempts before a feeder rests for REST_S
+    FAILURE_BACKOFF_S = 600.0 # Wait after a failure, doubled on each further failure
+    YIELD_WAIT_S = 5.0 # yield_now() waits this long for the rollback to finish
+    CHECKPOINT_FILE = "lumen_idle_checkpoint.json" # Keeps the user's resume checkpoint untouched
+
+    def __init__(self, machine, fiducial_part, log_callback=None, idle_s=None, feeder_index=None, board_parts=None,
+                 activity_fn=None, storage_dir=None):
+        """
+        Args:
+            fiducial_part: fiducial Part, resolved by the caller on the EDT
+                (SlotCalibrator.get_fiducial_part can show a dialog)
+            idle_s: idle time before calibrating (default IDLE_S)
+            feeder_index: FeederIndex shared with the GUI (optional)
+            board_parts: part ids of the loaded job (ranked first), resolved
+                by the caller on the EDT
+            activity_fn: extra "machine in use" check (e.g. a GUI calibration running)
+        """
+        self.machine = machine
+        self.fiducial_part = fiducial_part
+        self.log_callback = log_callback
+        self.idle_s = idle_s if idle_s is not None else self.IDLE_S
+        self.feeder_index = feeder_index
+        self.board_parts = board_parts
+        self.activity_fn = activity_fn
+
+        self.storage_dir = storage.storage_dir(storage_dir)
+
+        self.state_file = os.path.join(self.storage_dir, "lumen_idle_calibration.json")
+        self.feeders = {} # feeder_id -> {last_attempt, failures, last_success}
+        self.calibrated = 0 # Feeders calibrated by the service, all sessions
+        self.yields = 0
+        self.load()
+
+        self._shutdown = threading.Event()
+        self._thread = None
+        self._token = None # CancellationToken of the feeder being calibrated
+        self._finished = threading.Event() # Set while no feeder is being calibrated
+        self._finished.set()
+        self._last_xy = None
+        self.idle_since = time.time()
+
+    # --- Control ---
+    def start(self):
+        if self.is_running():
+            return
+        self._shutdown.clear()
+        self.idle_since = time.time()
+        self._last_xy = self._camera_xy()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        self._log("Idle calibration: on (starts after %.0f s idle)." % self.idle_s)
+
+    def stop(self):
+        """Stop the service (the current feeder is cancelled and rolled back)."""
+        self._shutdown.set()
+        self.yield_now()
+        if self._thread is not None:
+            self._thread.join(5.0)
+        self._thread = None
+        self._log("Idle calibration: off.")
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def yield_now(self, wait_s=None):
+        """
+        Cancel the feeder in progress, if any (e.g. a manual calibration
+        starts), and wait up to wait_s (default YIELD_WAIT_S) for its
+        rollback to finish. Returns False if it is still running.
+        """
+        token = self._token
+        if token is not None and not token.is_set():
+            token.set()
+        if threading.current_thread() is self._thread:
+            return True
+        if not self._finished.wait(self.YIELD_WAIT_S if wait_s is None else wait_s):
+            self._log("Idle calibration: still rolling back after %.1f s, the machine may still be moving." % (
+                self.YIELD_WAIT_S if wait_s is None else wait_s))
+            return False
+        return True
+
+    # --- Loop ---
+    def _run(self):
+        while not self._shutdown.is_set():
+            try:
+                if self._machine_active():
+                    self.idle_since = time.time()
+                elif time.time() - self.idle_since >= self.idle_s:
+                    feeder = self._next_feeder()
+                    if feeder is not None:
+                        self._calibrate(feeder)
+                        continue
+            except Exception as e:
+                self._log("Idle calibration error: " + str(e))
+                traceback.print_exc()
+            self._shutdown.wait(self.POLL_S)
+
+    def _next_feeder(self):
+        """Highest priority feeder not calibrated within REST_S and not resting after failures."""
+        history = CalibrationHistory(self.storage_dir) # Same store as SlotCalibrator
+        now = time.time()
+        scheduler = CalibrationScheduler(history, self.board_parts, now)
+        candidates = [f for f in self.machine.getFeeders() if f.isEnabled()]
+        for entry in scheduler.rank(candidates):
+            if entry["age_s"] is not None and entry["age_s"] < self.REST_S:
+                continue
+            state = self.feeders.get(str(entry["feeder"].getId()), {})
+            failures = state.get("failures", 0)
+            since_s = now - (state.get("last_attempt") or 0)
+            if failures >= self.MAX_FAILURES and since_s < self.REST_S:
+                continue
+            if failures > 0 and since_s < self.FAILURE_BACKOFF_S * 2 ** (failures - 1):
+                continue # Backing off, try other feeders first
+            return entry["feeder"]
+        return None
+
+    def _calibrate(self, feeder):
+        from LumenPnP.core.calibration import SlotCalibrator
+        name = str(feeder.getName())
+        self._log("Idle calibration: " + name + "...")
+        token = CancellationToken()
+        self._finished.clear()
+        self._token = token
+        watcher = threading.Thread(target=self._watch, args=(token,))
+        watcher.daemon = True
+        watcher.start()
+
+        t_start = time.time()
+        lines = []
+        try:
+            checkpoint = CalibrationCheckpoint(self.storage_dir, self.CHECKPOINT_FILE)
+            checkpoint.start([feeder.getId()], "full")
+            # Timing export skipped: it would overwrite the user's last run
+            calibrator = SlotCalibrator(self.machine, self.feeder_index, self.storage_dir)
+            calibrator.run_calibration([feeder], lines.append, lambda current, total: None, token,
+                                       mode="full", pipelined=False, rollback_on_stop=True,
+                                       checkpoint=checkpoint, fiducial_part=self.fiducial_part,
+                                       export_timings=False)
+        finally:
+            self._token = None
+            token_was_set = token.is_set()
+            token.set() # Ends the watcher
+            watcher.join(1.0)
+            self._finished.set()
+
+        state = self.feeders.setdefault(str(feeder.getId()), {"last_attempt": None, "failures": 0, "last_success": None})
+        if token_was_set:
+            # Someone needed the machine: changes rolled back, wait for idle again
+            self.yields += 1
+            self.idle_since = time.time()
+            self._log("Idle calibration: yielded during " + name + " (rolled back).")
+        else:
+            state["last_attempt"] = time.time()
+            if self._succeeded(feeder, t_start):
+                state["failures"] = 0
+                state["last_success"] = state["last_attempt"]
+                self.calibrated += 1
+                self._log("Idle calibration: %s done (%.1f s)." % (name, time.time() - t_start))
+            else:
+                state["failures"] += 1
+                self._log("Idle calibration: %s failed (%d/%d)." % (name, state["failures"], self.MAX_FAILURES))
+                for line in lines[-3:]:
+                    self._log("  " + line.strip())
+        self.save()
+        self._last_xy = self._camera_xy() # Our own moves are not activity
+
+    def _watch(self, token):
+        while not token.is_set():
+            if self._shutdown.is_set() or self._machine_busy():
+                token.set()
+                return
+            time.sleep(self.WATCH_S)
+
+    def _succeeded(self, feeder, t_start):
+        last = CalibrationHistory(self.storage_dir).last(feeder.getId())
+        return last is not None and last.get("time", 0) >= t_start and last.get("slot") is not None
+
+    # --- Machine state ---
+    def _machine_busy(self):
+        """Busy with anything but us: disabled, running a task (job, jog), or activity_fn."""
+        try:
+            if hasattr(self.machine, 'isEnabled') and not self.machine.isEnabled():
+                return True
+            if hasattr(self.machine, 'isBusy') and self.machine.isBusy():
+                return True
+        except Exception:
+            return True
+        if self.activity_fn is not None:
+            try:
+                return bool(self.activity_fn())
+            except Exception:
+                return True
+        return False
+
+    def _machine_active(self):
+        """_machine_busy(), or the camera moved since the last poll (manual move)."""
+        busy = self._machine_busy()
+        xy = self._camera_xy()
+        moved = xy is not None and self._last_xy is not None and \
+            (abs(xy[0] - self._last_xy[0]) > 0.01 or abs(xy[1] - self._last_xy[1]) > 0.01)
+        self._last_xy = xy
+        return busy or moved
+
+    def _camera_xy(self):
+        try:
+            loc = self.machine.getDefaultHead().getDefaultCamera().getLocation().convertToUnits(LengthUnit.Millimeters)
+            return loc.getX(), loc.getY()
+        except Exception:
+            return None
+
+    # --- Persistence ---
+    def load(self):
+        data = storage.load_json(self.state_file, "idle calibration state") or {}
+        self.feeders = data.get("feeders", {})
+        self.calibrated = data.get("calibrated", 0)
+        self.yields = data.get("yields", 0)
+
+    def save(self):
+        data = {
+            "feeders": self.feeders,
+            "calibrated": self.calibrated,
+            "yields": self.yields
+        }
+        storage.save_json(self.state_file, data, "idle calibration state")
+
+    def _log(self, msg):
+        if self.log_callback:
+            self.log_callback(msg)
@@ -6,6 +6,7 @@ from java.io import File
 import math
 import os
 import time
+from LumenPnP.core.cancellation import OperationCancelled
 
 class MapNavigator:
     def __init__(self, machine):
@@ -30,6 +31,8 @@ class MapNavigator:
     def scan_bed(self, log_val, progress_callback, stop_event):
         """
         Scans the machine bed by saving tiles to disk, then stitching them.
+        stop_event (CancellationToken or threading.Event) is checked per tile,
+        inside the settle wait and per stitched pixel row.
         """
         camera = self.machine.getDefaultHead().getDefaultCamera()
         if not camera:
@@ -93,6 +96,9 @@ class MapNavigator:
         
         original_loc = camera.getLocation()
         
+        from LumenPnP.core.settle import SettleDetector
+        settle = SettleDetector()
+        
         # 3. SCAN LOOP (Move & Save Only)
         try:
             log_val("Starting Scan Loop (Saving to " + temp_dir + ")...")
@@ -102,7 +108,9 @@ class MapNavigator:
                 if center_y < self.min_y: center_y = self.min_y + (fov_height/2) 
                 
                 for c in range(cols):
-                    if stop_event.is_set(): return
+                    if stop_event.is_set():
+                        log_val("Scan STOPPED by user.")
+                        return
 
                     progress_callback(current_step, total_steps)
                     current_step += 1
@@ -114,11 +122,8 @@ class MapNavigator:
                     target = Location(original_loc.units, center_x, center_y, original_loc.z, 0)
                     camera.moveTo(target, self.machine.getSpeed())
                     
-                    # Settle
-                    time.sleep(0.5) # Increased to reduce motion blur
-                    
-                    # Capture
-                    img = camera.capture()
+                    # Settle & Capture (the settled frame is the tile)
+                    img = settle.wait(camera, "scan tile", cancel=stop_event)
                     
                     # Save Tile
                     tile_name = "tile_{}_{}.png".format(r, c)
@@ -127,10 +132,15 @@ class MapNavigator:
                     
                     # log_val("Saved " + tile_name)
                     
+        except OperationCancelled:
+            log_val("Scan STOPPED by user.")
+            return
         except Exception as e:
             log_val("Scan Logic Error: " + str(e))
             raise e
 
+        settle.log_stats(log_val)
+
         # 4. POST-PROCESSING (Stitch)
         log_val("Scan Complete. Stitching Map...")
         self._stitch_map(temp_dir, rows, cols, w, h, upp_x, upp_y, overlap, log_val, stop_event)
@@ -204,6 +214,8 @@ class MapNavigator:
                             # We will try pixel get/set first. If too slow, optimize later.
                             
                             for ty in range(0, tile_h, step_sample):
+                                if stop_event.is_set():
+                                    raise OperationCancelled("Stopped by user")
                                 for tx in range(0, tile_w, step_sample):
                                     # Get Source Pixel
                                     rgb = img_tile.getRGB(tx, ty)
@@ -216,6 +228,9 @@ class MapNavigator:
                                     if dx >= 0 and dx < final_w and dy >= 0 and dy < final_h:
                                         result_image.setRGB(dx, dy, rgb)
                                         
+                        except OperationCancelled:
+                            log_val("Stitching Aborted")
+                            return
                         except Exception as e_tile:
                             log_val("Error processing tile " + tile_name + ": " + str(e_tile))
                             
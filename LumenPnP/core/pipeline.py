@@ -0,0 +1,76 @@
+import threading
+import traceback
+
+try:
+    from Queue import Queue, Full # Jython 2.7
+except ImportError:
+    from queue import Queue, Full
+
+
+class VisionPipeline:
+    """
+    Producer/consumer pipeline for calibration.
+    The motion thread captures frames and submits jobs; a single vision
+    worker processes them while the gantry is already travelling to the
+    next feeder. One worker + FIFO queue => results are committed in
+    submission order.
+    """
+    _STOP = object()
+
+    def __init__(self, worker_fn, stop_event, max_pending=2, log_callback=None):
+        """
+        Args:
+            worker_fn: called as worker_fn(job) on the worker thread, returns the result
+            stop_event: threading.Event; once set, queued jobs are dropped uncommitted
+            max_pending: bound on queued frames so motion cannot run far ahead
+        """
+        self.worker_fn = worker_fn
+        self.stop_event = stop_event
+        self.log_callback = log_callback
+        self.queue = Queue(max_pending)
+        self.results = [] # (job, result), in commit order
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, job):
+        """Queue a job. Blocks while the queue is full. Returns False if stopped."""
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(job, True, 0.05)
+                return True
+            except Full:
+                continue
+        return False
+
+    def close(self):
+        """Wait for all queued jobs (or drop them if stopped). Returns results."""
+        while True:
+            try:
+                self.queue.put(self._STOP, True, 0.05)
+                break
+            except Full:
+                if not self.thread.is_alive():
+                    break
+        self.thread.join()
+        if self.dropped and self.log_callback:
+            self.log_callback("Pipeline: dropped " + str(self.dropped) + " queued frame(s) after stop.")
+        return self.results
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is self._STOP:
+                break
+            if self.stop_event.is_set():
+                self.dropped += 1
+                continue
+            try:
+                result = self.worker_fn(job)
+            except Exception as e:
+                if self.log_callback:
+                    self.log_callback("Pipeline worker error: " + str(e))
+                traceback.print_exc()
+                result = None
+            self.results.append((job, result))
@@ -0,0 +1,132 @@
+import os
+import time
+from LumenPnP.core import cancellation
+from LumenPnP.core import storage
+
+class RetryMemory:
+    """
+    Which retry step (and parameter) last rescued a detection, per key
+    (e.g. 'pocket:<profile name>'), so the next run tries it first.
+    Stored in 'lumen_retry_memory.json' in the .lumen_pnp storage dir.
+    """
+
+    def __init__(self, storage_dir=None):
+        self.storage_dir = storage.storage_dir(storage_dir)
+
+        self.memory_file = os.path.join(self.storage_dir, "lumen_retry_memory.json")
+        self.entries = {} # key -> {step, param, successes}
+        self.load()
+
+    def get(self, key):
+        return self.entries.get(str(key))
+
+    def record(self, key, step, param):
+        entry = self.entries.setdefault(str(key), {"step": None, "param": None, "successes": 0})
+        entry["step"] = step
+        entry["param"] = list(param) if isinstance(param, tuple) else param
+        entry["successes"] += 1
+
+    def load(self):
+        data = storage.load_json(self.memory_file, "retry memory") or {}
+        self.entries = data.get("entries", {})
+
+    def save(self):
+        storage.save_json(self.memory_file, {"entries": self.entries}, "retry memory")
+
+
+class RetryLadder:
+    """
+    Escalating retries for a failed detection. Steps run in ladder order,
+    each limited by a time budget (checked before every attempt); the step
+    remembered for the key goes first, and inside it the remembered parameter.
+
+    Callers describe the attempts available for a detection as
+    {step name: [(param, fn), ...]}; fn() returns a result or None/False.
+    Steps a caller cannot do (e.g. 'widen' without a mask) are just omitted.
+    """
+    STEPS = ["recapture", "widen", "brightness", "spiral"]
+    BUDGETS_S = {"recapture": 1.5, "widen": 0.5, "brightness": 4.0, "spiral": 8.0}
+    BRIGHTNESS_PRESETS = [30, 50, 70, 90]
+    SPIRAL_STEP_MM = 1.0
+
+    def __init__(self, steps=None, budgets=None, memory=None, cancel=None):
+        """
+        Args:
+            steps: enabled steps in escalation order (default STEPS, [] = no retries)
+            budgets: {step: seconds}, merged over BUDGETS_S
+            memory: RetryMemory (default: loaded from the storage dir)
+            cancel: CancellationToken/threading.Event checked before each attempt
+        """
+        self.steps = list(self.STEPS if steps is None else steps)
+        self.budgets = dict(self.BUDGETS_S)
+        if budgets:
+            self.budgets.update(budgets)
+        self.memory = memory if memory is not None else RetryMemory()
+        self.cancel = cancel
+        self.stats = {} # step -> successes, plus 'failed'
+
+    def enabled(self):
+        return len(self.steps) > 0
+
+    def worst_case_s(self):
+        """Upper estimate of one ladder run: the budgets of the enabled steps."""
+        return sum([self.budgets.get(step, 0) for step in self.steps])
+
+    def run(self, key, attempts, log_fn=None):
+        """Returns (result, step, param), or (None, None, None) if every step failed."""
+        for step in self._ordered_steps(key):
+            options = attempts.get(step)
+            if not options:
+                continue
+            budget = self.budgets.get(step, 0)
+            t_start = time.time()
+            for param, fn in self._ordered_params(key, step, options):
+                cancellation.check(self.cancel)
+                if time.time() - t_start > budget:
+                    if log_fn: log_fn("Retry '%s': %.1f s budget used up." % (step, budget))
+                    break
+                if log_fn: log_fn("Retry '%s' (%s)..." % (step, str(param)))
+                result = fn()
+                if result:
+                    self.memory.record(key, step, param)
+                    self.stats[step] = self.stats.get(step, 0) + 1
+                    return result, step, param
+        self.stats["failed"] = self.stats.get("failed", 0) + 1
+        return None, None, None
+
+    def spiral_offsets(self, step_mm=None, rings=1):
+        """(dx, dy) mm around the start point, ring by ring (8 points per ring)."""
+        step_mm = step_mm or self.SPIRAL_STEP_MM
+        offsets = []
+        for ring in range(1, rings + 1):
+            d = ring * step_mm
+            offsets += [(d, 0.0), (d, d), (0.0, d), (-d, d), (-d, 0.0), (-d, -d), (0.0, -d), (d, -d)]
+        return offsets
+
+    def log_stats(self, log_fn):
+        if not self.stats:
+            return
+        parts = ["%s %d" % (step, self.stats[step]) for step in self.steps if step in self.stats]
+        if "failed" in self.stats:
+            parts.append("failed %d" % self.stats["failed"])
+        log_fn("Retries: " + ", ".join(parts))
+
+    def _ordered_steps(self, key):
+        remembered = self.memory.get(key)
+        if remembered and remembered.get("step") in self.steps:
+            first = remembered["step"]
+            return [first] + [s for s in self.steps if s != first]
+        return list(self.steps)
+
+    def _ordered_params(self, key, step, options):
+        remembered = self.memory.get(key)
+        if not remembered or remembered.get("step") != step:
+            return options
+        wanted = _norm(remembered.get("param"))
+        first = [o for o in options if _norm(o[0]) == wanted]
+        return first + [o for o in options if _norm(o[0]) != wanted]
+
+
+def _norm(param):
+    # JSON turns tuples into lists
+    return list(param) if isinstance(param, (list, tuple)) else param
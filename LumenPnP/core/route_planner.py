@@ -0,0 +1,97 @@
+"""
+Visit order planning for calibration runs.
+Pure Python (no OpenPnP imports) so it only deals with plain XY tuples in mm.
+"""
+import math
+
+
+class RoutePlanner:
+    """
+    Orders a set of XY points to minimise gantry travel.
+    Nearest-neighbour construction followed by 2-opt improvement.
+    The path is open: it starts at `start` and does not return.
+    """
+
+    def __init__(self, max_passes=50):
+        self.max_passes = max_passes
+
+    def plan(self, points, start=None):
+        """
+        Args:
+            points: list of (x, y) tuples (mm)
+            start: (x, y) of the camera before the first move, or None
+        Returns:
+            list of indices into `points`, in visit order
+        """
+        if len(points) < 2:
+            return list(range(len(points)))
+
+        order = self._nearest_neighbour(points, start)
+        return self._two_opt(points, order, start)
+
+    def path_length(self, points, order, start=None):
+        """Total travel (mm) of visiting `points` in `order` from `start`."""
+        total = 0.0
+        prev = start
+        for idx in order:
+            if prev is not None:
+                total += self._dist(prev, points[idx])
+            prev = points[idx]
+        return total
+
+    def _nearest_neighbour(self, points, start):
+        remaining = list(range(len(points)))
+        order = []
+
+        current = start
+        if current is None:
+            # No start position: begin with the first point given
+            current = points[remaining.pop(0)]
+            order.append(0)
+
+        while remaining:
+            best_pos = 0
+            best_dist = None
+            for pos, idx in enumerate(remaining):
+                d = self._dist(current, points[idx])
+                if best_dist is None or d < best_dist:
+                    best_dist = d
+                    best_pos = pos
+            idx = remaining.pop(best_pos)
+            order.append(idx)
+            current = points[idx]
+
+        return order
+
+    def _two_opt(self, points, order, start):
+        # Work on a node list where node 0 is the (fixed) start position
+        nodes = [start] + [points[i] for i in order] if start is not None else [points[i] for i in order]
+        ids = [None] + list(order) if start is not None else list(order)
+        n = len(nodes)
+
+        for _ in range(self.max_passes):
+            improved = False
+            for i in range(1, n - 1):
+                a = nodes[i - 1]
+                b = nodes[i]
+                for j in range(i + 1, n):
+                    c = nodes[j]
+                    # Reversing [i..j]: edge (a,b) becomes (a,c), edge (c,d) becomes (b,d)
+                    delta = self._dist(a, c) - self._dist(a, b)
+                    if j + 1 < n:
+                        d = nodes[j + 1]
+                        delta += self._dist(b, d) - self._dist(c, d)
+                    if delta < -1e-9:
+                        nodes[i:j + 1] = nodes[i:j + 1][::-1]
+                        ids[i:j + 1] = ids[i:j + 1][::-1]
+                        b = nodes[i]
+                        improved = True
+            if not improved:
+                break
+
+        if start is not None:
+            return ids[1:]
+        return ids
+
+    def _dist(self, p, q):
+        return math.sqrt((p[0] - q[0]) ** 2 + (p[1] - q[1]) ** 2)
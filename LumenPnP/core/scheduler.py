@@ -0,0 +1,149 @@
+import time
+
+class CalibrationScheduler:
+    """
+    Picks which feeders to calibrate inside a time budget (e.g. the two
+    minutes before a job). Feeders are ranked by:
+        staleness   time since the last calibration (saturates at STALE_FULL_S)
+        drift       RMS of the drift measured by past calibrations
+        board       the part is placed by the loaded job
+    and planned in priority order while their predicted times fit the budget.
+
+    Predicted time per feeder = mean of its measured durations in the
+    calibration history, else the mean over all feeders, else DEFAULT_FEEDER_S.
+    """
+    STALE_FULL_S = 7 * 24 * 3600.0 # A week old counts as fully stale
+    DRIFT_FULL_MM = 0.2 # Drift RMS that counts as fully unstable
+    WEIGHT_STALENESS = 1.0
+    WEIGHT_DRIFT = 1.0
+    WEIGHT_BOARD = 2.0 # Parts of the loaded job first
+    DEFAULT_FEEDER_S = 8.0 # No measured timing at all yet
+    RESERVE_S = 5.0 # Kept for the final vision drain, retries and config save
+    HISTORY_COUNT = 5 # Past entries used for drift and duration
+
+    def __init__(self, history, board_parts=None, now=None):
+        """
+        Args:
+            history: CalibrationHistory
+            board_parts: part ids/names placed by the loaded job (None = unknown)
+        """
+        self.history = history
+        self.board_parts = set([str(p) for p in board_parts]) if board_parts else set()
+        self.now = now if now is not None else time.time()
+        self.default_s = self._mean_duration_all()
+
+    def score(self, feeder):
+        """Priority entry: {feeder, score, age_s, drift_mm, on_board, predicted_s}"""
+        fid = feeder.getId()
+        last = self.history.last(fid)
+        drift = self.history.drift_stats(fid, self.HISTORY_COUNT)
+        if last is None or last.get("predicted"):
+            age_s, stale = None, 1.0 # Never calibrated, or only predicted by bank mode
+        else:
+            age_s = max(0.0, self.now - last.get("time", 0))
+            stale = min(1.0, age_s / self.STALE_FULL_S)
+        if drift is None:
+            drift_mm, unstable = None, 1.0 # Unknown counts as unstable
+        else:
+            drift_mm = drift["rms"]
+            unstable = min(1.0, drift_mm / self.DRIFT_FULL_MM)
+        on_board = self._on_board(feeder)
+        return {
+            "feeder": feeder,
+            "score": self.WEIGHT_STALENESS * stale + self.WEIGHT_DRIFT * unstable + (self.WEIGHT_BOARD if on_board else 0.0),
+            "age_s": age_s,
+            "drift_mm": drift_mm,
+            "on_board": on_board,
+            "predicted_s": self.predict_s(feeder)
+        }
+
+    def rank(self, feeders):
+        """Score entries, highest priority first (stable for equal scores)."""
+        entries = [self.score(f) for f in feeders]
+        entries.sort(key=lambda e: -e["score"])
+        return entries
+
+    def plan(self, feeders, budget_s):
+        """
+        (selected, skipped) feeder lists. Selected feeders are in priority
+        order; planning stops at the first feeder that no longer fits.
+        budget_s None = no limit.
+        """
+        ranked = self.rank(feeders)
+        if budget_s is None:
+            return [e["feeder"] for e in ranked], []
+        available = budget_s - self.RESERVE_S
+        used = 0.0
+        selected = []
+        for idx, entry in enumerate(ranked):
+            if used + entry["predicted_s"] > available:
+                return selected, [e["feeder"] for e in ranked[idx:]]
+            used += entry["predicted_s"]
+            selected.append(entry["feeder"])
+        return selected, []
+
+    def fits(self, feeder, elapsed_s, budget_s):
+        """True if the feeder's predicted time still fits what is left of the budget."""
+        if budget_s is None:
+            return True
+        return elapsed_s + self.predict_s(feeder) <= budget_s - self.RESERVE_S
+
+    def remaining_s(self, elapsed_s, budget_s):
+        """Seconds of the budget still usable (RESERVE_S kept back), None = no limit."""
+        if budget_s is None:
+            return None
+        return budget_s - self.RESERVE_S - elapsed_s
+
+    def predict_s(self, feeder):
+        durations = self._durations(feeder.getId())
+        if durations:
+            return sum(durations) / len(durations)
+        return self.default_s
+
+    def log_plan(self, selected, skipped, budget_s, log_fn):
+        predicted = sum([self.predict_s(f) for f in selected])
+        log_fn("Budget mode: %d feeders planned (%.0f s predicted of %.0f s), %d left for later." % (
+            len(selected), predicted, budget_s, len(skipped)))
+
+    def _durations(self, feeder_id):
+        entries = self.history.get_entries(feeder_id)
+        return [e["duration"] for e in entries if e.get("duration")][-self.HISTORY_COUNT:]
+
+    def _mean_duration_all(self):
+        durations = []
+        for fid in self.history.feeders.keys():
+            durations += self._durations(fid)
+        if not durations:
+            return self.DEFAULT_FEEDER_S
+        return sum(durations) / len(durations)
+
+    def _on_board(self, feeder):
+        if not self.board_parts:
+            return False
+        part = feeder.getPart()
+        if part is None:
+            return False
+        return str(part.getId()) in self.board_parts or str(part.getName()) in self.board_parts
+
+
+def job_part_ids(job):
+    """Part ids placed by an OpenPnP Job (enabled placements), or an empty set."""
+    parts = set()
+    if job is None:
+        return parts
+    try:
+        for board_location in job.getBoardLocations():
+            if hasattr(board_location, 'isEnabled') and not board_location.isEnabled():
+                continue
+            board = board_location.getBoard()
+            if board is None:
+                continue
+            for placement in board.getPlacements():
+                if hasattr(placement, 'isEnabled') and not placement.isEnabled():
+                    continue
+                part = placement.getPart()
+                if part is not None:
+                    parts.add(str(part.getId()))
+    except Exception as e:
+        print("Error reading job parts: " + str(e))
+    return parts
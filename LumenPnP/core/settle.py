@@ -0,0 +1,165 @@
+from org.opencv.core import Mat, Size, Core, CvType, MatOfDouble
+from org.opencv.imgproc import Imgproc
+from org.openpnp.util import OpenCvUtils
+import time
+from LumenPnP.core import cancellation
+
+
+class SettleDetector:
+    """
+    Waits for the camera image to stop changing after a move or a camera
+    setting change, instead of sleeping a fixed time.
+
+    With OpenPnP 2 motion planning, moveTo() may return before the axes
+    have stopped (or even started), and two stale frames would then look
+    settled. So the wait first blocks on the motion planner until the
+    machine is at standstill (as Camera.settleAndCapture does), then
+    samples frames.
+
+    Frames are grabbed until two consecutive (downsampled, gray) frames
+    differ by less than `diff_threshold` grey levels on average AND the
+    sharpness (Laplacian variance) changed by less than
+    `sharpness_tolerance` (relative). `timeout` caps the wait.
+
+    Per-call-site statistics are kept under the `label` given to wait().
+    A `cancel` token/event passed to wait() is checked on every frame.
+    """
+
+    def __init__(self, diff_threshold=2.0, sharpness_tolerance=0.05, min_wait=0.02, timeout=1.0, sample_width=160):
+        self.diff_threshold = diff_threshold
+        self.sharpness_tolerance = sharpness_tolerance
+        self.min_wait = min_wait
+        self.timeout = timeout
+        self.sample_width = sample_width
+        self.stats = {} # label -> {count, total, max, timeouts, frames}
+
+    def wait(self, camera, label="settle", timeout=None, cancel=None):
+        """
+        Block until the camera image is stable.
+        Returns the last captured frame (BufferedImage), which callers can use
+        directly instead of capturing again.
+        Raises OperationCancelled if `cancel` gets set meanwhile.
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        t_start = time.time()
+        self.wait_for_stillstand(camera)
+        deadline = time.time() + timeout
+
+        if self.min_wait > 0:
+            cancellation.sleep(cancel, self.min_wait)
+
+        frame = None
+        prev_gray = None
+        prev_sharp = None
+        settled = False
+        frames = 0
+
+        try:
+            while True:
+                cancellation.check(cancel)
+                frame = camera.capture()
+                frames += 1
+                gray = self._to_small_gray(frame)
+                sharp = self._sharpness(gray)
+
+                if prev_gray is not None:
+                    diff = self._mean_abs_diff(prev_gray, gray)
+                    prev_gray.release()
+                    sharp_ok = prev_sharp <= 0 or abs(sharp - prev_sharp) / prev_sharp <= self.sharpness_tolerance
+                    if diff < self.diff_threshold and sharp_ok:
+                        gray.release()
+                        prev_gray = None
+                        settled = True
+                        break
+
+                prev_gray = gray
+                prev_sharp = sharp
+
+                if time.time() >= deadline:
+                    break
+        finally:
+            if prev_gray is not None:
+                prev_gray.release()
+
+        self._record(label, time.time() - t_start, settled, frames)
+        return frame
+
+    def wait_for_stillstand(self, camera):
+        """
+        Block until the motion planner has completed all motion (OpenPnP 2).
+        Returns False without waiting when the camera has no planner
+        (OpenPnP 1.x, sim camera).
+        """
+        try:
+            from org.openpnp.spi import MotionPlanner
+            planner = camera.getHead().getMachine().getMotionPlanner()
+        except:
+            return False
+        if planner is None:
+            return False
+        planner.waitForCompletion(camera, MotionPlanner.CompletionType.WaitForStillstand)
+        return True
+
+    def reset_stats(self):
+        self.stats = {}
+
+    def log_stats(self, log_fn):
+        """Log one line per call site: count, mean/max wait, frames, timeouts."""
+        for label in sorted(self.stats.keys()):
+            st = self.stats[label]
+            if st["count"] == 0:
+                continue
+            mean_ms = 1000.0 * st["total"] / st["count"]
+            max_ms = 1000.0 * st["max"]
+            log_fn("Settle [%s]: n=%d, mean=%.0f ms, max=%.0f ms, frames/wait=%.1f, timeouts=%d" % (
+                label, st["count"], mean_ms, max_ms, float(st["frames"]) / st["count"], st["timeouts"]))
+
+    def _record(self, label, elapsed, settled, frames):
+        st = self.stats.get(label)
+        if st is None:
+            st = {"count": 0, "total": 0.0, "max": 0.0, "timeouts": 0, "frames": 0}
+            self.stats[label] = st
+        st["count"] += 1
+        st["total"] += elapsed
+        st["frames"] += frames
+        if elapsed > st["max"]:
+            st["max"] = elapsed
+        if not settled:
+            st["timeouts"] += 1
+
+    def _to_small_gray(self, buffered_image):
+        mat = OpenCvUtils.toMat(buffered_image)
+        gray = Mat()
+        if mat.channels() == 1:
+            mat.copyTo(gray)
+        else:
+            Imgproc.cvtColor(mat, gray, Imgproc.COLOR_BGR2GRAY)
+        mat.release()
+
+        w = gray.width()
+        if w > self.sample_width:
+            scale = float(self.sample_width) / w
+            small = Mat()
+            Imgproc.resize(gray, small, Size(self.sample_width, int(gray.height() * scale)), 0, 0, Imgproc.INTER_AREA)
+            gray.release()
+            return small
+        return gray
+
+    def _mean_abs_diff(self, a, b):
+        diff = Mat()
+        Core.absdiff(a, b, diff)
+        value = Core.mean(diff).val[0]
+        diff.release()
+        return value
+
+    def _sharpness(self, gray):
+        lap = Mat()
+        Imgproc.Laplacian(gray, lap, CvType.CV_64F)
+        mean = MatOfDouble()
+        std = MatOfDouble()
+        Core.meanStdDev(lap, mean, std)
+        sd = std.toArray()[0]
+        lap.release()
+        return sd * sd
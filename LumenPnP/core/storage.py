@@ -0,0 +1,41 @@
+import json
+import os
+
+DIR_NAME = ".lumen_pnp" # Under the user's home: profiles, history, checkpoints, timings
+
+
+def storage_dir(override=None):
+    """
+    Directory the LumenPnP JSON files live in: `override` when given (sim,
+    benchmarks, scratch runs), else ~/.lumen_pnp. Created if missing.
+    """
+    path = override if override is not None else os.path.join(os.path.expanduser("~"), DIR_NAME)
+    if not os.path.exists(path):
+        try:
+            os.makedirs(path)
+        except OSError:
+            pass # Reported by the first load/save
+    return path
+
+
+def load_json(path, what):
+    """Parsed JSON file, or None if it does not exist or cannot be read (error printed)."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print("Error loading " + what + ": " + str(e))
+        return None
+
+
+def save_json(path, data, what):
+    """Write data as indented JSON. Returns False (error printed) on failure."""
+    try:
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=4)
+        return True
+    except Exception as e:
+        print("Error saving " + what + ": " + str(e))
+        return False
@@ -0,0 +1,41 @@
+import math
+import pytest
+from LumenPnP.core.bank_fit import SimilarityTransform, fit_similarity, pick_reference_indices
+
+
+def test_fit_recovers_an_exact_similarity():
+    angle = math.radians(0.7)
+    scale = 1.002
+    truth = SimilarityTransform(scale * math.cos(angle), scale * math.sin(angle), 120.5, -33.25)
+    src = [(slot * 15.0, 0.0) for slot in (1, 7, 13, 19, 25)]
+    dst = [truth.apply(p) for p in src]
+
+    fit = fit_similarity(src, dst)
+    assert fit.a == pytest.approx(truth.a, abs=1e-12)
+    assert fit.b == pytest.approx(truth.b, abs=1e-12)
+    assert fit.tx == pytest.approx(truth.tx, abs=1e-9)
+    assert fit.ty == pytest.approx(truth.ty, abs=1e-9)
+    assert fit.rotation_deg() == pytest.approx(0.7)
+    assert fit.scale() == pytest.approx(scale)
+    assert fit.rms(src, dst) == pytest.approx(0.0, abs=1e-9)
+
+
+def test_residuals_flag_the_moved_point():
+    src = [(15.0, 0.0), (180.0, 0.0), (375.0, 0.0)]
+    dst = [(100.0, 50.0), (265.0, 50.0), (460.0, 50.0)]
+    dst[1] = (265.0, 50.3) # Middle feeder knocked 0.3 mm
+    residuals = fit_similarity(src, dst).residuals(src, dst)
+    assert residuals[1] == max(residuals)
+
+
+def test_fit_needs_two_distinct_points():
+    with pytest.raises(ValueError):
+        fit_similarity([(0.0, 0.0)], [(1.0, 1.0)])
+    with pytest.raises(ValueError):
+        fit_similarity([(1.0, 1.0), (1.0, 1.0)], [(0.0, 0.0), (2.0, 2.0)])
+
+
+def test_reference_indices_include_both_ends():
+    assert pick_reference_indices(25, 3) == [0, 12, 24]
+    assert pick_reference_indices(2, 3) == [0, 1]
+    assert pick_reference_indices(10, 1) == [0]
@@ -0,0 +1,42 @@
+from LumenPnP.core.calibration_history import CalibrationHistory
+
+
+def test_drift_and_offset_stats(tmp_path):
+    history = CalibrationHistory(str(tmp_path))
+    assert history.drift_stats("F1") is None
+    history.record("F1", (10, 20), (1.0, 2.0), residual=0.3)
+    history.record("F1", (10, 20), (1.2, 2.0), residual=0.4)
+    drift = history.drift_stats("F1")
+    assert drift["n"] == 2
+    assert abs(drift["mean"] - 0.35) < 1e-9
+    assert abs(drift["rms"] - (0.125 ** 0.5)) < 1e-9
+    offsets = history.offset_stats("F1")
+    assert offsets["mean"] == (1.1, 2.0)
+
+
+def test_predicted_entries_are_not_measurements(tmp_path):
+    history = CalibrationHistory(str(tmp_path))
+    history.record("F1", (10, 20), residual=0.05)
+    assert history.is_measured("F1")
+    history.record("F1", (10.1, 20), residual=0.1, predicted=True)
+    assert history.has_history("F1")
+    assert not history.is_measured("F1")
+
+
+def test_annotate_before_and_after_record(tmp_path):
+    history = CalibrationHistory(str(tmp_path))
+    history.annotate("F1", fit_residual=0.02) # Pipelined: pocket recorded later
+    history.record("F1", (10, 20))
+    assert history.last("F1")["fit_residual"] == 0.02
+    history.annotate("F1", fit_residual=0.05)
+    assert history.last("F1")["fit_residual"] == 0.05
+
+
+def test_history_survives_a_reload_and_is_capped(tmp_path):
+    history = CalibrationHistory(str(tmp_path))
+    for k in range(CalibrationHistory.MAX_ENTRIES + 5):
+        history.record("F1", (k, 0), timestamp=float(k))
+    history.save()
+    entries = CalibrationHistory(str(tmp_path)).get_entries("F1")
+    assert len(entries) == CalibrationHistory.MAX_ENTRIES
+    assert entries[0]["time"] == 5.0
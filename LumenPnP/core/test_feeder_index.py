@@ -0,0 +1,59 @@
+from LumenPnP.core.feeder_index import FeederIndex, NO_SLOT, parse_slot
+
+
+class _Feeder:
+    def __init__(self, feeder_id, name):
+        self.feeder_id = feeder_id
+        self.name = name
+
+    def getId(self):
+        return self.feeder_id
+
+    def getName(self):
+        return self.name
+
+
+def test_lenient_parse():
+    assert parse_slot("Slot 12") == 12
+    assert parse_slot("slot: 7") == 7
+    assert parse_slot("Slot12") == 12
+    assert parse_slot("22") == 22
+    assert parse_slot("0402 10k (12)") == 12
+    assert parse_slot("R 22k") == 22 # Bare number, display only
+    assert parse_slot("0603 cap") is None # Part size, above max_slot
+    assert parse_slot("Slotted 0603 cap") is None
+    assert parse_slot("") is None
+    assert parse_slot(None) is None
+
+
+def test_strict_parse():
+    assert parse_slot("Slot 12", strict=True) == 12
+    assert parse_slot("0402 10k (12)", strict=True) == 12
+    assert parse_slot("R 22k", strict=True) is None
+    assert parse_slot("22", strict=True) is None
+    assert parse_slot("Slotted 0603 cap", strict=True) is None
+    assert parse_slot("Slot 60", strict=True) is None # Above the slot count
+    assert parse_slot("Slot 60", max_slot=60, strict=True) == 60
+    assert parse_slot("(0)", strict=True) is None
+
+
+def test_index_caches_and_reparses_renamed_feeders():
+    index = FeederIndex()
+    feeder = _Feeder("F1", "R 22k")
+    assert index.slot_of(feeder) == 22
+    assert index.strict_slot_of(feeder) is None
+    assert index.slot_of(feeder) == 22
+    assert index.stats == {"parsed": 1, "cached": 1}
+
+    feeder.name = "Slot 3 R 22k"
+    assert index.slot_of(feeder) == 3
+    assert index.strict_slot_of(feeder) == 3
+    assert index.stats["parsed"] == 2
+
+
+def test_sort_key_puts_unparsed_last():
+    index = FeederIndex()
+    feeders = [_Feeder("A", "tray"), _Feeder("B", "Slot 9"), _Feeder("C", "Slot 2")]
+    feeders.sort(key=index.sort_key)
+    assert [f.getId() for f in feeders] == ["C", "B", "A"]
+    assert index.sort_key(feeders[-1]) == NO_SLOT
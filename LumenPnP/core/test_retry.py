@@ -0,0 +1,55 @@
+import pytest
+from LumenPnP.core.cancellation import CancellationToken, OperationCancelled
+from LumenPnP.core.retry import RetryLadder, RetryMemory
+
+
+def _attempts(calls, succeed_on):
+    def attempt(step, param):
+        def fn():
+            calls.append((step, param))
+            return "found" if (step, param) == succeed_on else None
+        return (param, fn)
+    return {
+        "recapture": [attempt("recapture", 1)],
+        "brightness": [attempt("brightness", b) for b in RetryLadder.BRIGHTNESS_PRESETS],
+    }
+
+
+def test_ladder_escalates_and_remembers(tmp_path):
+    memory = RetryMemory(str(tmp_path))
+    ladder = RetryLadder(memory=memory)
+    calls = []
+    result, step, param = ladder.run("pocket:x", _attempts(calls, ("brightness", 70)))
+    assert (result, step, param) == ("found", "brightness", 70)
+    assert calls == [("recapture", 1), ("brightness", 30), ("brightness", 50), ("brightness", 70)]
+
+    # Next time the remembered step and preset go first
+    memory.save()
+    ladder = RetryLadder(memory=RetryMemory(str(tmp_path)))
+    calls = []
+    assert ladder.run("pocket:x", _attempts(calls, ("brightness", 70)))[1] == "brightness"
+    assert calls == [("brightness", 70)]
+
+
+def test_all_steps_failing(tmp_path):
+    ladder = RetryLadder(memory=RetryMemory(str(tmp_path)))
+    assert ladder.run("pocket:x", _attempts([], None)) == (None, None, None)
+    assert ladder.stats["failed"] == 1
+
+
+def test_disabled_ladder_and_worst_case(tmp_path):
+    memory = RetryMemory(str(tmp_path))
+    assert not RetryLadder(steps=[], memory=memory).enabled()
+    assert RetryLadder(steps=[], memory=memory).worst_case_s() == 0
+    ladder = RetryLadder(steps=["recapture", "spiral"], budgets={"spiral": 2.0}, memory=memory)
+    assert ladder.worst_case_s() == RetryLadder.BUDGETS_S["recapture"] + 2.0
+
+
+def test_cancel_stops_the_ladder(tmp_path):
+    token = CancellationToken()
+    token.set()
+    ladder = RetryLadder(memory=RetryMemory(str(tmp_path)), cancel=token)
+    calls = []
+    with pytest.raises(OperationCancelled):
+        ladder.run("pocket:x", _attempts(calls, ("recapture", 1)))
+    assert calls == []
@@ -0,0 +1,38 @@
+import random
+from LumenPnP.core.route_planner import RoutePlanner
+
+
+def _grid(seed, count):
+    rng = random.Random(seed)
+    return [(rng.uniform(0, 400), rng.uniform(0, 300)) for _ in range(count)]
+
+
+def test_plan_is_a_permutation():
+    planner = RoutePlanner()
+    for seed in range(20):
+        points = _grid(seed, 3 + seed)
+        for start in (None, (0.0, 0.0)):
+            order = planner.plan(points, start)
+            assert sorted(order) == list(range(len(points)))
+
+
+def test_two_opt_never_worse_than_nearest_neighbour():
+    planner = RoutePlanner()
+    for seed in range(20):
+        points = _grid(seed, 25)
+        start = (0.0, 0.0)
+        nn = planner._nearest_neighbour(points, start)
+        planned = planner.plan(points, start)
+        assert planner.path_length(points, planned, start) <= planner.path_length(points, nn, start) + 1e-9
+
+
+def test_collinear_points_are_visited_in_line():
+    planner = RoutePlanner()
+    points = [(30.0, 0.0), (10.0, 0.0), (40.0, 0.0), (20.0, 0.0)]
+    assert planner.plan(points, start=(0.0, 0.0)) == [1, 3, 0, 2]
+
+
+def test_small_inputs():
+    planner = RoutePlanner()
+    assert planner.plan([]) == []
+    assert planner.plan([(5.0, 5.0)]) == [0]
@@ -0,0 +1,71 @@
+from LumenPnP.core.calibration_history import CalibrationHistory
+from LumenPnP.core.scheduler import CalibrationScheduler
+
+NOW = 1000000.0
+
+
+class _Part:
+    def __init__(self, part_id):
+        self.part_id = part_id
+
+    def getId(self):
+        return self.part_id
+
+    def getName(self):
+        return self.part_id
+
+
+class _Feeder:
+    def __init__(self, feeder_id, part_id=None):
+        self.feeder_id = feeder_id
+        self.part = _Part(part_id) if part_id else None
+
+    def getId(self):
+        return self.feeder_id
+
+    def getPart(self):
+        return self.part
+
+
+def _history(tmp_path):
+    history = CalibrationHistory(str(tmp_path))
+    day = 24 * 3600.0
+    # F1: fresh and stable, F2: a week old and drifting, F3: only predicted by bank mode
+    history.record("F1", (0, 0), residual=0.01, timestamp=NOW - 3600.0, duration=4.0)
+    history.record("F2", (0, 0), residual=0.3, timestamp=NOW - 7 * day, duration=6.0)
+    history.record("F3", (0, 0), residual=0.01, timestamp=NOW - 3600.0, predicted=True)
+    return history
+
+
+def test_rank_puts_stale_drifting_and_predicted_first(tmp_path):
+    scheduler = CalibrationScheduler(_history(tmp_path), now=NOW)
+    feeders = [_Feeder("F1"), _Feeder("F2"), _Feeder("F3")]
+    ranked = [e["feeder"].getId() for e in scheduler.rank(feeders)]
+    assert ranked[-1] == "F1"
+    assert scheduler.score(feeders[2])["age_s"] is None # Predicted counts as never calibrated
+
+
+def test_board_parts_come_first(tmp_path):
+    scheduler = CalibrationScheduler(_history(tmp_path), board_parts=["R10k"], now=NOW)
+    feeders = [_Feeder("F2"), _Feeder("F1", "R10k")]
+    assert scheduler.rank(feeders)[0]["feeder"].getId() == "F1"
+
+
+def test_plan_stops_at_the_budget(tmp_path):
+    scheduler = CalibrationScheduler(_history(tmp_path), now=NOW)
+    feeders = [_Feeder("F1"), _Feeder("F2"), _Feeder("F3")]
+    # Predicted: F2 6 s, F3 5 s (mean of all), F1 4 s; RESERVE_S 5 s
+    selected, skipped = scheduler.plan(feeders, 5.0 + 6.0 + 5.0)
+    assert [f.getId() for f in selected] == ["F2", "F3"]
+    assert [f.getId() for f in skipped] == ["F1"]
+
+    selected, skipped = scheduler.plan(feeders, None)
+    assert len(selected) == 3 and skipped == []
+
+
+def test_remaining_and_fits(tmp_path):
+    scheduler = CalibrationScheduler(_history(tmp_path), now=NOW)
+    assert scheduler.remaining_s(10.0, 60.0) == 60.0 - scheduler.RESERVE_S - 10.0
+    assert scheduler.remaining_s(10.0, None) is None
+    assert scheduler.fits(_Feeder("F1"), 50.0, 60.0)
+    assert not scheduler.fits(_Feeder("F1"), 52.0, 60.0)
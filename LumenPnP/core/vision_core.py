@@ -1,144 +1,178 @@
-from org.opencv.core import Mat, Scalar, Point, Size, MatOfPoint, Rect
+from org.opencv.core import Mat, Scalar, Point, Size, MatOfPoint, Rect, CvType
 from org.opencv.imgproc import Imgproc
 from org.opencv.imgcodecs import Imgcodecs
 from org.openpnp.util import OpenCvUtils
 from java.awt.image import BufferedImage
 import math
+import threading
+from collections import OrderedDict, namedtuple
 
 class VisionEngine:
+    # Masks and blur kernels, reused while frame geometry and profile stay the same
+    CACHE_SIZE = 16 # Entries (LRU)
+
     def __init__(self):
-        pass
+        self._cache = OrderedDict() # key -> {"mask": Mat or None, "ksize": Size or None}
+        self._cache_lock = threading.Lock() # Engines are shared with the pipeline worker
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.pool = MatPool() # Per-frame working Mats (processed, masked, gray, bin, hierarchy)
 
-    def process_image(self, buffered_image, profile):
+    def process_image(self, buffered_image, profile, target=None, roi=None):
         """
-        Processes a BufferedImage using the given VisionProfile.
+        Processes a BufferedImage using the given VisionProfile, with both
+        annotated views rendered (see detect() to render fewer or none).
         Returns:
             found (bool): True if target found
             center (Point): Center of the target (in pixel coords) or None
             annotated_image (BufferedImage): Image with drawing for debug
-            stats (dict): Info about the found target (area, w, h)
+            stats (dict): Info about the found target (area, w, h, and the
+                sub-pixel centroid_x/centroid_y of its contour)
+            annotated_bin (BufferedImage): Threshold view with the same drawing
+        """
+        result = self.detect(buffered_image, profile, target, roi)
+        try:
+            return result.found, result.center, result.image("color"), result.stats, result.image("binary")
+        finally:
+            result.release()
+
+    def detect(self, buffered_image, profile, target=None, roi=None):
+        """
+        Detection only: returns a VisionResult. Nothing is drawn or converted
+        back to a BufferedImage until result.image(view) is called, so
+        calibration (headless) pays for no annotation at all.
+        target: (x, y) pixel where the part is expected. The mask and the
+            candidate scoring are centred on it. Defaults to the image center.
+        roi: (x, y, w, h) pixel rectangle. Only this part of the frame is
+            processed (clipped to the frame); results stay in full-frame pixels.
+            The mask's bounding box limits the processed area the same way.
+
+        The result holds native Mats (source frame, threshold image) for
+        rendering: call result.release() when done with it. Everything
+        else is returned to the pool or released before detect() returns.
         """
         # Convert BufferedImage to Mat
         mat_src = OpenCvUtils.toMat(buffered_image)
-        
-        # Determine ROI (maybe center crop? for now execute on full image)
+        pooled = [] # From self.pool, given back below (except the result's threshold image)
+        temps = [] # Released below (submat header, contours)
+        result = None
+        try:
+            result = self._detect_mat(mat_src, profile, target, roi, pooled, temps)
+            return result
+        finally:
+            keep = result.mat_bin if result is not None else None
+            for mat in pooled:
+                if mat is not keep:
+                    self.pool.give(mat)
+            for mat in temps:
+                mat.release()
+            if result is None:
+                mat_src.release() # Failed: nobody owns the frame
+
+    def _detect_mat(self, mat_src, profile, target, roi, pooled, temps):
+        plan = profile.compile()
+        if target is not None:
+            target_x, target_y = float(target[0]), float(target[1])
+        else:
+            target_x, target_y = mat_src.width() / 2.0, mat_src.height() / 2.0
+
+        # Work area: the caller's ROI and the mask's bounding box, intersected.
+        # Only this view of the frame (zero-copy submat) is processed; the
+        # offsets map results back to full-frame pixels.
+        width, height = mat_src.width(), mat_src.height()
+        roi_rect = self._clip_roi(roi, width, height)
+        if roi_rect is not None:
+            bounds = (roi_rect.x, roi_rect.y, roi_rect.x + roi_rect.width, roi_rect.y + roi_rect.height)
+        else:
+            bounds = (0, 0, width, height)
+
+        mask_type = plan.mask_type
+        cx, cy = int(target_x), int(target_y)
+        mw, mh, radius = plan.mask_width, plan.mask_height, plan.radius
+        if mask_type == "RECT":
+            x0, y0 = cx - int(mw/2), cy - int(mh/2)
+            bounds = self._intersect(bounds, (x0, y0, x0 + mw, y0 + mh))
+        elif mask_type == "CIRCLE":
+            bounds = self._intersect(bounds, (cx - radius, cy - radius, cx + radius + 1, cy + radius + 1))
+
+        if bounds[2] - bounds[0] < 2 or bounds[3] - bounds[1] < 2:
+            # Mask entirely outside the frame/ROI: nothing to search
+            return VisionResult(False, None, {}, mat_src, None, None, roi_rect, [], None, self.pool)
+
+        if bounds == (0, 0, width, height):
+            work_rect = None
+            mat_work = mat_src
+        else:
+            work_rect = Rect(bounds[0], bounds[1], bounds[2] - bounds[0], bounds[3] - bounds[1])
+            mat_work = mat_src.submat(work_rect)
+            temps.append(mat_work)
+        off_x, off_y = bounds[0], bounds[1]
         
         # 1. Pre-Processing (Brightness / Contrast)
-        mat_src_processed = Mat()
-        if hasattr(profile, 'brightness') or hasattr(profile, 'contrast'):
-            # alpha = 1.0 + (contrast / 100.0)
-            # beta = brightness
-            alpha = 1.0 + (getattr(profile, 'contrast', 0) / 100.0)
-            beta = float(getattr(profile, 'brightness', 0))
-            mat_src.convertTo(mat_src_processed, -1, alpha, beta)
+        mat_src_processed = self._scratch(pooled)
+        if plan.adjust:
+            mat_work.convertTo(mat_src_processed, -1, plan.alpha, plan.beta)
         else:
-            mat_src.copyTo(mat_src_processed)
+            mat_work.copyTo(mat_src_processed)
             
         # 1.5 Masking
-        # Apply mask to mat_src_processed
-        mask_type = getattr(profile, 'mask_type', "NONE")
-        if mask_type != "NONE":
-            mask = Mat.zeros(mat_src.size(), mat_src.type())
-            # White ROI
-            cx, cy = int(mat_src.width()/2), int(mat_src.height()/2)
-            mw = int(getattr(profile, 'mask_width', 600))
-            mh = int(getattr(profile, 'mask_height', 600))
-            
-            color_white = Scalar(255, 255, 255)
-            
-            if mask_type == "RECT":
-                x = cx - mw/2
-                y = cy - mh/2
-                Imgproc.rectangle(mask, Rect(int(x), int(y), int(mw), int(mh)), color_white, -1)
-            elif mask_type == "CIRCLE":
-                radius = int(mw/2)
-                Imgproc.circle(mask, Point(cx, cy), radius, color_white, -1)
-                
+        # RECT: the crop is the mask. CIRCLE: mask the corners of the crop only.
+        shapes = self._shapes(mat_work, mask_type, mw, mh, plan.blur_k, (cx - off_x, cy - off_y), radius)
+        if shapes["mask"] is not None:
             # Combine src with mask
-            mat_masked = Mat()
+            mat_masked = self._scratch(pooled)
             from org.opencv.core import Core
-            Core.bitwise_and(mat_src_processed, mask, mat_masked)
+            Core.bitwise_and(mat_src_processed, shapes["mask"], mat_masked)
             mat_src_processed = mat_masked
         
         # 2. Convert to Gray
-        mat_gray = Mat()
+        mat_gray = self._scratch(pooled)
         Imgproc.cvtColor(mat_src_processed, mat_gray, Imgproc.COLOR_BGR2GRAY)
         
         # 2. Blur (Optional)
-        if profile.blur_size > 0:
-            k = profile.blur_size | 1 # Ensure odd
-            Imgproc.GaussianBlur(mat_gray, mat_gray, Size(k, k), 0)
+        if shapes["ksize"] is not None:
+            Imgproc.GaussianBlur(mat_gray, mat_gray, shapes["ksize"], 0)
             
         # 3. Threshold
-        mat_bin = Mat()
-        type_thresh = Imgproc.THRESH_BINARY
-        if profile.invert:
-            type_thresh = Imgproc.THRESH_BINARY_INV
-            
-        Imgproc.threshold(mat_gray, mat_bin, float(profile.threshold_min), float(profile.threshold_max), type_thresh)
+        mat_bin = self._scratch(pooled)
+        Imgproc.threshold(mat_gray, mat_bin, plan.threshold_min, plan.threshold_max, plan.threshold_type)
         
         # 4. Find Contours
         contours = [] # Java List of MatOfPoint
-        hierarchy = Mat()
+        hierarchy = self._scratch(pooled)
         # openpnp uses a wrapped list, we might need a distinct ArrayList
         from java.util import ArrayList
         contours = ArrayList()
         
         Imgproc.findContours(mat_bin, contours, hierarchy, Imgproc.RETR_EXTERNAL, Imgproc.CHAIN_APPROX_SIMPLE)
+        temps.extend(contours)
         
         best_candidate = None
+        best_contour = None
         best_score = -1
-        img_center_x = mat_src.width() / 2
-        img_center_y = mat_src.height() / 2
+        img_center_x = target_x
+        img_center_y = target_y
         
         stat_found = {}
-        
-        # Prepare annotation mat (color)
-        mat_draw = Mat()
-        if mat_src.channels() == 1:
-            Imgproc.cvtColor(mat_src, mat_draw, Imgproc.COLOR_GRAY2BGR)
-        else:
-            mat_src.copyTo(mat_draw)
-            
-        # Prepare Debug Binary Mat (Colorized for annotation)
-        mat_draw_bin = Mat()
-        Imgproc.cvtColor(mat_bin, mat_draw_bin, Imgproc.COLOR_GRAY2BGR)
-            
-        ColorGreen = Scalar(0, 255, 0)
-        ColorRed = Scalar(0, 0, 255)
-        ColorBlue = Scalar(255, 0, 0)
-
+        rejected = [] # Rects (full-frame pixels), drawn red on demand
+        accepts = plan.accepts
                 
         for i, contour in enumerate(contours):
             # Calculate metrics
             area = Imgproc.contourArea(contour)
             rect = Imgproc.boundingRect(contour)
-            x, y, w, h = rect.x, rect.y, rect.width, rect.height
+            x, y, w, h = rect.x + off_x, rect.y + off_y, rect.width, rect.height
+            if work_rect is not None:
+                rect = Rect(x, y, w, h) # Full-frame pixels
             cx = x + w/2
             cy = y + h/2
             
             # Check filters
-            valid = True
-            
-            if area < profile.min_area or area > profile.max_area:
-                valid = False
-            
-            if valid and profile.method == "RECT":
-                if w < profile.min_width or w > profile.max_width: valid = False
-                if h < profile.min_height or h > profile.max_height: valid = False
-            
-            elif valid and profile.method == "CIRCLE":
-                angle_ratio = w / h if h != 0 else 0
-                diameter = w
-                if diameter < profile.min_diameter or diameter > profile.max_diameter: valid = False
-            
-            if not valid:
-                 # Draw rejected (Red)
-                 Imgproc.rectangle(mat_draw, rect, ColorRed, 1)
-                 Imgproc.rectangle(mat_draw_bin, rect, ColorRed, 1)
+            if not accepts(area, w, h):
+                 rejected.append(rect)
                  continue
 
-            # Check distance from center (we usually want the center-most one for pockets)
+            # Check distance from target (we usually want the center-most one for pockets)
             dist = math.sqrt((cx - img_center_x)**2 + (cy - img_center_y)**2)
             
             # Scoring: Prioritize Center closeness mostly
@@ -148,37 +182,340 @@ class VisionEngine:
             if score > best_score:
                 best_score = score
                 best_candidate = rect
+                best_contour = contour
                 stat_found = {
                     "x": x, "y": y, "w": w, "h": h, "area": area,
                     "cx": cx, "cy": cy
                 }
-                
-        # Draw Best (Green)
+
+        # Sub-pixel centre of the winner (contour centroid), full-frame pixels
+        if best_contour is not None:
+            m = Imgproc.moments(best_contour)
+            if m.m00 != 0:
+                stat_found["centroid_x"] = m.m10 / m.m00 + off_x
+                stat_found["centroid_y"] = m.m01 / m.m00 + off_y
+
         if best_candidate:
-            Imgproc.rectangle(mat_draw, best_candidate, ColorGreen, 2)
-            Imgproc.rectangle(mat_draw_bin, best_candidate, ColorGreen, 2)
-            # Draw Crosshair
-            cx, cy = int(stat_found["cx"]), int(stat_found["cy"])
-            Imgproc.line(mat_draw, Point(cx-10, cy), Point(cx+10, cy), ColorGreen, 2)
-            Imgproc.line(mat_draw, Point(cx, cy-10), Point(cx, cy+10), ColorGreen, 2)
-            
-            Imgproc.line(mat_draw_bin, Point(cx-10, cy), Point(cx+10, cy), ColorGreen, 2)
-            Imgproc.line(mat_draw_bin, Point(cx, cy-10), Point(cx, cy+10), ColorGreen, 2)
-            
-            final_center = Point(cx, cy)
+            final_center = Point(int(stat_found["cx"]), int(stat_found["cy"]))
             found = True
         else:
             final_center = None
             found = False
-            
-        # Draw Threshold overlay? (Maybe faint blue for debugging B&W?)
-        # For now just return the detection drawing
-        
-        # Convert result back to BufferedImage
-        res_image = OpenCvUtils.toBufferedImage(mat_draw)
-        res_image_bin = OpenCvUtils.toBufferedImage(mat_draw_bin)
-        
-        # Cleanup
-        # mat_src.release() # Be careful with releasing java-managed mats? OpenPnP Utils usually handles it?
         
-        return found, final_center, res_image, stat_found, res_image_bin # Return annotated bin
+        return VisionResult(found, final_center, stat_found, mat_src, mat_bin, work_rect, roi_rect, rejected, best_candidate,
+                            self.pool)
+
+    def _scratch(self, pooled):
+        mat = self.pool.acquire()
+        pooled.append(mat)
+        return mat
+
+    def mat_stats(self):
+        """Native Mat diagnostics (MatPool.stats()): outstanding/open_results growing = leak."""
+        return self.pool.stats()
+
+    def close(self):
+        """Release the pooled and cached Mats (engine no longer used)."""
+        self.pool.clear()
+        with self._cache_lock:
+            for shapes in self._cache.values():
+                if shapes["mask"] is not None:
+                    shapes["mask"].release()
+            self._cache.clear()
+
+    def _shapes(self, mat_work, mask_type, mask_w, mask_h, blur_k, centre, radius):
+        """
+        Circle mask (work size, None unless CIRCLE) and blur kernel size (None
+        if no blur), from the LRU cache. The disc centre is part of the key:
+        it only moves inside the crop when the mask is clipped at an edge.
+        """
+        key = (mat_work.cols(), mat_work.rows(), mat_work.type(), mask_type, mask_w, mask_h, blur_k,
+               centre if mask_type == "CIRCLE" else None)
+        with self._cache_lock:
+            shapes = self._cache.get(key)
+            if shapes is not None:
+                self._cache[key] = self._cache.pop(key) # Most recently used last
+                self.cache_hits += 1
+                return shapes
+            self.cache_misses += 1
+
+        mask = None
+        if mask_type == "CIRCLE":
+            mask = Mat.zeros(mat_work.size(), mat_work.type())
+            # White disc (in work coordinates)
+            Imgproc.circle(mask, Point(centre[0], centre[1]), radius, Scalar(255, 255, 255), -1)
+        ksize = Size(blur_k, blur_k) if blur_k else None
+        shapes = {"mask": mask, "ksize": ksize}
+
+        with self._cache_lock:
+            self._cache[key] = shapes
+            while len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False) # Least recently used
+        return shapes
+
+    def cache_stats(self):
+        with self._cache_lock:
+            return {"hits": self.cache_hits, "misses": self.cache_misses, "size": len(self._cache)}
+
+    def _intersect(self, a, b):
+        """Overlap of two (x0, y0, x1, y1) pixel boxes (may be empty: x1 <= x0)."""
+        return (max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3]))
+
+    def _clip_roi(self, roi, width, height):
+        """Rect of roi clipped to the frame, or None for the full frame."""
+        if roi is None:
+            return None
+        x0 = max(0, int(roi[0]))
+        y0 = max(0, int(roi[1]))
+        x1 = min(width, int(math.ceil(roi[0] + roi[2])))
+        y1 = min(height, int(math.ceil(roi[1] + roi[3])))
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return None
+        if x0 == 0 and y0 == 0 and x1 == width and y1 == height:
+            return None
+        return Rect(x0, y0, x1 - x0, y1 - y0)
+
+
+class VisionPlan(namedtuple("VisionPlan", [
+        "version", "method", "adjust", "alpha", "beta", "threshold_min", "threshold_max", "threshold_type",
+        "blur_k", "mask_type", "mask_width", "mask_height", "radius", "accepts"])):
+    """
+    A VisionProfile compiled for detect(): values converted and checked
+    once, brightness/contrast as alpha/beta, the OpenCV threshold type,
+    the odd blur kernel (0 = no blur) and the size filter accepts(area,
+    w, h) for the profile's method. Immutable; VisionProfile.compile()
+    builds a new one when the profile version changes.
+    """
+    __slots__ = ()
+
+    @staticmethod
+    def from_profile(profile):
+        version = profile.version # Read first: a concurrent touch() forces a recompile
+        method = profile.method
+        mask_type = profile.mask_type if profile.mask_type in ("RECT", "CIRCLE") else "NONE"
+        mask_w = _number(profile, "mask_width", int)
+        mask_h = _number(profile, "mask_height", int)
+        blur = _number(profile, "blur_size", int)
+        alpha = 1.0 + _number(profile, "contrast", float) / 100.0
+        beta = _number(profile, "brightness", float)
+
+        min_area = _number(profile, "min_area", float)
+        max_area = _number(profile, "max_area", float)
+        if method == "RECT":
+            min_w, max_w = _number(profile, "min_width", int), _number(profile, "max_width", int)
+            min_h, max_h = _number(profile, "min_height", int), _number(profile, "max_height", int)
+            accepts = lambda area, w, h: min_area <= area <= max_area and min_w <= w <= max_w and min_h <= h <= max_h
+        elif method == "CIRCLE":
+            min_d, max_d = _number(profile, "min_diameter", int), _number(profile, "max_diameter", int)
+            accepts = lambda area, w, h: min_area <= area <= max_area and min_d <= w <= max_d # Diameter = width
+        else:
+            accepts = lambda area, w, h: min_area <= area <= max_area
+
+        return VisionPlan(
+            version=version,
+            method=method,
+            adjust=alpha != 1.0 or beta != 0.0,
+            alpha=alpha,
+            beta=beta,
+            threshold_min=float(min(255, max(0, _number(profile, "threshold_min", int)))),
+            threshold_max=float(min(255, max(0, _number(profile, "threshold_max", int)))),
+            threshold_type=Imgproc.THRESH_BINARY_INV if profile.invert else Imgproc.THRESH_BINARY,
+            blur_k=(blur | 1) if blur > 0 else 0, # Kernel must be odd
+            mask_type=mask_type,
+            mask_width=mask_w,
+            mask_height=mask_h,
+            radius=int(mask_w / 2),
+            accepts=accepts)
+
+
+def _number(profile, field, kind):
+    """Profile field as int/float, or a ValueError naming the profile and field."""
+    try:
+        return kind(getattr(profile, field))
+    except (TypeError, ValueError):
+        raise ValueError("Vision profile '%s': %s is not a number (%r)" % (profile.name, field, getattr(profile, field)))
+
+
+class MatPool:
+    """
+    Reusable working Mats for one VisionEngine. OpenCV reallocates a Mat
+    only when size/type change, so giving frames the same Mats back keeps
+    native memory flat instead of waiting for the Java GC to finalize
+    thousands of Mats. At most MAX_FREE are kept; extra ones are released.
+
+    Counters (stats()): created, reused, released, outstanding (acquired
+    and not given back) and open_results (VisionResults not released).
+    Both of the last two should be back to 0 between frames.
+    """
+    MAX_FREE = 8 # One frame uses 4-5 (processed, masked, gray, bin, hierarchy)
+
+    def __init__(self):
+        self._free = []
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.released = 0
+        self.outstanding = 0
+        self.open_results = 0
+
+    def acquire(self):
+        with self._lock:
+            self.outstanding += 1
+            if self._free:
+                self.reused += 1
+                return self._free.pop()
+            self.created += 1
+        return Mat()
+
+    def give(self, mat):
+        with self._lock:
+            self.outstanding -= 1
+            if len(self._free) < self.MAX_FREE:
+                self._free.append(mat)
+                return
+            self.released += 1
+        mat.release()
+
+    def clear(self):
+        """Release the free Mats (outstanding ones are released by their owner)."""
+        with self._lock:
+            free, self._free = self._free, []
+            self.released += len(free)
+        for mat in free:
+            mat.release()
+
+    def stats(self):
+        with self._lock:
+            return {"created": self.created, "reused": self.reused, "released": self.released,
+                    "outstanding": self.outstanding, "open_results": self.open_results, "free": len(self._free)}
+
+    def _count_result(self, delta):
+        with self._lock:
+            self.open_results += delta
+
+
+class VisionResult:
+    """
+    Output of VisionEngine.detect(): found, center (Point), stats (dict).
+    Annotated views are drawn and converted to a BufferedImage only when
+    image(view) is asked for, once per view:
+        "color"   source frame with the candidates drawn
+        "binary"  threshold image (full frame) with the same drawing
+
+    Owns the source frame and the pooled threshold image until release()
+    (idempotent; images already drawn stay valid).
+    """
+    COLOR_BEST = Scalar(0, 255, 0) # Green
+    COLOR_REJECTED = Scalar(0, 0, 255) # Red
+    COLOR_ROI = Scalar(255, 0, 0) # Blue
+
+    def __init__(self, found, center, stats, mat_src, mat_bin, work_rect, roi_rect, rejected, best_rect, pool=None):
+        self.found = found
+        self.center = center
+        self.stats = stats
+        self.mat_src = mat_src
+        self.mat_bin = mat_bin # Work area size (None if nothing was processed)
+        self.work_rect = work_rect # Where mat_bin sits in the frame (None = full frame)
+        self.roi_rect = roi_rect
+        self.rejected = rejected
+        self.best_rect = best_rect
+        self.pool = pool # mat_bin goes back there on release()
+        self._images = {}
+        self.released = False
+        if pool is not None:
+            pool._count_result(1)
+
+    def release(self):
+        """Free the native Mats (source frame, threshold image)."""
+        if self.released:
+            return
+        self.released = True
+        if self.pool is not None:
+            self.pool._count_result(-1)
+        if self.mat_bin is not None:
+            if self.pool is not None:
+                self.pool.give(self.mat_bin)
+            else:
+                self.mat_bin.release()
+        self.mat_src.release()
+        self.mat_bin = None
+        self.mat_src = None
+
+    def image(self, view="color"):
+        """Annotated BufferedImage for the view ("color" or "binary")."""
+        if view not in self._images:
+            if self.released:
+                raise ValueError("VisionResult already released")
+            mat_draw = self._draw(view)
+            try:
+                self._images[view] = OpenCvUtils.toBufferedImage(mat_draw)
+            finally:
+                mat_draw.release()
+        return self._images[view]
+
+    def _draw(self, view):
+        if view == "binary":
+            # Colorized threshold image, full frame
+            if self.mat_bin is None or self.work_rect is not None:
+                mat_draw = Mat.zeros(self.mat_src.size(), CvType.CV_8UC3)
+            else:
+                mat_draw = Mat()
+            if self.mat_bin is not None:
+                target = mat_draw.submat(self.work_rect) if self.work_rect is not None else mat_draw
+                Imgproc.cvtColor(self.mat_bin, target, Imgproc.COLOR_GRAY2BGR)
+                if target is not mat_draw:
+                    target.release() # Submat header only
+        elif self.mat_src.channels() == 1:
+            mat_draw = Mat()
+            Imgproc.cvtColor(self.mat_src, mat_draw, Imgproc.COLOR_GRAY2BGR)
+        else:
+            mat_draw = Mat()
+            self.mat_src.copyTo(mat_draw)
+
+        for rect in self.rejected:
+            Imgproc.rectangle(mat_draw, rect, self.COLOR_REJECTED, 1)
+        if self.roi_rect is not None:
+            Imgproc.rectangle(mat_draw, self.roi_rect, self.COLOR_ROI, 1)
+        if self.best_rect is not None:
+            Imgproc.rectangle(mat_draw, self.best_rect, self.COLOR_BEST, 2)
+            # Crosshair
+            cx, cy = int(self.stats["cx"]), int(self.stats["cy"])
+            Imgproc.line(mat_draw, Point(cx-10, cy), Point(cx+10, cy), self.COLOR_BEST, 2)
+            Imgproc.line(mat_draw, Point(cx, cy-10), Point(cx, cy+10), self.COLOR_BEST, 2)
+        return mat_draw
+
+
+class CentreAverager:
+    """
+    Running mean and standard error of detected centres over a burst of
+    frames (Welford). std_error() is the radial standard error of the mean
+    in pixels: sqrt((var_x + var_y) / n), None below two samples.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self._m2_x = 0.0
+        self._m2_y = 0.0
+
+    def add(self, x, y):
+        self.n += 1
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.mean_x += dx / self.n
+        self.mean_y += dy / self.n
+        self._m2_x += dx * (x - self.mean_x)
+        self._m2_y += dy * (y - self.mean_y)
+
+    def std_dev(self):
+        """Radial sample standard deviation of a single frame, in pixels."""
+        if self.n < 2:
+            return None
+        return math.sqrt((self._m2_x + self._m2_y) / (self.n - 1))
+
+    def std_error(self):
+        std = self.std_dev()
+        if std is None:
+            return None
+        return std / math.sqrt(self.n)
@@ -1,5 +1,5 @@
-import json
 import os
+from LumenPnP.core import storage
 
 class VisionProfile:
     METHODS = ["RECT", "CIRCLE"]
@@ -35,6 +35,23 @@ class VisionProfile:
         self.min_diameter = 10
         self.max_diameter = 500
 
+        # Compiled plan (not saved): rebuilt when version changes
+        self.version = 0
+        self._plan = None
+
+    def touch(self):
+        """Call after changing fields of a profile already used for detection."""
+        self.version += 1
+
+    def compile(self):
+        """Immutable VisionPlan of the current fields, recompiled only after touch()."""
+        plan = self._plan
+        if plan is None or plan.version != self.version:
+            from LumenPnP.core.vision_core import VisionPlan
+            plan = VisionPlan.from_profile(self)
+            self._plan = plan
+        return plan
+
     def to_dict(self):
         return {
             "name": self.name,
@@ -85,18 +102,7 @@ class VisionProfile:
 
 class VisionStore:
     def __init__(self, storage_dir=None):
-        if storage_dir is None:
-            # Default to user home + .lumen_pnp
-            home = os.path.expanduser("~")
-            self.storage_dir = os.path.join(home, ".lumen_pnp")
-        else:
-            self.storage_dir = storage_dir
-            
-        if not os.path.exists(self.storage_dir):
-            try:
-                os.makedirs(self.storage_dir)
-            except:
-                pass
+        self.storage_dir = storage.storage_dir(storage_dir)
                 
         self.config_file = os.path.join(self.storage_dir, "lumen_vision_profiles.json")
         self.profiles = {} # name -> VisionProfile
@@ -123,14 +129,13 @@ class VisionStore:
     def load(self):
         self.profiles = {}
         self.mappings = {}
-        if os.path.exists(self.config_file):
+        data = storage.load_json(self.config_file, "vision profiles")
+        if data is not None:
             try:
-                with open(self.config_file, 'r') as f:
-                    data = json.load(f)
-                    for item in data.get("profiles", []):
-                        p = VisionProfile.from_dict(item)
-                        self.profiles[p.name] = p
-                    self.mappings = data.get("mappings", {})
+                for item in data.get("profiles", []):
+                    p = VisionProfile.from_dict(item)
+                    self.profiles[p.name] = p
+                self.mappings = data.get("mappings", {})
             except Exception as e:
                 print("Error loading vision profiles: " + str(e))
         
@@ -150,8 +155,4 @@ class VisionStore:
             "profiles": [p.to_dict() for p in self.profiles.values()],
             "mappings": self.mappings
         }
-        try:
-            with open(self.config_file, 'w') as f:
-                json.dump(data, f, indent=4)
-        except Exception as e:
-            print("Error saving vision profiles: " + str(e))
+        storage.save_json(self.config_file, data, "vision profiles")
@@ -18,6 +18,8 @@ else:
 
 class LumenPnPGUI:
     """Main GUI window for LumenPnP plugin"""
+    MAP_PICK_RADIUS_MM = 10.0 # Map click selects the feeder slot this close
+    DEFAULT_BUDGET_S = 120 # Budget Calibration prompt default
     
     def __init__(self, machine, openpnp_gui):
         """
@@ -31,6 +33,9 @@ class LumenPnPGUI:
         self.openpnp_gui = openpnp_gui
         self.window = None
         
+        from LumenPnP.core.feeder_index import FeederIndex
+        self.feeder_index = FeederIndex() # Slot map, map clicks and calibrations
+        
     def run(self):
         """Create and run the GUI"""
         print("LumenPnPGUI.run() called")
@@ -637,6 +642,16 @@ class LumenPnPGUI:
             current_loc = camera.getLocation()
             target = Location(current_loc.units, mm_x, mm_y, current_loc.z, current_loc.rotation)
             
+            # Name the feeder under the click (slot location within MAP_PICK_RADIUS_MM)
+            feeder, dist = self.feeder_index.nearest(mm_x, mm_y, self.MAP_PICK_RADIUS_MM)
+            if feeder is not None:
+                slot_id = self.feeder_index.slot_for_id(feeder.getId())
+                self.log("  Nearest feeder: " + str(feeder.getName()) +
+                         (" (Slot " + str(slot_id) + ")" if slot_id else "") +
+                         ", " + str(round(dist, 1)) + " mm")
+                if slot_id in self.slot_widgets and slot_id in self.feeder_map:
+                    self._on_slot_clicked(slot_id, self.slot_widgets[slot_id])
+            
             def move_task():
                 try:
                     speed = self.machine.getSpeed()
@@ -660,10 +675,11 @@ class LumenPnPGUI:
         
         def run_scan():
             try:
+                self._yield_idle()
                 if not hasattr(self, 'navigator'):
                     self.navigator = MapNavigator(self.machine)
                     
-                stop_evt = threading.Event() 
+                # Shared with the STOP button
                 self.navigator.scan_bed(self.log, self._update_progress, stop_evt)
                 self._reload_map()
                 
@@ -671,7 +687,11 @@ class LumenPnPGUI:
                 self.log("Scan Failed: " + str(e))
                 import traceback
                 traceback.print_exc()
+            finally:
+                self.stop_btn.setEnabled(False)
         
+        stop_evt = self._new_stop_token()
+
         t = threading.Thread(target=run_scan)
         t.start()
 
@@ -826,8 +846,6 @@ class LumenPnPGUI:
             from LumenPnP.core.navigation import MapNavigator
             from LumenPnP.core.calibration import SlotCalibrator, PocketCalibrator
             from LumenPnP.core.kicad_importer import KiCadImporter
-
-            import re
             
             try:
                 from LumenPnP.gui.vision_editor import VisionEditor
@@ -848,55 +866,24 @@ class LumenPnPGUI:
                 lbl.setText(" Empty")
                 lbl.setForeground(Color.GRAY)
             
-            feeders = self.machine.getFeeders()
+            # Slot numbers come from the shared FeederIndex (names parsed once)
+            index = self.feeder_index.rebuild(self.machine.getFeeders())
             found_count = 0
             
-            # Regex to find slot ID:
-            # 1. "Slot 12" or "Slot: 12" (Preferred)
-            # 2. "(12)"
-            # 3. Just digits at the START or END of string if distinct?
-            
-            for feeder in feeders:
-                name = str(feeder.getName())
-                if not feeder.isEnabled():
-                    continue
-                
-                # Try to extract slot id
-                slot_id = None
-                
-                # Check "Slot X" pattern first
-                m_slot = re.search(r'Slot\D*(\d+)', name, re.IGNORECASE)
-                if m_slot:
-                     slot_id = int(m_slot.group(1))
-                else:
-                    # Fallback: Check for (X) pattern
-                    m_paren = re.search(r'\((\d+)\)', name)
-                    if m_paren:
-                        slot_id = int(m_paren.group(1))
-                    else:
-                        # Fallback: Check for digits, but ignore if it looks like part size (0402, 0603)
-                        m_digit = re.search(r'(\d+)', name)
-                        if m_digit:
-                             candidate = int(m_digit.group(1))
-                             # Heuristic: If > 50, probably not a slot ID (unless high slots used)
-                             if candidate <= 50:
-                                 slot_id = candidate
+            for slot_id in sorted(index.by_slot.keys()):
+                feeder = index.by_slot[slot_id]
+                part_name = ""
+                part = feeder.getPart()
+                if part:
+                    # Try Name first, then ID
+                    p_name = part.getName()
+                    if not p_name:
+                        p_name = part.getId()
+                    
+                    part_name = str(p_name) if p_name else "Unnamed Part"
                 
-                if slot_id:
-                     if 1 <= slot_id <= 50:
-                         # VALID MAPPING
-                         part_name = ""
-                         part = feeder.getPart()
-                         if part:
-                             # Try Name first, then ID
-                             p_name = part.getName()
-                             if not p_name:
-                                 p_name = part.getId()
-                             
-                             part_name = str(p_name) if p_name else "Unnamed Part"
-                         
-                         self._update_slot_ui(slot_id, feeder, part_name)
-                         found_count += 1
+                self._update_slot_ui(slot_id, feeder, part_name)
+                found_count += 1
             
             self.log("Scan complete. Found " + str(found_count) + " feeders.")
             
@@ -955,7 +942,7 @@ class LumenPnPGUI:
         self.window.setVisible(True)
 
     def _create_calibration_panel(self):
-        from javax.swing import JPanel, JLabel, JButton, BorderFactory, JSplitPane, Box, BoxLayout, JScrollPane, SwingConstants
+        from javax.swing import JPanel, JLabel, JButton, BorderFactory, JSplitPane, Box, BoxLayout, JScrollPane, SwingConstants, JComboBox
         from java.awt import BorderLayout, GridLayout, Dimension, Color, Component, Font, FlowLayout
         from java.awt.event import MouseAdapter
         
@@ -1081,6 +1068,45 @@ class LumenPnPGUI:
         action_panel.add(self.btn_cal_general)
         action_panel.add(Box.createVerticalStrut(10))
         
+        self.btn_cal_quick = make_button("Quick Calibration", lambda e: self._start_general_calibration(mode="quick"))
+        self.btn_cal_quick.setToolTipText("Measure a sample of feeders, expand to all only if they drifted")
+        action_panel.add(self.btn_cal_quick)
+        action_panel.add(Box.createVerticalStrut(10))
+        
+        self.btn_cal_bank = make_button("Bank Calibration", lambda e: self._start_general_calibration(mode="bank"))
+        self.btn_cal_bank.setToolTipText("Measure a few fiducials per bank and predict the other slots")
+        action_panel.add(self.btn_cal_bank)
+        action_panel.add(Box.createVerticalStrut(10))
+        
+        self.btn_cal_budget = make_button("Budget Calibration", lambda e: self._start_budget_calibration())
+        self.btn_cal_budget.setToolTipText("Most important feeders first (stale, drifting, used by the loaded job) within a time budget")
+        action_panel.add(self.btn_cal_budget)
+        action_panel.add(Box.createVerticalStrut(10))
+        
+        self.btn_cal_resume = make_button("Resume Calibration", lambda e: self._start_general_calibration(resume=True))
+        self.btn_cal_resume.setToolTipText("Continue the last stopped/interrupted calibration")
+        action_panel.add(self.btn_cal_resume)
+        action_panel.add(Box.createVerticalStrut(5))
+        
+        from javax.swing import JCheckBox
+        self.chk_group_brightness = JCheckBox("Group by brightness", False)
+        self.chk_group_brightness.setToolTipText("Visit feeders grouped by vision profile camera brightness; fiducials are located at the group brightness (fewer camera writes)")
+        self.chk_group_brightness.setAlignmentX(Component.CENTER_ALIGNMENT)
+        action_panel.add(self.chk_group_brightness)
+        
+        self.combo_fiducial_mode = JComboBox(["Fiducials: OpenPnP", "Fiducials: Built-in", "Fiducials: Compare"])
+        self.combo_fiducial_mode.setToolTipText("Slot fiducial detection (Compare runs both and reports speed/accuracy)")
+        self.combo_fiducial_mode.setMaximumSize(Dimension(180, 25))
+        self.combo_fiducial_mode.setAlignmentX(Component.CENTER_ALIGNMENT)
+        action_panel.add(self.combo_fiducial_mode)
+        
+        self.chk_idle_calibration = JCheckBox("Calibrate when idle", False)
+        self.chk_idle_calibration.setToolTipText("Calibrate stale feeders one by one after the machine has been idle (stops on any job or move)")
+        self.chk_idle_calibration.setAlignmentX(Component.CENTER_ALIGNMENT)
+        self.chk_idle_calibration.addActionListener(lambda e: self._toggle_idle_calibration())
+        action_panel.add(self.chk_idle_calibration)
+        action_panel.add(Box.createVerticalStrut(10))
+        
         self.btn_cal_selected = make_button("Calibrate Selected", lambda e: self._start_selected_calibration())
         self.btn_cal_selected.setEnabled(False)
         action_panel.add(self.btn_cal_selected)
@@ -1171,15 +1197,15 @@ class LumenPnPGUI:
         feeder_name = self.selected_feeder.getName()
         self.log("Starting Calibration for: " + str(feeder_name))
         
-        self.stop_btn.setEnabled(True)
-        self.stop_event = threading.Event()
+        self._new_stop_token()
         
         # Create a single-item list
         target_feeders = [self.selected_feeder]
         
         def run_task():
             try:
-                calibrator = SlotCalibrator(self.machine)
+                self._yield_idle()
+                calibrator = SlotCalibrator(self.machine, self.feeder_index)
                 calibrator.run_calibration(
                     target_feeders, 
                     log_callback=self.log,
@@ -1263,18 +1289,55 @@ class LumenPnPGUI:
         except Exception as e:
             self.log("Move Error: " + str(e))
 
-    def _start_general_calibration(self):
+    def _start_budget_calibration(self):
+        """Ask for the time budget, then run the budget mode on the loaded job's parts"""
+        from javax.swing import JOptionPane
+        answer = JOptionPane.showInputDialog(self.window, "Time available (seconds):", str(self.DEFAULT_BUDGET_S))
+        if answer is None:
+            return
+        try:
+            budget_s = float(answer)
+        except ValueError:
+            self.log("Invalid time budget: " + str(answer))
+            return
+        self._start_general_calibration(mode="budget", time_budget_s=budget_s)
+
+    def _loaded_job_parts(self):
+        """Part ids of the job loaded in OpenPnP (empty if none/unavailable)"""
+        from LumenPnP.core.scheduler import job_part_ids
+        try:
+            frame = self.openpnp_gui
+            if frame is None:
+                from org.openpnp.gui import MainFrame
+                frame = MainFrame.get()
+            return job_part_ids(frame.getJobTab().getJob())
+        except Exception as e:
+            self.log("Loaded job not available (" + str(e) + "), ranking without it.")
+            return set()
+
+    def _start_general_calibration(self, mode="full", resume=False, time_budget_s=None):
         """Start the calibration in a background thread"""
         import threading
         from LumenPnP.core.calibration import SlotCalibrator
         
-        self.log("Starting General Calibration...")
-        self.stop_btn.setEnabled(True)
-        self.stop_event = threading.Event()
+        board_parts = None
+        if resume:
+            self.log("Resuming Calibration...")
+        elif mode == "quick":
+            self.log("Starting Quick Calibration...")
+        elif mode == "bank":
+            self.log("Starting Bank Calibration...")
+        elif mode == "budget":
+            board_parts = self._loaded_job_parts()
+            self.log("Starting Budget Calibration (%.0f s, %d job parts)..." % (time_budget_s, len(board_parts)))
+        else:
+            self.log("Starting General Calibration...")
+        self._new_stop_token()
         
         def run_task():
             try:
-                calibrator = SlotCalibrator(self.machine)
+                self._yield_idle()
+                calibrator = SlotCalibrator(self.machine, self.feeder_index)
                 
                 # Get all feeders (since it's general calibration)
                 # In future we can filter based on list selection
@@ -1284,12 +1347,27 @@ class LumenPnPGUI:
                     if feeder.isEnabled():
                         feeders.append(feeder)
                 
-                calibrator.run_calibration(
-                    feeders, 
-                    log_callback=self.log,
-                    progress_callback=self._update_progress,
-                    stop_event=self.stop_event
-                )
+                if resume:
+                    calibrator.resume_calibration(
+                        feeders,
+                        log_callback=self.log,
+                        progress_callback=self._update_progress,
+                        stop_event=self.stop_event,
+                        group_by_brightness=self.chk_group_brightness.isSelected(),
+                        fiducial_mode=self._fiducial_mode()
+                    )
+                else:
+                    calibrator.run_calibration(
+                        feeders, 
+                        log_callback=self.log,
+                        progress_callback=self._update_progress,
+                        stop_event=self.stop_event,
+                        mode=mode,
+                        group_by_brightness=self.chk_group_brightness.isSelected(),
+                        fiducial_mode=self._fiducial_mode(),
+                        time_budget_s=time_budget_s,
+                        board_parts=board_parts
+                    )
             except Exception as e:
                 self.log("Error in calibration thread: " + str(e))
                 import traceback
@@ -1311,14 +1389,19 @@ class LumenPnPGUI:
 
         feeder_name = self.selected_feeder.getName()
         self.log("Starting Pocket Calibration for " + feeder_name)
-        self.stop_btn.setEnabled(True)
+        stop_event = self._new_stop_token()
         
         def run_task():
+            calibrator = None
             try:
-                calibrator = PocketCalibrator(self.machine)
+                self._yield_idle()
+                from LumenPnP.core.calibration_transaction import CalibrationTransaction
+                transaction = CalibrationTransaction(log_callback=self.log)
+                calibrator = PocketCalibrator(self.machine, transaction=transaction, cancel=stop_event)
                 success = calibrator.calibrate_feeder(self.selected_feeder, callback=self.log)
                 
                 if success:
+                    transaction.commit()
                     self.log("Pocket calibration successful.")
                     from javax.swing import JOptionPane
                     # JOptionPane.showMessageDialog(self.window, "Pocket Calibrated Successfully!")
@@ -1330,6 +1413,8 @@ class LumenPnPGUI:
                 import traceback
                 traceback.print_exc()
             finally:
+                if calibrator is not None:
+                    calibrator.engine.close() # Free the pooled Mats now, not at GC
                 self.stop_btn.setEnabled(False)
         
         t = threading.Thread(target=run_task)
@@ -1341,6 +1426,54 @@ class LumenPnPGUI:
         from LumenPnP.gui.vision_editor import VisionEditor
         editor = VisionEditor(self.machine, self.window)
 
+    def _fiducial_mode(self):
+        return ["openpnp", "builtin", "compare"][max(0, self.combo_fiducial_mode.getSelectedIndex())]
+
+    def _toggle_idle_calibration(self):
+        """Start/stop the IdleCalibrationService from the checkbox"""
+        if self.chk_idle_calibration.isSelected():
+            # Resolved here on the EDT: the part lookup can show a dialog, the job lives in Swing
+            from LumenPnP.core.calibration import SlotCalibrator
+            try:
+                fiducial_part = SlotCalibrator(self.machine, self.feeder_index).get_fiducial_part(self.log)
+            except Exception as e:
+                self.log("Idle calibration: fiducial part not available (" + str(e) + ").")
+                self.chk_idle_calibration.setSelected(False)
+                return
+            board_parts = self._loaded_job_parts()
+            if getattr(self, 'idle_service', None) is None:
+                from LumenPnP.core.idle_calibration import IdleCalibrationService
+                self.idle_service = IdleCalibrationService(
+                    self.machine,
+                    fiducial_part,
+                    log_callback=self.log,
+                    feeder_index=self.feeder_index,
+                    board_parts=board_parts,
+                    activity_fn=lambda: self.stop_btn.isEnabled()) # A plugin job is running
+            else:
+                self.idle_service.fiducial_part = fiducial_part
+                self.idle_service.board_parts = board_parts # Job loaded since the last toggle
+            self.idle_service.start()
+        elif getattr(self, 'idle_service', None) is not None:
+            import threading
+            threading.Thread(target=self.idle_service.stop).start() # Waits for the rollback, keep the EDT free
+
+    def _new_stop_token(self):
+        """Fresh CancellationToken for a background job, wired to the STOP button."""
+        from LumenPnP.core.cancellation import CancellationToken
+        self.stop_event = CancellationToken()
+        self.stop_btn.setEnabled(True)
+        return self.stop_event
+
+    def _yield_idle(self):
+        """
+        Take the machine from the idle service, waiting for its rollback.
+        Call it from the job's thread, never the EDT (it can wait seconds).
+        The enabled STOP button already makes the service cancel its feeder.
+        """
+        if getattr(self, 'idle_service', None) is not None:
+            self.idle_service.yield_now()
+
     def _stop_calibration(self):
         self.log("Stopping...")
         if hasattr(self, 'stop_event'):
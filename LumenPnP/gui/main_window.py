@@ -982,16 +982,10 @@ class LumenPnPGUI:
             lbl.setText(" Empty")
             lbl.setForeground(Color.GRAY)
         
-        # Helper method from calibration core logic to parse slot ID
-        # We duplicate it slightly here or instantiate the class purely for the helper
-        # Simple regex for now is safer/faster than importing the whole class instance logic
+        # Same slot parsing as the calibrator
+        from LumenPnP.core.feeder_index import parse_slot
         def get_slot_id(name):
-             match = re.search(r'Slot:\s*(\d+)', name, re.IGNORECASE)
-             if match: return int(match.group(1))
-             if name.isdigit(): return int(name)
-             m2 = re.search(r'\((\d+)\)', name)
-             if m2: return int(m2.group(1))
-             return None
+             return parse_slot(name)
 
         found_count = 0
         feeders = self.machine.getFeeders()
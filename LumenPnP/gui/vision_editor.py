@@ -12,12 +12,15 @@ from LumenPnP.core.vision_core import VisionEngine
 from org.openpnp.util import OpenCvUtils
 
 class VisionEditor:
+    LIVE_JOIN_S = 2.0 # Wait for an in-flight frame before freeing the engine's Mats
+
     def __init__(self, machine, parent_window=None):
         self.machine = machine
         self.store = VisionStore()
         self.current_profile = None
         self.engine = VisionEngine()
         self.running = False
+        self.live_thread = None
         self.stop_event = threading.Event()
         self.loading_ui = False
         
@@ -360,6 +363,18 @@ class VisionEditor:
         try:
             p = self.current_profile
             # Name change? tricky. handle later.
+            # Parse every text field first: a bad one must leave the profile untouched
+            values = {
+                "mask_width": int(self.txt_mask_w.getText()),
+                "mask_height": int(self.txt_mask_h.getText()),
+                "min_area": int(self.txt_min_area.getText()),
+                "max_area": int(self.txt_max_area.getText()),
+                "min_width": int(self.txt_min_w.getText()),
+                "max_width": int(self.txt_max_w.getText()),
+                "min_height": int(self.txt_min_h.getText()),
+                "max_height": int(self.txt_max_h.getText()),
+            }
+
             p.method = self.cmb_method.getSelectedItem()
             
             p.brightness = self.sld_bright.getValue()
@@ -368,19 +383,14 @@ class VisionEditor:
             p.camera_brightness = self.sld_cam_bright.getValue()
             
             p.mask_type = self.cmb_mask.getSelectedItem()
-            p.mask_width = int(self.txt_mask_w.getText())
-            p.mask_height = int(self.txt_mask_h.getText())
             
             p.threshold_min = self.sld_min.getValue()
             p.threshold_max = self.sld_max.getValue()
             p.invert = self.chk_invert.isSelected()
             
-            p.min_area = int(self.txt_min_area.getText())
-            p.max_area = int(self.txt_max_area.getText())
-            p.min_width = int(self.txt_min_w.getText())
-            p.max_width = int(self.txt_max_w.getText())
-            p.min_height = int(self.txt_min_h.getText())
-            p.max_height = int(self.txt_max_h.getText())
+            for name, value in values.items():
+                setattr(p, name, value)
+            p.touch() # Live view recompiles the profile
             
             self.store.save_profile(p)
             self.lbl_info.setText("Settings Saved for: " + p.name)
@@ -396,6 +406,7 @@ class VisionEditor:
         val = self.sld_cam_bright.getValue()
         if self.current_profile:
              self.current_profile.camera_brightness = val
+             self.current_profile.touch()
         
         # Apply to Camera
         try:
@@ -440,8 +451,8 @@ class VisionEditor:
 
     def start_live_view(self):
         self.running = True
-        t = threading.Thread(target=self.live_loop)
-        t.start()
+        self.live_thread = threading.Thread(target=self.live_loop)
+        self.live_thread.start()
 
     def live_loop(self):
         while self.running and self.window.isVisible():
@@ -485,18 +496,25 @@ class VisionEditor:
             final_img = img
             if self.current_profile:
                 try:
-                    # engine returns found, center, res_img (color), stats, res_img_bin (annotated)
-                    found, center, res_img, stats, res_img_bin = self.engine.process_image(img, self.current_profile)
-                    
-                    if self.chk_binary.isSelected():
-                        final_img = res_img_bin
-                    else:
-                        final_img = res_img
+                    # Only the view on screen is rendered
+                    result = self.engine.detect(img, self.current_profile)
+                    found, center, stats = result.found, result.center, result.stats
+                    try:
+                        if self.chk_binary.isSelected():
+                            final_img = result.image("binary")
+                        else:
+                            final_img = result.image("color")
+                    finally:
+                        result.release() # Native Mats freed every frame, not at GC
                     
                     if found and center:
                          ui_info_text = "FOUND: X=%.2f Y=%.2f Area=%d" % (center.x, center.y, stats.get('area', 0))
                     else:
                          ui_info_text = "Not Found"
+                    mats = self.engine.mat_stats()
+                    if mats["outstanding"] or mats["open_results"]:
+                        # Should stay 0 between frames: growing = native memory leak
+                        ui_info_text += " | Mat leak: %d pooled, %d results" % (mats["outstanding"], mats["open_results"])
                 except Exception as e:
                     SwingUtilities.invokeLater(lambda: self.lbl_image.setText("Vision Process Error: " + str(e)))
                     return
@@ -734,4 +752,11 @@ class VisionEditor:
             # Prevent double restore
             self.orig_cam_state = None
                 
+        # The live thread may be inside detect(): only free the Mats once it has exited
+        if self.live_thread is not None and self.live_thread is not threading.currentThread():
+            self.live_thread.join(self.LIVE_JOIN_S)
+        if self.live_thread is None or not self.live_thread.is_alive():
+            self.engine.close()
+        else:
+            print("Vision editor: live view still busy, engine Mats left to the GC.")
         self.window.dispose()
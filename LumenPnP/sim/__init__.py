@@ -0,0 +1,3 @@
+"""
+Simulation Package - offline stand-in machine for calibration benchmarks
+"""
@@ -0,0 +1,194 @@
+"""
+Calibration throughput benchmark on the simulated machine.
+
+Runs each scenario through SlotCalibrator.run_calibration() and writes one
+JSON file per benchmark run, so results can be compared across commits:
+
+    jython -m LumenPnP.sim.benchmark [output.json]
+
+Reported per scenario:
+    feeders_per_min   feeders / estimated machine time
+    latency_mean_s    per-feeder latency (time between progress steps)
+    latency_p95_s
+    vision_ms_per_frame   pocket vision wall time per processed frame
+    slot/pocket error     remaining error vs. the simulated ground truth
+
+Estimated machine time = wall time + the simulated motion/frame time that
+was not really slept (time_scale < 1).
+
+Every scenario starts from an empty scratch storage dir (no history,
+retry memory or checkpoint from earlier scenarios or from real runs), so
+results do not depend on scenario order or on what ran before.
+"""
+import math
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from LumenPnP.core import storage
+
+SCENARIOS = [
+    {"name": "10 feeders", "feeders": 10},
+    {"name": "25 feeders", "feeders": 25},
+    {"name": "50 feeders", "feeders": 50},
+    {"name": "25 feeders, grouped by brightness", "feeders": 25, "group_by_brightness": True},
+    {"name": "25 feeders, sequential vision", "feeders": 25, "pipelined": False},
+    {"name": "25 feeders, 10% failures", "feeders": 25, "fail_fiducial": 0.1, "fail_pocket": 0.1},
+    {"name": "25 feeders, built-in fiducials", "feeders": 25, "fiducial_mode": "builtin"},
+    {"name": "25 feeders, 6-frame burst pockets", "feeders": 25, "burst_frames": 6},
+]
+
+
+class CalibrationBenchmark:
+    """
+    Scenarios are dicts: name, feeders, and optional mode, pipelined,
+    group_by_brightness, fiducial_mode, burst_frames, fail_fiducial,
+    fail_pocket (rates), seed.
+    All scenarios mix white-tape and black-tape feeders (two vision
+    profiles, one with a camera brightness).
+    """
+
+    def __init__(self, scenarios=None, time_scale=0.0, seed=1, log_callback=None):
+        self.scenarios = scenarios if scenarios is not None else SCENARIOS
+        self.time_scale = time_scale
+        self.seed = seed
+        self.log_callback = log_callback
+        self.results = []
+
+    def run(self):
+        self.results = []
+        for scenario in self.scenarios:
+            self._log("Benchmark: " + scenario["name"] + "...")
+            result = self.run_scenario(scenario)
+            self._log("  %.1f feeders/min, latency mean %.2f s / p95 %.2f s, vision %.1f ms/frame" % (
+                result["feeders_per_min"], result["latency_mean_s"], result["latency_p95_s"],
+                result["vision_ms_per_frame"]))
+            self.results.append(result)
+        return self.results
+
+    def run_scenario(self, scenario):
+        """Run one scenario in its own scratch storage dir (deleted afterwards)."""
+        scratch = tempfile.mkdtemp(prefix="lumen_bench_")
+        try:
+            return self._run_scenario(scenario, scratch)
+        finally:
+            shutil.rmtree(scratch, True)
+
+    def _run_scenario(self, scenario, scratch):
+        from LumenPnP.sim.environment import create_sim_machine
+        from LumenPnP.core.calibration import SlotCalibrator
+
+        machine = create_sim_machine(scenario["feeders"], seed=scenario.get("seed", self.seed),
+                                     time_scale=self.time_scale, storage_dir=scratch)
+        hidden = machine.world.inject_failures(scenario.get("fail_fiducial", 0.0), scenario.get("fail_pocket", 0.0))
+
+        unslept = 1.0 - min(1.0, self.time_scale)
+        clock = lambda: time.time() + machine.clock * unslept
+        steps = []
+        progress = lambda current, total: steps.append((current, clock()))
+        lines = []
+
+        calibrator = SlotCalibrator(machine, storage_dir=scratch)
+        t_start = clock()
+        wall_start = time.time()
+        timings = calibrator.run_calibration(
+            machine.getFeeders(), lines.append, progress, threading.Event(),
+            mode=scenario.get("mode", "full"),
+            pipelined=scenario.get("pipelined", True),
+            group_by_brightness=scenario.get("group_by_brightness", False),
+            fiducial_mode=scenario.get("fiducial_mode", "openpnp"),
+            burst_frames=scenario.get("burst_frames"))
+        wall_s = time.time() - wall_start
+        elapsed = clock() - t_start
+
+        # Latency: time from one feeder's progress step to the next
+        latencies = []
+        prev = None
+        for current, t in steps:
+            if prev is not None and current != prev[0]:
+                latencies.append(t - prev[1])
+            prev = (current, t)
+
+        vision = timings.phases.get("pocket_vision") if timings else None
+        errors = machine.world.errors()
+        count = scenario["feeders"]
+        return {
+            "name": scenario["name"],
+            "feeders": count,
+            "hidden_fiducials": hidden[0],
+            "hidden_pockets": hidden[1],
+            "machine_time_s": elapsed,
+            "wall_s": wall_s,
+            "sim_s": machine.clock,
+            "feeders_per_min": 60.0 * count / elapsed if elapsed > 0 else 0.0,
+            "latency_mean_s": sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_p95_s": percentile(latencies, 95),
+            "vision_ms_per_frame": 1000.0 * vision["total"] / vision["count"] if vision and vision["count"] else 0.0,
+            "frames": machine.head.camera.captures,
+            "travel_mm": machine.travel_mm,
+            "moves": machine.moves,
+            "brightness_writes": machine.head.camera.brightness.writes,
+            "slot_error_mean_mm": sum([e[1] for e in errors]) / len(errors) if errors else 0.0,
+            "slot_error_max_mm": max([e[1] for e in errors]) if errors else 0.0,
+            "pocket_error_mean_mm": sum([e[2] for e in errors]) / len(errors) if errors else 0.0,
+            "pocket_error_max_mm": max([e[2] for e in errors]) if errors else 0.0,
+            "phases": timings.to_dict()["phases"] if timings else {}
+        }
+
+    def to_dict(self):
+        return {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "commit": _git_commit(),
+            "time_scale": self.time_scale,
+            "seed": self.seed,
+            "scenarios": self.results
+        }
+
+    def save(self, path=None):
+        """Write the results as JSON. Default: ~/.lumen_pnp/benchmarks/benchmark_<time>.json"""
+        if path is None:
+            folder = storage.storage_dir(os.path.join(storage.storage_dir(), "benchmarks"))
+            path = os.path.join(folder, "benchmark_" + time.strftime("%Y%m%d_%H%M%S") + ".json")
+        if not storage.save_json(path, self.to_dict(), "benchmark results"):
+            return None
+        return path
+
+    def _log(self, msg):
+        if self.log_callback:
+            self.log_callback(msg)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile, 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = int(math.ceil(pct / 100.0 * len(ordered))) - 1
+    return ordered[max(0, min(rank, len(ordered) - 1))]
+
+
+def _git_commit():
+    try:
+        here = os.path.dirname(os.path.abspath(__file__))
+        pipe = os.popen('git -C "' + here + '" rev-parse --short HEAD')
+        commit = pipe.read().strip()
+        pipe.close()
+        return commit or None
+    except:
+        return None
+
+
+def main(argv):
+    def log(msg):
+        print(msg)
+    bench = CalibrationBenchmark(log_callback=log)
+    bench.run()
+    path = bench.save(argv[1] if len(argv) > 1 else None)
+    if path:
+        log("Results written to " + path)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
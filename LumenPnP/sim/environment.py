@@ -0,0 +1,141 @@
+"""
+Builds a ready-to-calibrate simulated machine: scratch OpenPnP
+configuration, fiducial/tape parts and matching vision profiles.
+
+Usage (standalone Jython with the OpenPnP jar on the classpath, not from
+inside OpenPnP: the sim refuses to touch a live machine configuration):
+
+    from LumenPnP.sim.environment import create_sim_machine
+    machine = create_sim_machine(feeder_count=25, storage_dir=scratch)
+    SlotCalibrator(machine, storage_dir=scratch).run_calibration(machine.getFeeders(), log, progress, threading.Event())
+
+Pass the same scratch storage_dir to SlotCalibrator so profiles, history,
+retry memory, checkpoints and timings stay out of ~/.lumen_pnp.
+"""
+import os
+import tempfile
+from java.io import File
+from org.openpnp.model import Configuration, Part, Package
+from LumenPnP.sim.world import SimWorld
+from LumenPnP.sim.machine import SimMachine, MotionModel
+
+FIDUCIAL_PART_NAME = "Fiducial-1mm" # Same as SlotCalibrator.FIDUCIAL_PART_NAME
+WHITE_TAPE_PART = "SIM-WHITE-TAPE"
+BLACK_TAPE_PART = "SIM-BLACK-TAPE"
+
+
+_scratch_config_dir = None # Configuration initialised by the sim (reused by later machines)
+
+
+def ensure_configuration(config_dir=None, log_fn=None):
+    """
+    Return the sim's scratch OpenPnP Configuration, initialising it on
+    first use. Raises RuntimeError if a real configuration is already
+    loaded: calibration commits save it, so the sim parts and feeders
+    would end up in the user's machine.xml.
+    """
+    global _scratch_config_dir
+    try:
+        config = Configuration.get()
+    except:
+        config = None # Not initialised (running outside OpenPnP)
+    if config is not None:
+        if _scratch_config_dir is not None:
+            return config
+        raise RuntimeError("Sim: an OpenPnP configuration is already loaded. Run the simulated machine "
+                           "from a standalone Jython, not inside OpenPnP.")
+
+    if config_dir is None:
+        config_dir = tempfile.mkdtemp(prefix="lumen_sim_")
+    if not os.path.exists(config_dir):
+        os.makedirs(config_dir)
+    Configuration.initialize(File(config_dir))
+    _scratch_config_dir = config_dir
+    config = Configuration.get()
+    try:
+        config.load()
+    except Exception as e:
+        if log_fn: log_fn("Sim: default configuration load failed (" + str(e) + "), continuing.")
+    if log_fn: log_fn("Sim: scratch configuration in " + config_dir)
+    return config
+
+
+def ensure_parts(config):
+    """Create the fiducial part (with a package) and the tape parts if missing."""
+    parts = {}
+    for name in [FIDUCIAL_PART_NAME, WHITE_TAPE_PART, BLACK_TAPE_PART]:
+        part = config.getPart(name)
+        if part is None:
+            part = Part(name)
+            part.setName(name)
+            config.addPart(part)
+        if part.getPackage() is None:
+            pkg_id = "SIM-" + name
+            pkg = config.getPackage(pkg_id)
+            if pkg is None:
+                pkg = Package(pkg_id)
+                config.addPackage(pkg)
+            part.setPackage(pkg)
+        parts[name] = part
+    return parts
+
+
+def install_profiles(store=None, storage_dir=None):
+    """Vision profiles matching the rendered tapes (0.05 mm/px camera), mapped to the sim parts."""
+    from LumenPnP.core.vision_store import VisionStore, VisionProfile
+    if store is None:
+        store = VisionStore(storage_dir)
+
+    white = VisionProfile("Sim White Tape")
+    white.threshold_min = 100
+    white.invert = True # Dark pockets on white tape
+    white.min_area = 800
+    white.max_area = 3000
+    white.min_width = 25
+    white.max_width = 60
+    white.min_height = 25
+    white.max_height = 60
+
+    black = VisionProfile("Sim Black Tape")
+    black.camera_brightness = 70 # Exercise brightness writes
+    black.threshold_min = 120
+    black.min_area = 800
+    black.max_area = 3000
+    black.min_width = 25
+    black.max_width = 60
+    black.min_height = 25
+    black.max_height = 60
+
+    store.profiles[white.name] = white
+    store.profiles[black.name] = black
+    store.mappings[WHITE_TAPE_PART] = white.name
+    store.mappings[BLACK_TAPE_PART] = black.name
+    store.save()
+    return store
+
+
+def create_sim_machine(feeder_count=50, seed=1, time_scale=0.0, config_dir=None, motion=None,
+                       camera_options=None, world_options=None, log_fn=None, storage_dir=None):
+    """
+    Args:
+        feeder_count: number of slots/feeders (1-25 right bank, 26-50 left bank)
+        seed: makes the geometry, stored errors and motion jitter reproducible
+        time_scale: fraction of simulated time really slept (0 = none)
+        camera_options: dict of SimCamera keyword args (noise_sigma, settle_s, fps, ...)
+        world_options: dict passed to SimWorld.build (slot_error_mm, ...)
+        storage_dir: VisionStore dir for the sim profiles (default ~/.lumen_pnp)
+    Returns a SimMachine; its `world` holds the ground truth.
+    """
+    config = ensure_configuration(config_dir, log_fn)
+    parts = ensure_parts(config)
+    install_profiles(storage_dir=storage_dir)
+
+    world = SimWorld(seed)
+    tapes = [(parts[WHITE_TAPE_PART], "white"), (parts[BLACK_TAPE_PART], "black")]
+    world.build(feeder_count, tapes, **(world_options or {}))
+
+    machine = SimMachine(world, motion or MotionModel(), time_scale, camera_options)
+    # Park over the middle of the bed
+    cam = machine.head.camera
+    cam.x, cam.y = 210.0, 200.0
+    return machine
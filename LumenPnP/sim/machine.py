@@ -0,0 +1,275 @@
+"""
+Stand-in OpenPnP machine, head, camera and FiducialLocator.
+
+Only the calls LumenPnP makes are implemented. Time is tracked on a
+simulated clock (motion model + frame period); `time_scale` controls how
+much of it is also really slept (0 = as fast as possible, 1 = real time).
+"""
+import math
+import time
+from org.opencv.core import Mat, Scalar, Point, Core, CvType
+from org.opencv.imgproc import Imgproc
+from org.openpnp.util import OpenCvUtils
+from org.openpnp.model import Location, LengthUnit
+
+
+class MotionModel:
+    """Trapezoidal move time per axis (the slowest axis wins)."""
+
+    def __init__(self, speed_mm_s=300.0, accel_mm_s2=2000.0, command_s=0.02):
+        self.speed = speed_mm_s
+        self.accel = accel_mm_s2
+        self.command = command_s # Controller round trip per motion command (e.g. safe Z when already up)
+
+    def axis_time(self, distance):
+        d = abs(distance)
+        if d <= 0:
+            return 0.0
+        ramp = self.speed * self.speed / self.accel # Distance to reach speed and stop again
+        if d < ramp:
+            return 2.0 * math.sqrt(d / self.accel)
+        return d / self.speed + self.speed / self.accel
+
+    def move_time(self, dx, dy, speed_factor=1.0):
+        t = max(self.axis_time(dx), self.axis_time(dy))
+        if speed_factor and speed_factor > 0:
+            t /= min(1.0, speed_factor)
+        return t
+
+
+class SimBrightness:
+    """Camera brightness property (value/auto) with a write counter."""
+
+    def __init__(self, value=50, auto=True):
+        self.value = value
+        self.auto = auto
+        self.writes = 0
+
+    def getValue(self): return self.value
+    def isAuto(self): return self.auto
+
+    def setValue(self, value):
+        self.value = value
+        self.writes += 1
+
+    def setAuto(self, auto):
+        self.auto = auto
+        self.writes += 1
+
+
+class SimFormat:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def __str__(self):
+        return "%dx%d" % (self.width, self.height)
+
+
+class SimCamera:
+    """
+    Renders the SimWorld around the camera position. After a move the image
+    shakes (decaying jitter) for `settle_s`, so settle detection has real
+    work to do. Gaussian pixel noise with `noise_sigma` grey levels.
+    """
+    BED_GREY = 60
+    FIDUCIAL_GREY = 230
+
+    def __init__(self, machine, width=640, height=480, upp_mm=0.05, fps=30.0,
+                 noise_sigma=4.0, settle_s=0.15, jitter_mm=0.3):
+        self.machine = machine
+        self.width = width
+        self.height = height
+        self.upp = upp_mm
+        self.frame_period = 1.0 / fps
+        self.noise_sigma = noise_sigma
+        self.settle_s = settle_s
+        self.jitter_mm = jitter_mm
+        self.brightness = SimBrightness()
+        self.x = 0.0
+        self.y = 0.0
+        self.z = 0.0
+        self.move_end = 0.0 # Sim clock time the last move ended
+        self.captures = 0
+
+    # --- OpenPnP camera API ---
+    def getLocation(self):
+        return Location(LengthUnit.Millimeters, self.x, self.y, self.z, 0)
+
+    def getUnitsPerPixel(self):
+        return Location(LengthUnit.Millimeters, self.upp, self.upp, 0, 0)
+
+    def getWidth(self): return self.width
+    def getHeight(self): return self.height
+    def getFormat(self): return SimFormat(self.width, self.height)
+    def getBrightness(self): return self.brightness
+
+    def moveTo(self, location, speed=1.0):
+        mm = location.convertToUnits(LengthUnit.Millimeters)
+        self.machine.travel(self, mm.getX(), mm.getY(), speed)
+
+    def capture(self):
+        self.machine.advance(self.frame_period)
+        self.captures += 1
+        return self.render()
+
+    # --- Rendering ---
+    def render(self):
+        cx, cy = self.x, self.y
+        # Post-move shake, decaying linearly over settle_s
+        since = self.machine.clock - self.move_end
+        if since < self.settle_s:
+            amp = self.jitter_mm * (1.0 - since / self.settle_s)
+            cx += self.machine.rng.uniform(-amp, amp)
+            cy += self.machine.rng.uniform(-amp, amp)
+
+        w, h = self.width, self.height
+        mat = Mat(h, w, CvType.CV_8UC3, Scalar(self.BED_GREY, self.BED_GREY, self.BED_GREY))
+        world = self.machine.world
+        radius = max(w, h) * self.upp
+
+        def px(x, y):
+            return (w / 2.0 + (x - cx) / self.upp, h / 2.0 - (y - cy) / self.upp)
+
+        # Tapes and pockets
+        for feeder in world.feeders_near(cx, cy, radius):
+            tape_grey, pocket_grey = (220, 40) if feeder.tape == "white" else (30, 150)
+            fx, fy = feeder.true_pocket_xy()
+            inward = 1.0 if feeder.true_offset_xy[0] > 0 else -1.0
+            half = world.TAPE_WIDTH_MM / 2.0
+            x0 = fx - inward * world.POCKET_PITCH_MM / 2.0
+            x1 = fx + inward * (radius + world.TAPE_WIDTH_MM)
+            a = px(min(x0, x1), fy + half)
+            b = px(max(x0, x1), fy - half)
+            Imgproc.rectangle(mat, Point(a[0], a[1]), Point(b[0], b[1]), Scalar(tape_grey, tape_grey, tape_grey), -1)
+            if not feeder.pocket_visible:
+                continue
+            s = world.POCKET_SIZE_MM / 2.0
+            k = 0
+            while k * world.POCKET_PITCH_MM <= abs(x1 - fx):
+                pxx = fx + inward * k * world.POCKET_PITCH_MM
+                a = px(pxx - s, fy + s)
+                b = px(pxx + s, fy - s)
+                Imgproc.rectangle(mat, Point(a[0], a[1]), Point(b[0], b[1]), Scalar(pocket_grey, pocket_grey, pocket_grey), -1)
+                k += 1
+
+        # Slot fiducials
+        r_px = world.FIDUCIAL_DIAMETER_MM / 2.0 / self.upp
+        g = self.FIDUCIAL_GREY
+        for slot in world.fiducials_near(cx, cy, radius):
+            p = px(slot.true_xy[0], slot.true_xy[1])
+            Imgproc.circle(mat, Point(p[0], p[1]), int(round(r_px)), Scalar(g, g, g), -1)
+
+        # Manual brightness acts as a gain around the default of 50
+        if not self.brightness.auto:
+            gain = max(0.1, 1.0 + (self.brightness.value - 50) / 100.0)
+            mat.convertTo(mat, -1, gain, 0)
+
+        if self.noise_sigma > 0:
+            noise = Mat(h, w, CvType.CV_8UC3)
+            Core.randn(noise, 128, self.noise_sigma)
+            Core.addWeighted(mat, 1.0, noise, 1.0, -128.0, mat)
+            noise.release()
+
+        img = OpenCvUtils.toBufferedImage(mat)
+        mat.release()
+        return img
+
+
+class SimHead:
+    def __init__(self, machine, camera_options=None):
+        self.machine = machine
+        self.camera = SimCamera(machine, **(camera_options or {}))
+
+    def getDefaultCamera(self):
+        return self.camera
+
+    def moveToSafeZ(self):
+        # The camera never leaves safe Z here: only the command round trip costs time
+        self.machine.advance(self.machine.motion.command)
+
+
+class SimFiducialLocator:
+    """
+    Moves to the expected location, settles for a few frames, captures and
+    reports the true fiducial position plus measurement noise. Fails (None)
+    when no visible fiducial is inside the field of view.
+    """
+
+    def __init__(self, machine, noise_mm=0.01, settle_frames=3):
+        self.machine = machine
+        self.noise_mm = noise_mm
+        self.settle_frames = settle_frames
+        self.calls = 0
+
+    def getFiducialLocation(self, location, part):
+        self.calls += 1
+        cam = self.machine.head.camera
+        self.machine.head.moveToSafeZ()
+        cam.moveTo(location)
+        for _ in range(self.settle_frames):
+            cam.capture()
+
+        half_w = cam.width * cam.upp / 2.0
+        half_h = cam.height * cam.upp / 2.0
+        best = None
+        best_d = None
+        for slot in self.machine.world.fiducials_near(cam.x, cam.y, max(half_w, half_h)):
+            dx = slot.true_xy[0] - cam.x
+            dy = slot.true_xy[1] - cam.y
+            if abs(dx) > half_w or abs(dy) > half_h:
+                continue
+            d = dx * dx + dy * dy
+            if best is None or d < best_d:
+                best, best_d = slot, d
+        if best is None:
+            return None
+
+        rng = self.machine.rng
+        mm = location.convertToUnits(LengthUnit.Millimeters)
+        found = Location(LengthUnit.Millimeters,
+                         best.true_xy[0] + rng.gauss(0, self.noise_mm),
+                         best.true_xy[1] + rng.gauss(0, self.noise_mm),
+                         mm.getZ(), mm.getRotation())
+        return found.convertToUnits(location.getUnits())
+
+
+class SimMachine:
+    """
+    Machine object handed to SlotCalibrator / PocketCalibrator / MapNavigator
+    in place of the OpenPnP machine.
+    """
+
+    def __init__(self, world, motion=None, time_scale=0.0, camera_options=None):
+        self.world = world
+        self.rng = world.rng
+        self.motion = motion if motion is not None else MotionModel()
+        self.time_scale = time_scale
+        self.clock = 0.0 # Simulated seconds
+        self.travel_mm = 0.0
+        self.moves = 0
+        self.head = SimHead(self, camera_options)
+        self.fiducial_locator = SimFiducialLocator(self)
+
+    # --- OpenPnP machine API ---
+    def getDefaultHead(self): return self.head
+    def getFiducialLocator(self): return self.fiducial_locator
+    def getFeeders(self): return list(self.world.feeders)
+    def getSpeed(self): return 1.0
+
+    # --- Simulation ---
+    def advance(self, seconds):
+        self.clock += seconds
+        if self.time_scale > 0 and seconds > 0:
+            time.sleep(seconds * self.time_scale)
+
+    def travel(self, cam, x, y, speed=1.0):
+        dx = x - cam.x
+        dy = y - cam.y
+        if dx == 0 and dy == 0:
+            return
+        self.advance(self.motion.command + self.motion.move_time(dx, dy, speed))
+        self.travel_mm += math.sqrt(dx * dx + dy * dy)
+        self.moves += 1
+        cam.x, cam.y = x, y
+        cam.move_end = self.clock
@@ -0,0 +1,163 @@
+"""
+Ground truth of the simulated machine: where the slot fiducials and the
+tape pockets really are, and the (deliberately wrong) locations stored in
+the configuration that calibration has to correct.
+All values in mm.
+"""
+import math
+import random
+from org.openpnp.model import Location, LengthUnit
+
+
+class SimSlot:
+    """A Photon slot: stored location + true fiducial position."""
+
+    def __init__(self, number, true_xy, stored_xy):
+        self.number = number
+        self.true_xy = true_xy
+        self.location = Location(LengthUnit.Millimeters, stored_xy[0], stored_xy[1], 0, 0)
+        self.fiducial_visible = True # False => the locator fails on this slot
+
+    def getLocation(self):
+        return self.location
+
+    def setLocation(self, location):
+        self.location = location
+
+
+class SimFeeder:
+    """
+    Minimal Photon-like feeder. getLocation() follows the slot (like
+    PhotonFeeder) unless no slot is assigned.
+    """
+
+    def __init__(self, feeder_id, name, part, slot, true_offset_xy, stored_offset_xy, tape="white"):
+        self.id = feeder_id
+        self.name = name
+        self.part = part
+        self.slot = slot
+        self.location = Location(LengthUnit.Millimeters, 0, 0, 0, 0)
+        self.offset = Location(LengthUnit.Millimeters, stored_offset_xy[0], stored_offset_xy[1], 0, 0)
+        self.true_offset_xy = true_offset_xy
+        self.tape = tape # "white" (dark pockets) or "black" (light pockets)
+        self.pocket_visible = True # False => no pocket is drawn (vision miss)
+        self.enabled = True
+
+    def getId(self): return self.id
+    def getName(self): return self.name
+    def getPart(self): return self.part
+    def getSlot(self): return self.slot
+    def isEnabled(self): return self.enabled
+    def setEnabled(self, enabled): self.enabled = enabled
+    def getOffset(self): return self.offset
+    def setOffset(self, offset): self.offset = offset
+
+    def getLocation(self):
+        if self.slot is not None:
+            return self.slot.getLocation()
+        return self.location
+
+    def setLocation(self, location):
+        self.location = location
+
+    def true_pocket_xy(self):
+        return (self.slot.true_xy[0] + self.true_offset_xy[0],
+                self.slot.true_xy[1] + self.true_offset_xy[1])
+
+
+class SimWorld:
+    """
+    Two rigid banks of slots (1-25 right rail, 26-50 left rail, like the
+    Photon banks), each with a small rotation/shift, plus per-slot noise.
+    The stored configuration starts off by `slot_error_mm` / `offset_error_mm`.
+    """
+    TAPE_WIDTH_MM = 8.0
+    POCKET_PITCH_MM = 4.0
+    POCKET_SIZE_MM = 2.0
+    FIDUCIAL_DIAMETER_MM = 1.0
+    BANK_ORIGINS = [(390.0, 40.0), (30.0, 40.0)] # Slot 1 / slot 26 fiducials
+    SLOT_PITCH_MM = 15.0 # Matches SlotCalibrator.BANK_SLOT_PITCH_MM
+    POCKET_OFFSET_MM = 8.0 # Fiducial -> pocket, inside the FOV of the fiducial stop
+
+    def __init__(self, seed=1):
+        self.rng = random.Random(seed)
+        self.slots = []
+        self.feeders = []
+
+    def build(self, count, parts, slot_error_mm=0.3, offset_error_mm=0.3, rail_rotation_deg=0.2, slot_noise_mm=0.02):
+        """
+        Create `count` slots/feeders. `parts` is a list of (Part, tape) pairs
+        cycled over the feeders.
+        """
+        rng = self.rng
+        rails = []
+        for origin in self.BANK_ORIGINS:
+            rot = math.radians(rng.uniform(-rail_rotation_deg, rail_rotation_deg))
+            shift = (rng.uniform(-slot_error_mm, slot_error_mm), rng.uniform(-slot_error_mm, slot_error_mm))
+            rails.append((origin, rot, shift))
+
+        for k in range(count):
+            number = k + 1
+            origin, rot, shift = rails[(number - 1) // 25 % len(rails)]
+            along = ((number - 1) % 25) * self.SLOT_PITCH_MM
+            # Nominal rail runs along +Y
+            nominal = (origin[0], origin[1] + along)
+            true_xy = (origin[0] - along * math.sin(rot) + shift[0] + rng.gauss(0, slot_noise_mm),
+                       origin[1] + along * math.cos(rot) + shift[1] + rng.gauss(0, slot_noise_mm))
+            slot = SimSlot(number, true_xy, nominal)
+
+            part, tape = parts[k % len(parts)]
+            # Pocket sits towards the bed centre, across the rail (tape runs along X)
+            inward = -1.0 if origin[0] > 200 else 1.0
+            true_offset = (inward * self.POCKET_OFFSET_MM + rng.uniform(-0.5, 0.5), rng.uniform(-0.5, 0.5))
+            stored_offset = (true_offset[0] + rng.uniform(-offset_error_mm, offset_error_mm),
+                             true_offset[1] + rng.uniform(-offset_error_mm, offset_error_mm))
+            feeder = SimFeeder("SimFeeder-%d" % number, "Slot: %d" % number, part, slot,
+                               true_offset, stored_offset, tape)
+            self.slots.append(slot)
+            self.feeders.append(feeder)
+        return self.feeders
+
+    def inject_failures(self, fiducial_rate=0.0, pocket_rate=0.0):
+        """Hide a random share of fiducials / pockets. Returns (fiducials, pockets) hidden."""
+        hidden_fid = 0
+        hidden_pocket = 0
+        for f in self.feeders:
+            if self.rng.random() < fiducial_rate:
+                f.slot.fiducial_visible = False
+                hidden_fid += 1
+            if self.rng.random() < pocket_rate:
+                f.pocket_visible = False
+                hidden_pocket += 1
+        return hidden_fid, hidden_pocket
+
+    # --- Queries used by the renderer ---
+    def fiducials_near(self, x, y, radius):
+        return [s for s in self.slots
+                if s.fiducial_visible and abs(s.true_xy[0] - x) <= radius and abs(s.true_xy[1] - y) <= radius]
+
+    def feeders_near(self, x, y, radius):
+        out = []
+        for f in self.feeders:
+            px, py = f.true_pocket_xy()
+            if abs(px - x) <= radius + self.TAPE_WIDTH_MM and abs(py - y) <= radius + self.TAPE_WIDTH_MM:
+                out.append(f)
+        return out
+
+    # --- Scoring ---
+    def errors(self):
+        """
+        Remaining error per feeder after calibration:
+        list of (name, slot_error_mm, pocket_error_mm).
+        """
+        out = []
+        for f in self.feeders:
+            slot_mm = f.slot.getLocation().convertToUnits(LengthUnit.Millimeters)
+            offset_mm = f.getOffset().convertToUnits(LengthUnit.Millimeters)
+            tx, ty = f.slot.true_xy
+            slot_err = math.sqrt((slot_mm.getX() - tx) ** 2 + (slot_mm.getY() - ty) ** 2)
+            px, py = f.true_pocket_xy()
+            pocket_err = math.sqrt((slot_mm.getX() + offset_mm.getX() - px) ** 2 +
+                                   (slot_mm.getY() + offset_mm.getY() - py) ** 2)
+            out.append((f.getName(), slot_err, pocket_err))
+        return out